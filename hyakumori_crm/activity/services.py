@@ -7,6 +7,7 @@ from django_q.tasks import async_task
 
 from hyakumori_crm.activity.constants import *  # noqa
 from hyakumori_crm.activity.models import ActionLog
+from hyakumori_crm.cache.reference import content_types, message_templates
 from hyakumori_crm.core.utils import get_remote_ip
 from hyakumori_crm.crm.models import Customer, Forest
 from hyakumori_crm.crm.models.message_template import MessageTemplate
@@ -39,6 +40,8 @@ class ActivityService:
             ActivityService.import_message_templates(
                 for_type="user", action_class=UserActions
             )
+            # bulk_create sends no post_save
+            message_templates.invalidate_on_commit()
 
             if sync_created:
                 ActionLog.objects.filter(
@@ -135,7 +138,7 @@ class ActivityService:
 
         try:
             template_name = action[0] if isinstance(action, tuple) else action
-            template = MessageTemplate.objects.get(name=template_name)
+            template = message_templates.get(name=template_name)
             content_type = ContentType.objects.get_for_model(model_instance)
             log = ActionLog.objects.create(
                 content_type=content_type,
@@ -196,7 +199,7 @@ class ActivityService:
 
         try:
             template_name = action[0] if isinstance(action, tuple) else action
-            template = MessageTemplate.objects.get(name=template_name)
+            template = message_templates.get(name=template_name)
             content_type = ContentType.objects.get_for_model(model_cls)
             logs = []
             for pk in obj_pks:
@@ -235,9 +238,10 @@ class ActivityService:
 
     @classmethod
     def get_log_for_object(cls, lang_code, app_label, object_type, object_id):
-        content_type = ContentType.objects.filter(
-            app_label=app_label, model=object_type
-        ).first()
+        try:
+            content_type = content_types.get(app_label=app_label, model=object_type)
+        except ContentType.DoesNotExist:
+            return []
         action_content_type = ContentType.objects.get_for_model(ActionLog)
         try:
             with connection.cursor() as cursor:
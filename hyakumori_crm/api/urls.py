@@ -14,6 +14,7 @@ from hyakumori_crm.cache.urls import api_urls as cache_api_urls
 from hyakumori_crm.contracts.urls import api_urls as contracttype_api_urls
 from hyakumori_crm.postal_history.urls import api_urls as postalhistory_api_urls
 from hyakumori_crm.slack.urls import api_urls as slack_api_urls
+from hyakumori_crm.tasks.urls import api_urls as tasks_api_urls
 
 from .views import notfound_view, maintenance_status
 
@@ -29,6 +30,7 @@ urlpatterns = (
     + contracttype_api_urls
     + postalhistory_api_urls
     + slack_api_urls
+    + tasks_api_urls
     + [path("maintenance/status", maintenance_status), re_path(".*", notfound_view)]
 )
 
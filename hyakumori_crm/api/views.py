@@ -3,7 +3,7 @@ from django.core.cache import cache
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import exception_handler as rest_exception_handler
-from ..core.utils import clear_maintain_task_id_cache
+from ..core.utils import clear_maintain_task_id_cache, get_maintain_resources
 
 
 @api_view()
@@ -15,7 +15,9 @@ def notfound_view(request):
 @permission_classes([])
 def maintenance_status(request):
     task_id = cache.get("maintain_task_id")
-    return Response({"in_maintain": bool(task_id)})
+    return Response(
+        {"in_maintain": bool(task_id), "resources": get_maintain_resources()}
+    )
 
 
 def exception_handler(exc, context):
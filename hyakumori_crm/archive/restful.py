@@ -14,6 +14,7 @@ from hyakumori_crm.crm.common.utils import EncryptError, encrypt_string
 from hyakumori_crm.crm.schemas.tag import TagBulkUpdate
 from .schemas import ArchiveFilter, ArchiveInput, ArchiveCustomerInput
 from .service import (
+    add_search_snippets,
     add_related_forest,
     add_related_user,
     create_archive,
@@ -72,13 +73,19 @@ def archive_obj_permission(f):
 @api_validate_model(ArchiveInput)
 def archives(request, data: ArchiveInput = None):
     if request.method == "GET":
-        paginator_listing = ListingPagination()
-        qs = get_filtered_archive_queryset(
-            ArchiveFilter(**request.GET.dict()), request.user
-        )
+        listing_filter = ArchiveFilter(**request.GET.dict())
+        unfiltered = all(
+            v is None for v in listing_filter.dict().values()
+        ) and not request.user.member_of(SystemGroups.GROUP_LIMITED_USER)
+        paginator_listing = ListingPagination(estimate_count=unfiltered)
+        qs = get_filtered_archive_queryset(listing_filter, request.user)
+        search = (listing_filter.search or "").strip()
+        ordering = ["-search_rank", "-created_at"] if search else ["-created_at"]
         paged_list = paginator_listing.paginate_queryset(
-            request=request, queryset=qs.order_by("-created_at")
+            request=request, queryset=qs.order_by(*ordering)
         )
+        if search:
+            add_search_snippets(paged_list, search)
         return paginator_listing.get_paginated_response(
             ArchiveListingSerializer(paged_list, many=True).data
         )
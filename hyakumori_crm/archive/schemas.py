@@ -41,6 +41,8 @@ class ArchiveFilter(HyakumoriDanticModel):
     our_participants: str = None
     associated_forest: str = None
     tags: str = None
+    # words searched in the texts, results are ranked
+    search: str = None
 
     class Config:
         arbitrary_types_allowed = True
@@ -7,10 +7,8 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError as DjValidationError
 from django.db import connection
-from django.db.models import F, Subquery, OuterRef, Count, Q, CharField, Value as V
-from django.db.models.functions import Concat
+from django.db.models import F, Subquery, OuterRef, Count, Q
 from django.db.models.expressions import RawSQL
-from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from pydantic import ValidationError
 from rest_framework.request import Request
@@ -20,6 +18,7 @@ from hyakumori_crm.cache.archive import (
     refresh_forest_cache,
     refresh_user_participants_cache,
 )
+from hyakumori_crm.cache.counts import invalidate_counts
 from .schemas import ArchiveInput, ArchiveCustomerInput, ArchiveFilter
 from ..crm.models import (
     Archive,
@@ -32,8 +31,8 @@ from ..crm.models import (
     ArchiveCustomerContact,
     CustomerContact,
 )
+from ..core.search import bigram_search, search_snippet
 from ..forest.service import get_forest_by_pk
-from ..tags.filters import TagsFilterSet
 from ..permissions.enums import SystemGroups
 
 
@@ -326,19 +325,21 @@ def delete_related_user(archive: Archive, data: dict):
 
 def get_filtered_archive_queryset(archive_filter: ArchiveFilter, user):
     archive_filter = archive_filter.dict()
+    search = (archive_filter.pop("search") or "").strip()
     active_filters = dict()
+    # trigram indexed columns and copies kept in ArchiveSearch
     mapping = {
         "id": "id",
         "content": "content",
-        "archive_date": "archive_date_text",
+        "archive_date": "search__archive_date",
         "location": "location",
         "title": "title",
         "future_action": "future_action",
-        "author": "author_fullname",
-        "associated_forest": "attributes__forest_cache__repr",
-        "our_participants": "attributes__user_cache__repr",
-        "their_participants": "attributes__customer_cache__repr",
-        "tags": "tags_repr",
+        "author": "search__author",
+        "associated_forest": "search__forests",
+        "our_participants": "search__our_participants",
+        "their_participants": "search__their_participants",
+        "tags": "search__tags",
     }
     for k, v in archive_filter.items():
         if v is not None:
@@ -348,38 +349,35 @@ def get_filtered_archive_queryset(archive_filter: ArchiveFilter, user):
         qs = qs.distinct().filter(
             Q(author_id=user.id) | Q(archiveuser__user_id=user.id)
         )
-    if len(active_filters.keys()) > 0:
-        qs = qs.annotate(
-            archive_date_text=RawSQL(
-                "to_char((archive_date at time zone %s), 'YYYY-MM-DD HH24:MI')",
-                [settings.TIME_ZONE_PRIMARY],
-            ),
-            author_fullname=Concat(
-                F("author__last_name"),
-                V(" "),
-                F("author__first_name"),
-                output_field=CharField(),
-            ),
-        ).select_related("author")
-        qs = TagsFilterSet.get_tags_repr_queryset(qs)
-        for k, value in active_filters.items():
-            values = list(set(map(lambda v: v.strip(), value.split(","))))
-            if len(values) == 1 and values[0] == "":
-                conditions = Q(**{f"{k}__isnull": True}) | Q(**{f"{k}__exact": None})
-            else:
-                search_field_filter = k + "__icontains"
-                conditions = reduce(
-                    operator.or_,
-                    (
-                        Q(**{search_field_filter: value})
-                        for value in values
-                        if len(value) > 0
-                    ),
-                )
-            qs = qs.filter(conditions)
+    for k, value in active_filters.items():
+        values = list(set(map(lambda v: v.strip(), value.split(","))))
+        if len(values) == 1 and values[0] == "":
+            conditions = Q(**{f"{k}__isnull": True}) | Q(**{f"{k}__exact": None})
+        else:
+            search_field_filter = k + "__icontains"
+            conditions = reduce(
+                operator.or_,
+                (
+                    Q(**{search_field_filter: value})
+                    for value in values
+                    if len(value) > 0
+                ),
+            )
+        qs = qs.filter(conditions)
+    if search:
+        qs = bigram_search(qs, search)
     return qs
 
 
+def add_search_snippets(archives, search):
+    for archive in archives:
+        archive.search_snippet = search_snippet(
+            [archive.content, archive.title, archive.future_action, archive.location],
+            search,
+        )
+    return archives
+
+
 def _archives_list_raw_sql(page_size, page, filters, order_by):
     limit = page_size
     offset = page * page_size
@@ -446,6 +444,7 @@ def update_archive_tag(data: dict):
     Archive.objects.filter(id__in=ids).update(
         tags=RawSQL("tags || jsonb_build_object(%s, %s)", params=[tag_key, new_value])
     )
+    invalidate_counts(Archive._meta.db_table)
 
 
 def update_archive_other_participants(archive, participants):
@@ -0,0 +1 @@
+default_app_config = "hyakumori_crm.cache.apps.CacheConfig"
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class CacheConfig(AppConfig):
+    name = "hyakumori_crm.cache"
+
+    def ready(self):
+        # register count, reference tables and denormalized caches receivers
+        from . import archive, counts, forest, postal_history, reference  # noqa
+        from .denormalize import connect_dependencies
+
+        connect_dependencies()
@@ -0,0 +1,99 @@
+import logging
+import select
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from .counts import invalidate_counts
+
+logger = logging.getLogger(__name__)
+
+# notified by the crm_log_change triggers, see crm migration 0033
+CHANGES_CHANNEL = "crm_changes"
+CHANGE_BATCH_SIZE = 1000
+# seconds between two looks at the change log without notification
+CHANGES_POLL_INTERVAL = 30
+
+# resource -> ({source: source model}, function refreshing the resource
+# caches from {source: set of changed source ids})
+CHANGE_HANDLERS = {}
+
+# rows are locked, a second consumer takes the next batch
+POP_CHANGES = """
+DELETE FROM crm_changelog
+WHERE id IN (
+    SELECT id FROM crm_changelog ORDER BY id
+    LIMIT %(limit)s FOR UPDATE SKIP LOCKED
+)
+RETURNING table_name, row_id
+"""
+
+
+def register_change_handler(resource, sources, func):
+    CHANGE_HANDLERS[resource] = (sources, func)
+
+
+def apply_changes(changes):
+    """
+    Refresh every cache built from the changed rows
+    :param changes: (table name, row id) pairs
+    :return: number of rows updated by resource
+    """
+    changed = defaultdict(set)
+    for table, pk in changes:
+        changed[table].add(str(pk))
+    summary = {}
+    for resource, (sources, handler) in CHANGE_HANDLERS.items():
+        changed_sources = {
+            source: changed.get(model._meta.db_table, set())
+            for source, model in sources.items()
+        }
+        if any(changed_sources.values()):
+            summary[resource] = handler(changed_sources)
+    invalidate_counts(*changed)
+    return summary
+
+
+def consume_changes(batch_size=CHANGE_BATCH_SIZE):
+    """
+    Apply the change log until it is empty. A batch is removed from the log
+    in the transaction applying it, a failed batch stays logged and each
+    change is applied once.
+    :return: summary of the run
+    """
+    summary = dict(changes=0, batches=0, updated=defaultdict(int))
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            # cache writes are not changes to feed back
+            cursor.execute("SET LOCAL crm.changelog_skip = 'on'")
+            cursor.execute(POP_CHANGES, {"limit": batch_size})
+            changes = cursor.fetchall()
+            if not changes:
+                break
+            for resource, updated in apply_changes(changes).items():
+                summary["updated"][resource] += updated
+        summary["batches"] += 1
+        summary["changes"] += len(changes)
+    summary["updated"] = dict(summary["updated"])
+    return summary
+
+
+def listen_changes():
+    with connection.cursor() as cursor:
+        cursor.execute(f"LISTEN {CHANGES_CHANNEL}")
+
+
+def wait_for_changes(timeout=CHANGES_POLL_INTERVAL):
+    """
+    Block until a change is notified or ``timeout`` seconds passed, must
+    be called outside of a transaction after listen_changes
+    :return: whether a change was notified
+    """
+    conn = connection.connection
+    if not conn.notifies:
+        if select.select([conn], [], [], timeout) == ([], [], []):
+            return False
+        conn.poll()
+    notified = bool(conn.notifies)
+    conn.notifies.clear()
+    return notified
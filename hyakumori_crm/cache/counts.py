@@ -0,0 +1,138 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.functional import cached_property
+
+COUNT_CACHE_TIMEOUT = 60 * 10
+# below this size an unfiltered table is still counted exactly
+ESTIMATE_COUNT_MIN_ROWS = 10000
+# models of the counted listings and of the tables they join, other writes
+# keep the cached counts
+COUNTED_MODELS = (
+    "crm.Forest",
+    "crm.ForestCustomer",
+    "crm.Customer",
+    "crm.CustomerContact",
+    "crm.Contact",
+    "crm.Archive",
+    "crm.ArchiveUser",
+    "crm.PostalHistory",
+    "crm.PostalHistoryUser",
+    settings.AUTH_USER_MODEL,
+)
+
+
+def get_count_version_key(table):
+    return f"count_version:{table}"
+
+
+def get_count_versions(tables):
+    keys = [get_count_version_key(table) for table in tables]
+    versions = cache.get_many(keys)
+    return [versions.get(key, 0) for key in keys]
+
+
+def get_table_version(table):
+    """Write version of a table, other caches can key their entries on it"""
+    return get_count_versions([table])[0]
+
+
+def bump_table_versions(tables):
+    for table in tables:
+        key = get_count_version_key(table)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def invalidate_counts(*tables):
+    """
+    Bump the write versions of ``tables`` once the current transaction
+    commits, a reader in between would cache a count without the write
+    under the new version
+    """
+    transaction.on_commit(lambda: bump_table_versions(tables))
+
+
+def estimate_count(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table]
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 (or 0 before postgres 14) until the table is analyzed.
+    # It counts every row, soft deleted ones too, so the estimate of a table
+    # with many soft deleted rows runs high.
+    if row is None or row[0] <= 0:
+        return None
+    return row[0]
+
+
+def cached_count(signature, tables, count_func, estimate=False):
+    """
+    Count rows once per filter signature, usually the compiled sql.
+    The entry is keyed by the write versions of ``tables`` as well, so
+    any write to them makes it stale.
+    :param estimate: query is unfiltered, planner statistics of the first
+        table may be used instead of counting
+    :return: (total, exact)
+    """
+    if estimate:
+        total = estimate_count(tables[0])
+        if total is not None and total >= ESTIMATE_COUNT_MIN_ROWS:
+            return total, False
+
+    versions = get_count_versions(tables)
+    digest = hashlib.sha1(repr((signature, versions)).encode()).hexdigest()
+    key = f"count:{tables[0]}:{digest}"
+    total = cache.get(key)
+    if total is None:
+        total = count_func()
+        cache.set(key, total, COUNT_CACHE_TIMEOUT)
+    return total, True
+
+
+def queryset_count(queryset, tables=(), estimate=False):
+    """
+    Cached count of a queryset, joined tables are tracked automatically,
+    tables only used in raw sql have to be given in ``tables``.
+    """
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0, True
+    query_tables = [queryset.model._meta.db_table]
+    for alias in queryset.query.alias_map.values():
+        if alias.table_name not in query_tables:
+            query_tables.append(alias.table_name)
+    for table in tables:
+        if table not in query_tables:
+            query_tables.append(table)
+    return cached_count((sql, params), query_tables, queryset.count, estimate)
+
+
+class CachedCountPaginator(DjangoPaginator):
+    estimate = False
+    count_exact = True
+
+    @cached_property
+    def count(self):
+        total, self.count_exact = queryset_count(
+            self.object_list, estimate=self.estimate
+        )
+        return total
+
+
+def invalidate_counts_on_write(sender, **kwargs):
+    invalidate_counts(sender._meta.db_table)
+
+
+for model in COUNTED_MODELS:
+    post_save.connect(invalidate_counts_on_write, sender=model)
+    post_delete.connect(invalidate_counts_on_write, sender=model)
@@ -0,0 +1,185 @@
+import json
+import logging
+from collections import defaultdict
+
+from django.db import connection
+from django.utils import timezone
+
+from .counts import invalidate_counts
+from .changes import register_change_handler
+
+logger = logging.getLogger(__name__)
+
+# parent model label -> denormalized caches stored in its attributes
+DENORMALIZED_CACHES = defaultdict(list)
+
+
+def pk_db_type(model):
+    return model._meta.pk.db_type(connection)
+
+
+class DenormalizedCache:
+    """
+    A json blob stored under ``attributes[name]`` of ``model`` rows and
+    aggregated from the rows of a relation, for many parents at once.
+
+    :param from_sql: FROM clause, relation rows are aliased ``l``
+    :param parent_column: column of ``from_sql`` holding the parent id
+    :param aggregates: list of (blob key, aggregate sql, value for parents
+        without relation rows)
+    :param depends_on: source name -> (column of ``from_sql`` holding the
+        source id, source model), writes to a source row refresh the caches
+        of its parents
+    :param where: condition on the relation rows
+    """
+
+    def __init__(
+        self,
+        model,
+        name,
+        from_sql,
+        parent_column,
+        aggregates,
+        depends_on=None,
+        where="l.deleted IS NULL",
+    ):
+        self.model = model
+        self.name = name
+        self.from_sql = from_sql
+        self.parent_column = parent_column
+        self.aggregates = aggregates
+        self.depends_on = depends_on or {}
+        self.where = where
+        DENORMALIZED_CACHES[model._meta.label].append(self)
+
+    def __repr__(self):
+        return f"<DenormalizedCache {self.model._meta.label}.{self.name}>"
+
+    @property
+    def empty(self):
+        return {key: empty for key, _, empty in self.aggregates}
+
+    def grouped_sql(self):
+        blob = ", ".join(f"'{key}', {sql}" for key, sql, _ in self.aggregates)
+        return f"""
+            SELECT {self.parent_column} AS parent_id, json_build_object({blob}) AS blob
+            FROM {self.from_sql}
+            WHERE {self.parent_column} = ANY(%(ids)s::{pk_db_type(self.model)}[])
+            AND {self.where}
+            GROUP BY {self.parent_column}
+        """
+
+    def compute(self, ids):
+        """:return: blob of each parent id, with one grouped query"""
+        ids = [str(pk) for pk in ids]
+        blobs = {pk: self.empty for pk in ids}
+        if not ids:
+            return blobs
+        with connection.cursor() as cursor:
+            cursor.execute(self.grouped_sql(), {"ids": ids})
+            for parent_id, blob in cursor.fetchall():
+                blobs[str(parent_id)] = blob
+        return blobs
+
+    def refresh(self, ids):
+        """
+        Recompute and write the blob of many parents with one statement,
+        unchanged blobs are not written and post_save is not sent.
+        :return: number of parents updated
+        """
+        ids = [str(pk) for pk in ids]
+        if not ids:
+            return 0
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} AS p
+                SET attributes = jsonb_set(
+                    coalesce(p.attributes, '{{}}'), %(path)s::text[], v.blob
+                ), updated_at = %(now)s
+                FROM (
+                    SELECT ids.id, coalesce(g.blob::jsonb, %(empty)s::jsonb) AS blob
+                    FROM unnest(%(ids)s::{pk_db_type(self.model)}[]) AS ids (id)
+                    LEFT JOIN ({self.grouped_sql()}) AS g ON g.parent_id = ids.id
+                ) AS v
+                WHERE p.id = v.id
+                AND p.attributes -> %(name)s IS DISTINCT FROM v.blob
+                """,
+                {
+                    "ids": ids,
+                    "name": self.name,
+                    "path": [self.name],
+                    "empty": json.dumps(self.empty),
+                    "now": timezone.now(),
+                },
+            )
+            updated = cursor.rowcount
+        if updated:
+            invalidate_counts(table)
+        return updated
+
+    def parents_of(self, source, ids):
+        """
+        Parents of the source rows, ``where`` is not applied for a link
+        just deleted to still refresh its parent
+        """
+        column, source_model = self.depends_on[source]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT DISTINCT {self.parent_column} FROM {self.from_sql}
+                WHERE {column} = ANY(%(ids)s::{pk_db_type(source_model)}[])
+                """,
+                {"ids": [str(pk) for pk in ids]},
+            )
+            return [str(row[0]) for row in cursor.fetchall()]
+
+
+def refresh_instance(cache, instance, save=False):
+    """Recompute the blob of a single loaded parent, in memory first"""
+    try:
+        blobs = cache.compute([instance.pk])
+        instance.attributes[cache.name] = blobs[str(instance.pk)]
+        if save:
+            instance.save()
+    except Exception:
+        logger.warning(
+            f"could not refresh {cache.name} of {instance!r}", exc_info=True
+        )
+    return instance
+
+
+def refresh_dependents(model, changed):
+    """
+    Refresh caches of ``model`` rows depending on changed sources, each
+    cache is written with one statement whatever the number of changes.
+    :param changed: {source name: changed source ids}
+    :return: number of parents updated
+    """
+    updated = 0
+    for cache in DENORMALIZED_CACHES[model._meta.label]:
+        parent_ids = set()
+        for source, ids in changed.items():
+            if ids and source in cache.depends_on:
+                parent_ids.update(cache.parents_of(source, ids))
+        updated += cache.refresh(parent_ids)
+    return updated
+
+
+def connect_dependencies():
+    """
+    Register the refresh of caches depending on each source model, writes
+    to the source tables are fed to it by the changes consumer
+    """
+    for label, caches in DENORMALIZED_CACHES.items():
+        model = caches[0].model
+        sources = {}
+        for cache in caches:
+            for source, (_, source_model) in cache.depends_on.items():
+                sources[source] = source_model
+        register_change_handler(
+            model._meta.label_lower,
+            sources,
+            lambda changed, model=model: refresh_dependents(model, changed),
+        )
@@ -1,64 +1,82 @@
 import logging
+import time
 from typing import List
 
-from django.db.models import Prefetch
-from django.db.models.expressions import RawSQL
+from hyakumori_crm.crm.models import Contact, CustomerContact, Forest, ForestCustomer
 
-from hyakumori_crm.crm.common.utils import get_customer_name
-from hyakumori_crm.crm.models import ForestCustomer, Forest
-import time
+from .denormalize import DenormalizedCache
+from .participants import full_name_sql
 
 logger = logging.Logger(__name__)
 
+FOREST_CACHE_BATCH_SIZE = 500
 
-def refresh_customer_forest_cache(forest_ids: List[str]):
-    forest_filters = dict()
-    now = time.time()
-
-    forest_filters["id__in"] = forest_ids
+# default owner first, then by link creation
+CUSTOMER_ORDER = "l.attributes -> 'default' DESC NULLS LAST, l.created_at"
 
-    forests = Forest.objects.filter(**forest_filters).prefetch_related(
-        Prefetch(
-            "forestcustomer_set",
-            queryset=ForestCustomer.objects.order_by(
-                RawSQL("attributes->'default'", params=[]).desc(nulls_last=True),
-                "created_at",
-            ),
+# WARNING: postgres jsonb saved not in order, use the repr for display order
+CUSTOMER_CACHE = DenormalizedCache(
+    Forest,
+    "customer_cache",
+    from_sql=f"{ForestCustomer._meta.db_table} l "
+    f"JOIN {CustomerContact._meta.db_table} cc ON cc.customer_id = l.customer_id "
+    "AND cc.is_basic "
+    f"JOIN {Contact._meta.db_table} c ON c.id = cc.contact_id",
+    parent_column="l.forest_id",
+    aggregates=[
+        (
+            "list",
+            "jsonb_object_agg(l.customer_id, jsonb_build_object("
+            "'default', coalesce(l.attributes -> 'default', 'false'), "
+            "'contact_id', c.id, "
+            "'name_kanji', c.name_kanji, "
+            "'name_kana', c.name_kana) ORDER BY " + CUSTOMER_ORDER + ")",
+            {},
         ),
-        "forestcustomer_set__customer",
-        "forestcustomer_set__customer__customercontact_set",
-        "forestcustomer_set__customer__customercontact_set__contact",
-    )
-    for f in forests:
-        try:
-            # WARNING: postgres jsonb saved not in order
-            customer_list = {
-                str(fc.customer_id): dict(
-                    default=fc.attributes.get("default", False),
-                    contact_id=str(fc.customer.self_contact.id),
-                    name_kanji=fc.customer.self_contact.name_kanji,
-                    name_kana=fc.customer.self_contact.name_kana,
-                )
-                for fc in f.forestcustomer_set.all()
-            }
-            repr_name_kanji = ",".join(
-                get_customer_name(item.get("name_kanji"))
-                for item in customer_list.values()
-            )
-            repr_name_kana = ",".join(
-                get_customer_name(item.get("name_kana"))
-                for item in customer_list.values()
-            )
-            f.attributes["customer_cache"] = dict(
-                list=customer_list,
-                repr_name_kanji=repr_name_kanji,
-                repr_name_kana=repr_name_kana,
-            )
-            f.save(update_fields=["attributes", "updated_at"])
-        except Exception as e:
-            logger.warning(
-                f"could not saving latest user self contact info in forest: {f.pk}",
-                exc_info=e,
+        (
+            "repr_name_kanji",
+            f"string_agg({full_name_sql('c.name_kanji')}, ',' "
+            f"ORDER BY {CUSTOMER_ORDER})",
+            "",
+        ),
+        (
+            "repr_name_kana",
+            f"string_agg({full_name_sql('c.name_kana')}, ',' "
+            f"ORDER BY {CUSTOMER_ORDER})",
+            "",
+        ),
+    ],
+    depends_on={
+        "forestcustomer": ("l.id", ForestCustomer),
+        "customercontact": ("cc.id", CustomerContact),
+        "contact": ("c.id", Contact),
+    },
+    where="l.deleted IS NULL AND cc.deleted IS NULL",
+)
+
+
+def refresh_customer_forest_cache(
+    forest_ids: List[str], batch_size: int = FOREST_CACHE_BATCH_SIZE
+):
+    """
+    Rebuild customer_cache of forests by batch, unchanged caches are not
+    written. Returns the timings of each batch.
+    """
+    now = time.time()
+    forest_ids = list(forest_ids)
+    report = []
+    for start in range(0, len(forest_ids), batch_size):
+        batch_started = time.time()
+        batch_ids = forest_ids[start : start + batch_size]
+        updated = CUSTOMER_CACHE.refresh(batch_ids)
+        report.append(
+            dict(
+                forests=len(batch_ids),
+                updated=updated,
+                seconds=round(time.time() - batch_started, 3),
             )
+        )
+        logger.debug(f"Cache reloading batch {len(report)}: {report[-1]}")
 
     logger.debug(f"Cache reloading has been finished, time cost: {time.time() - now}s")
+    return report
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from hyakumori_crm.cache.changes import (
+    CHANGE_BATCH_SIZE,
+    CHANGES_POLL_INTERVAL,
+    consume_changes,
+    listen_changes,
+    wait_for_changes,
+)
+
+
+class Command(BaseCommand):
+    help = "Refresh caches from the change log, waiting for new changes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="apply the pending changes and exit",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=CHANGE_BATCH_SIZE,
+            help="changes applied per transaction",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=int,
+            default=CHANGES_POLL_INTERVAL,
+            help="seconds to wait for a notification before looking anyway",
+        )
+
+    def handle(self, *args, **kwargs):
+        if not kwargs["once"]:
+            # listen first, changes logged while consuming wake the next wait
+            listen_changes()
+        while True:
+            summary = consume_changes(kwargs["batch_size"])
+            if summary["changes"] or kwargs["verbosity"] > 1:
+                self.stdout.write(str(summary))
+            if kwargs["once"]:
+                break
+            wait_for_changes(kwargs["poll_interval"])
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from hyakumori_crm.cache.denormalize import DENORMALIZED_CACHES
+
+REBUILD_CHUNK_SIZE = 1000
+REBUILD_WORKERS = 4
+
+
+def refresh_chunk(cache, ids):
+    # each thread has its own connection, close it before the thread is reused
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            # cache writes are not changes to feed back
+            cursor.execute("SET LOCAL crm.changelog_skip = 'on'")
+            return cache.refresh(ids)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Rebuild denormalized caches, chunks of rows are refreshed in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "caches",
+            nargs="*",
+            help="caches to rebuild as <app_label.Model>.<name>, all by default",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=REBUILD_CHUNK_SIZE,
+            help="rows refreshed per statement",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=REBUILD_WORKERS,
+            help="chunks refreshed at the same time",
+        )
+
+    def handle(self, *args, **kwargs):
+        chunk_size = kwargs["chunk_size"]
+        selected = set(kwargs["caches"])
+        caches = [
+            cache
+            for label, declared in DENORMALIZED_CACHES.items()
+            for cache in declared
+            if not selected or f"{label}.{cache.name}" in selected
+        ]
+        with ThreadPoolExecutor(max_workers=kwargs["workers"]) as pool:
+            for cache in caches:
+                pks = list(cache.model._base_manager.values_list("id", flat=True))
+                futures = [
+                    pool.submit(refresh_chunk, cache, pks[start : start + chunk_size])
+                    for start in range(0, len(pks), chunk_size)
+                ]
+                updated = sum(future.result() for future in as_completed(futures))
+                self.stdout.write(f"{cache!r}: {updated}/{len(pks)} rows updated")
+
+        self.stdout.write("DONE")
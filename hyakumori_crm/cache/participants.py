@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+
+from hyakumori_crm.crm.models import Contact, CustomerContact, Forest
+
+from .denormalize import DenormalizedCache
+
+
+def full_name_sql(name):
+    return f"concat_ws(' ', {name} ->> 'last_name', {name} ->> 'first_name')"
+
+
+def participant_caches(model, user_link, forest_link, customer_link, contact_link):
+    """
+    user_cache, forest_cache and customer_cache of a resource with users,
+    forests and customers attached, i.e. archives and postal histories
+    :param model: resource model
+    :param user_link: relation model to users, the other links likewise
+    """
+    parent = model._meta.model_name + "_id"
+    user_table = get_user_model()._meta.db_table
+    user_name = "concat(u.last_name, ' ', u.first_name)"
+    user_cache = DenormalizedCache(
+        model,
+        "user_cache",
+        from_sql=(
+            f"{user_link._meta.db_table} l "
+            f"JOIN {user_table} u ON u.id = l.user_id"
+        ),
+        parent_column=f"l.{parent}",
+        aggregates=[
+            ("count", "count(l.id)", 0),
+            (
+                "list",
+                f"json_agg(json_build_object('user_id', l.user_id, 'full_name', "
+                f"{user_name}) ORDER BY l.created_at)",
+                [],
+            ),
+            ("repr", f"string_agg({user_name}, ',' ORDER BY l.created_at)", None),
+        ],
+        depends_on={"user": ("l.user_id", get_user_model())},
+    )
+    forest_cache = DenormalizedCache(
+        model,
+        "forest_cache",
+        from_sql=f"{forest_link._meta.db_table} l "
+        f"JOIN {Forest._meta.db_table} f ON f.id = l.forest_id",
+        parent_column=f"l.{parent}",
+        aggregates=[
+            ("count", "count(l.id)", 0),
+            (
+                "list",
+                "json_agg(json_build_object('forest__internal_id', f.internal_id) "
+                "ORDER BY l.created_at)",
+                [],
+            ),
+            ("repr", "string_agg(f.internal_id, ',' ORDER BY l.created_at)", None),
+        ],
+        depends_on={"forest": ("l.forest_id", Forest)},
+    )
+    # a customer is listed once per contact attached to it in the resource
+    customer_link_column = customer_link._meta.model_name + "_id"
+    customer_cache = DenormalizedCache(
+        model,
+        "customer_cache",
+        from_sql=f"{customer_link._meta.db_table} l "
+        f"LEFT JOIN {contact_link._meta.db_table} lc "
+        f"ON lc.{customer_link_column} = l.id AND lc.deleted IS NULL "
+        f"LEFT JOIN {CustomerContact._meta.db_table} cc "
+        "ON cc.id = lc.customercontact_id "
+        f"LEFT JOIN {Contact._meta.db_table} c ON c.id = cc.contact_id",
+        parent_column=f"l.{parent}",
+        aggregates=[
+            ("count", "count(DISTINCT l.id)", 0),
+            (
+                "list",
+                "json_agg(json_build_object('customer__id', l.customer_id, "
+                "'customer__name_kanji', c.name_kanji, "
+                "'customer__name_kana', c.name_kana) ORDER BY l.created_at)",
+                [],
+            ),
+            (
+                "repr",
+                f"string_agg({full_name_sql('c.name_kanji')}, ',' "
+                "ORDER BY l.created_at) FILTER (WHERE c.id IS NOT NULL)",
+                None,
+            ),
+        ],
+        depends_on={"contact": ("c.id", Contact)},
+    )
+    return user_cache, forest_cache, customer_cache
@@ -0,0 +1,136 @@
+import threading
+import time
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+# seconds a worker trusts its copy of a table before checking its version
+REFERENCE_CHECK_INTERVAL = 1
+
+
+class ReferenceTable:
+    """
+    All rows of a small, rarely written table kept in process memory.
+    Writes bump a version key in redis, other workers reload the table on
+    their next lookup. Returned instances are shared, do not modify them.
+    """
+
+    def __init__(self, model_label):
+        self.model_label = model_label
+        self.version_key = f"reference_version:{model_label}"
+        self._lock = threading.Lock()
+        # (rows, indexes of rows by lookup fields), swapped as a whole
+        self._state = None
+        self._version = None
+        self._checked_at = 0
+        # set in a thread which wrote the table until its transaction ends
+        self._local = threading.local()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def _is_dirty(self):
+        if not getattr(self._local, "dirty", False):
+            return False
+        if not transaction.get_connection().in_atomic_block:
+            # the write was rolled back, its commit callback never ran
+            self.clear()
+            return False
+        return True
+
+    def _load(self):
+        if self._is_dirty():
+            # uncommitted rows must not reach the copy shared by the threads
+            return list(self.model.objects.all()), {}
+        now = time.monotonic()
+        state = self._state
+        if state is not None and now - self._checked_at < REFERENCE_CHECK_INTERVAL:
+            return state
+        with self._lock:
+            version = self._get_version()
+            if self._state is None or version is None or version != self._version:
+                self._state = (list(self.model.objects.all()), {})
+                self._version = version
+            self._checked_at = now
+            return self._state
+
+    def _get_version(self):
+        """
+        Write version shared by the workers, None when the cache cannot
+        tell, e.g. a dummy cache or redis being down, the copy is then only
+        trusted for REFERENCE_CHECK_INTERVAL
+        """
+        try:
+            cache.add(self.version_key, 0, None)
+            return cache.get(self.version_key)
+        except Exception:
+            return None
+
+    def all(self):
+        return list(self._load()[0])
+
+    def get(self, **lookup):
+        fields = tuple(sorted(lookup))
+        rows, indexes = self._load()
+        index = indexes.get(fields)
+        if index is None:
+            index = {}
+            for row in rows:
+                index.setdefault(tuple(getattr(row, f) for f in fields), row)
+            indexes[fields] = index
+        try:
+            return index[tuple(lookup[f] for f in fields)]
+        except KeyError:
+            raise self.model.DoesNotExist(
+                f"{self.model_label} matching {lookup} does not exist."
+            )
+
+    def as_dict(self, key_field, value_field):
+        return {
+            getattr(row, key_field): getattr(row, value_field)
+            for row in self._load()[0]
+        }
+
+    def clear(self):
+        """Drop the copy of this process only"""
+        self._state = None
+        self._local.dirty = False
+
+    def invalidate(self):
+        """Make every worker reload the table"""
+        self.clear()
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, 1, None)
+
+    def invalidate_on_commit(self):
+        """
+        After a write, the writing thread queries the table until the
+        transaction ends, every worker reloads it once committed
+        """
+        self._local.dirty = True
+        transaction.on_commit(self.invalidate)
+
+
+contract_types = ReferenceTable("contracts.ContractType")
+message_templates = ReferenceTable("crm.MessageTemplate")
+content_types = ReferenceTable("contenttypes.ContentType")
+tag_settings = ReferenceTable("tags.TagSetting")
+
+REFERENCE_TABLES = {
+    table.model_label: table
+    for table in [contract_types, message_templates, content_types, tag_settings]
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_reference_table(sender, **kwargs):
+    table = REFERENCE_TABLES.get(sender._meta.label)
+    if table is not None:
+        table.invalidate_on_commit()
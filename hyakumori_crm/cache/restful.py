@@ -6,6 +6,8 @@ from hyakumori_crm.cache.archive import refresh_single_archive_cache
 from hyakumori_crm.cache.forest import refresh_customer_forest_cache
 from hyakumori_crm.core.utils import make_success_json
 from hyakumori_crm.crm.models import Archive, Forest
+from hyakumori_crm.geoserver import cache as geoserver_cache
+from hyakumori_crm.permissions import IsAdminUser
 
 
 @api_view(["POST"])
@@ -24,3 +26,10 @@ def reload_forest_cache(request):
     forest_ids = request.data.get("forest_ids", [])
     async_task(refresh_customer_forest_cache, forest_ids)
     return make_success_json(data=dict(msg="done"))
+
+
+@api_view(["DELETE"])
+@permission_classes([IsAdminUser])
+def purge_geoserver_cache(request):
+    geoserver_cache.purge()
+    return make_success_json(data=dict(msg="done"))
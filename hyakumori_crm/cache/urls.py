@@ -1,6 +1,10 @@
 from django.urls import path
 
-from .restful import reload_single_archive_cache, reload_forest_cache
+from .restful import (
+    purge_geoserver_cache,
+    reload_forest_cache,
+    reload_single_archive_cache,
+)
 
 api_urls = [
     path(
@@ -9,4 +13,7 @@ api_urls = [
         name="reload-single-archive-cache",
     ),
     path("cache/forests", view=reload_forest_cache, name="reload-forest-cache",),
+    path(
+        "cache/geoserver", view=purge_geoserver_cache, name="purge-geoserver-cache",
+    ),
 ]
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
 
+from hyakumori_crm.cache.reference import contract_types
 from hyakumori_crm.core.permissions import AdminGroupPermission
 from ..crm.schemas.contract import ContractTypeStatus
 
@@ -37,4 +38,6 @@ class ContractTypeViewSets(ModelViewSet):
                 "attributes || jsonb_build_object('assignable', %s)", params=[active]
             )
         )
+        # update() sends no post_save
+        contract_types.invalidate_on_commit()
         return Response({"msg": "OK"})
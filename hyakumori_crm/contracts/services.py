@@ -1,23 +1,22 @@
-from django.core.cache import cache
-
+from hyakumori_crm.cache.reference import contract_types
 from hyakumori_crm.crm.schemas.contract import ContractType as ContractTypeEnum
 
 from .models import ContractType
 
 
 def get_all_contracttypes_map():
-    result_cache = cache.get("get_all_contracttypes_map")
-    if result_cache is not None:
-        return result_cache
-    result = dict(ContractType.objects.values_list("code", "name"))
-    cache.set("get_all_contracttypes_map", result, None)
-    return result
+    return contract_types.as_dict("code", "name")
+
+
+def get_assignable_contracttype_names():
+    return [
+        c.name for c in contract_types.all() if c.attributes.get("assignable", False)
+    ]
 
 
 class ContractService:
     @classmethod
     def setup_contracts(cls):
-        cache.delete("get_all_contracttypes_map")
         for contract_type in ContractTypeEnum:
             if contract_type.name == "fsc":
                 continue
@@ -1,35 +1,113 @@
+import logging
+import time
+
 import arrow
+from django.db import connection, transaction
 
+from hyakumori_crm.cache.counts import invalidate_counts
 from hyakumori_crm.crm.models import Forest
-from django.db import transaction
-
 from hyakumori_crm.crm.schemas.contract import ContractTypeStatus
 
+logger = logging.getLogger(__name__)
+
+EXPIRY_CHUNK_SIZE = 1000
+
+# only negotiated contracts are expired
+EXPIRED_CONTRACT = """
+c ->> 'status' = %(negotiated)s
+AND crm_try_date(c ->> 'end_date') <= %(today)s::date
+"""
+
+# seek on the (status, end_date) index of crm_forestcontract
+EXPIRING_FORESTS = """
+SELECT DISTINCT forest_id FROM crm_forestcontract
+WHERE status = %(negotiated)s
+AND end_date <= %(today)s::date
+AND forest_id > %(last_id)s
+ORDER BY forest_id
+LIMIT %(limit)s
+"""
+
+EXPIRING_CONTRACTS = f"""
+SELECT f.id, f.internal_id, c ->> 'type', c ->> 'end_date'
+FROM crm_forest f
+CROSS JOIN LATERAL jsonb_array_elements(f.contracts) AS c
+WHERE f.id = ANY(%(ids)s::uuid[])
+AND {EXPIRED_CONTRACT}
+ORDER BY f.id
+"""
 
-def process_contract_status(forest, logs):
-    contracts = []
-    for contract in forest.contracts:
-        if contract.get("end_date") is not None \
-           and arrow.get(contract.get("end_date"), "YYYY-MM-DD") < arrow.utcnow()\
-           and contract["status"] == ContractTypeStatus.negotiated:  # only update negotiated status
-            old_status = contract.get("status")
-            contract["status"] = ContractTypeStatus.expired
-            logs.append(
-                f"Updated status of contract {contract.get('type')} of Forest {forest.internal_id} (ID: {forest.id}), "
-                f"from '{old_status}' to '{contract.get('status')}'")
-        contracts.append(contract)
-    forest.contracts = contracts
-    # bypass signal
-    Forest.objects.filter(pk=forest.pk).update(contracts=contracts)
-
-
-def update_status_task():
+# updated without signals, like a queryset update, the crm_forestcontract
+# rows are rewritten by the sync trigger
+EXPIRE_CONTRACTS = f"""
+UPDATE crm_forest AS f
+SET contracts = (
+    SELECT jsonb_agg(
+        CASE WHEN {EXPIRED_CONTRACT}
+        THEN jsonb_set(c, '{{status}}', to_jsonb(%(expired)s::text))
+        ELSE c END
+        ORDER BY i
+    )
+    FROM jsonb_array_elements(f.contracts) WITH ORDINALITY AS e (c, i)
+)
+WHERE f.id = ANY(%(ids)s::uuid[])
+"""
+
+
+def expire_contracts_chunk(cursor, params, dry_run=False):
+    cursor.execute(EXPIRING_CONTRACTS, params)
+    expired = [
+        dict(forest_id=str(row[0]), internal_id=row[1], type=row[2], end_date=row[3])
+        for row in cursor.fetchall()
+    ]
+    if not dry_run:
+        cursor.execute(EXPIRE_CONTRACTS, params)
+    return expired
+
+
+def update_status_task(dry_run=False, chunk_size=EXPIRY_CHUNK_SIZE, today=None):
+    """
+    Set negotiated contracts ended by today to expired, each chunk of
+    forests is updated in its own transaction.
+    :param today: YYYY-MM-DD, defaults to the current UTC date
+    :return: summary of the run
+    """
+    started = time.time()
+    params = dict(
+        today=today or arrow.utcnow().format("YYYY-MM-DD"),
+        negotiated=ContractTypeStatus.negotiated.value,
+        expired=ContractTypeStatus.expired.value,
+        last_id="00000000-0000-0000-0000-000000000000",
+        limit=chunk_size,
+    )
+    summary = dict(
+        date=params["today"], dry_run=dry_run, forests=0, contracts=0, chunks=0
+    )
+    expired = []
     try:
-        logs = []
-        with transaction.atomic():
-            for forest in Forest.objects.iterator():
-                process_contract_status(forest, logs)
-        if len(logs) > 0:
-            print("\n".join(logs))
-    except Exception as e:
-        print(str(e))
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(EXPIRING_FORESTS, params)
+                ids = [str(row[0]) for row in cursor.fetchall()]
+                if not ids:
+                    break
+                params["ids"] = ids
+                chunk_expired = expire_contracts_chunk(cursor, params, dry_run)
+            params["last_id"] = ids[-1]
+            summary["chunks"] += 1
+            summary["forests"] += len(ids)
+            summary["contracts"] += len(chunk_expired)
+            expired += chunk_expired
+            for contract in chunk_expired:
+                logger.info("contract expired: %s", contract)
+    except Exception:
+        logger.exception("contract expiry stopped after %s chunks", summary["chunks"])
+        raise
+    finally:
+        if summary["forests"] and not dry_run:
+            invalidate_counts(Forest._meta.db_table)
+        summary["seconds"] = round(time.time() - started, 3)
+        logger.info("contract expiry summary: %s", summary)
+
+    summary["expired"] = expired
+    return summary
@@ -14,6 +14,7 @@ from pydantic import BaseModel, Field, root_validator, validator
 from querybuilder.fields import SimpleField
 
 from .permissions import ModelPermissions
+from .utils import decode_cursor
 
 
 class StoreDeletedMixin(StoreDeleted):
@@ -160,6 +161,11 @@ class Paginator(BaseModel):
     sort_desc: Sequence[bool] = Field([], alias="sortDesc")
     order_by: Optional[Sequence[str]]
     filters: Optional[Union[Dict[str, Any], FilterSet]]
+    # cursor mode, enabled when after or before is given, an empty string
+    # means first page (after) or last page (before)
+    after: Optional[str]
+    before: Optional[str]
+    with_total: bool = Field(False, alias="withTotal")
 
     MAX_ITEMS: ClassVar = 1000
 
@@ -187,6 +193,22 @@ class Paginator(BaseModel):
             return cls.MAX_ITEMS
         return pre_per_page
 
+    @validator("after", "before")
+    def validate_cursor(cls, cursor):
+        if cursor:
+            decode_cursor(cursor)
+        return cursor
+
+    @root_validator
+    def validate_cursor_direction(cls, values):
+        if values.get("after") is not None and values.get("before") is not None:
+            raise ValueError("after and before can not be used together")
+        return values
+
+    @property
+    def is_cursor_mode(self):
+        return self.after is not None or self.before is not None
+
     @root_validator
     def validate_sort_by(cls, values):
         sort_by = values.get("sort_by")
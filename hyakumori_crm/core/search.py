@@ -0,0 +1,77 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from django.utils.html import escape
+
+# characters of context on each side of the first match in a snippet
+SNIPPET_CONTEXT = 40
+
+
+def quote_lexeme(lexeme):
+    escaped = lexeme.replace("\\", "\\\\").replace("'", "''")
+    return f"'{escaped}'"
+
+
+def bigram_tsquery(text):
+    """
+    tsquery matching documents of crm_bigram_tsvector containing every word
+    of ``text``, a word is the phrase of its overlapping bigrams and a
+    single character the prefix of a bigram
+    """
+    phrases = []
+    for word in text.lower().split():
+        if len(word) == 1:
+            phrases.append(f"{quote_lexeme(word)}:*")
+        else:
+            bigrams = (word[i : i + 2] for i in range(len(word) - 1))
+            phrases.append("(" + " <-> ".join(map(quote_lexeme, bigrams)) + ")")
+    return " & ".join(phrases)
+
+
+class BigramQuery(SearchQuery):
+    """Prebuilt bigram tsquery, parsers and dictionaries do not apply"""
+
+    def __init__(self, text):
+        super().__init__(bigram_tsquery(text))
+
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.get_source_expressions()[-1])
+        return f"{sql}::tsquery", params
+
+
+def bigram_search(queryset, text, vector="search__document"):
+    """
+    Filter on the bigram document of the rows and annotate their search_rank
+    """
+    query = BigramQuery(text)
+    return queryset.filter(**{vector: query}).annotate(
+        search_rank=SearchRank(F(vector), query)
+    )
+
+
+def search_snippet(texts, text, context=SNIPPET_CONTEXT):
+    """
+    Escaped part of the first of ``texts`` containing a searched word, with
+    the word wrapped in <mark>
+    """
+    words = text.lower().split()
+    for value in texts:
+        if not value:
+            continue
+        lowered = value.lower()
+        found = [(lowered.find(w), w) for w in words if w in lowered]
+        if not found:
+            continue
+        start, word = min(found)
+        end = start + len(word)
+        before = value[max(start - context, 0) : start]
+        after = value[end : end + context]
+        return "".join(
+            [
+                "…" if start > context else "",
+                escape(before),
+                f"<mark>{escape(value[start:end])}</mark>",
+                escape(after),
+                "…" if end + context < len(value) else "",
+            ]
+        )
+    return None
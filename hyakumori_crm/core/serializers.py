@@ -0,0 +1,26 @@
+import json
+
+from rest_framework.fields import Field
+
+
+class GeojsonField(Field):
+    """
+    Read only geometry as GeoJSON in EPSG:4326, taken from the
+    ``<field>_geojson`` annotation when the queryset was annotated with it
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        annotation = f"{self.source}_geojson"
+        if hasattr(instance, annotation):
+            return getattr(instance, annotation)
+        geometry = super().get_attribute(instance)
+        if geometry is None:
+            return None
+        return geometry.transform(4326, clone=True).geojson
+
+    def to_representation(self, value):
+        return json.loads(value)
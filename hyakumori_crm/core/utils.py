@@ -1,9 +1,13 @@
+import base64
+import binascii
 import io
+import json
 import logging
 
 from itertools import chain
 
 from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.http import JsonResponse, HttpResponseBadRequest
 
 from hyakumori_crm.crm.restful.paginations import StandardPagination
@@ -51,6 +55,40 @@ def default_paginator():
     return paginator
 
 
+def encode_cursor(*values):
+    """Opaque pagination token for a (sort key, id) position"""
+    raw = json.dumps(values, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def cursor_page(rows, per_page, backward, token, key):
+    """
+    Trim a page fetched with one extra row and build its page info,
+    rows of a backward page come in reverse order.
+    """
+    has_more = len(rows) > per_page
+    rows = list(rows[:per_page])
+    if backward:
+        rows.reverse()
+    page_info = {
+        "has_next_page": bool(token) if backward else has_more,
+        "has_previous_page": has_more if backward else bool(token),
+        "start_cursor": encode_cursor(*key(rows[0])) if rows else None,
+        "end_cursor": encode_cursor(*key(rows[-1])) if rows else None,
+    }
+    return rows, page_info
+
+
 def make_error_json(message: str, status=HttpResponseBadRequest.status_code):
     return JsonResponse(status=status, data=dict(detail=message))
 
@@ -106,5 +144,57 @@ class Echo:
         return self.initial_content.read() + value
 
 
-def clear_maintain_task_id_cache(task=None):
-    cache.delete("maintain_task_id")
+# api paths which are locked for writing while a resource is being imported
+MAINTAIN_RESOURCE_PATHS = {
+    "forests": ("/api/v1/forests",),
+    # customer imports rewrite the customer caches of forests
+    "customers": (
+        "/api/v1/customers",
+        "/api/v1/contacts",
+        "/api/v1/customercontacts",
+        "/api/v1/forests",
+    ),
+}
+
+
+def get_maintain_task_id_key(resource=None):
+    if resource is None:
+        return "maintain_task_id"
+    return f"maintain_task_id:{resource}"
+
+
+def set_maintain_task_id_cache(task_id, resource=None):
+    cache.set(get_maintain_task_id_key(resource), task_id, None)
+
+
+def clear_maintain_task_id_cache(task=None, resource=None):
+    cache.delete(get_maintain_task_id_key(resource))
+
+
+def acquire_maintain_task_id_cache(task_id, resource=None, timeout=None):
+    """Set the maintain lock unless another task holds it, True when set"""
+    return cache.add(get_maintain_task_id_key(resource), task_id, timeout)
+
+
+def release_maintain_task_id_cache(task_id, resource=None):
+    """Clear the maintain lock only while ``task_id`` holds it"""
+    key = get_maintain_task_id_key(resource)
+    if cache.get(key) == task_id:
+        cache.delete(key)
+
+
+def get_maintain_resources():
+    return [
+        resource
+        for resource in MAINTAIN_RESOURCE_PATHS
+        if cache.get(get_maintain_task_id_key(resource)) is not None
+    ]
+
+
+def is_path_in_maintain(path):
+    if cache.get(get_maintain_task_id_key()) is not None:
+        return True
+    for resource in get_maintain_resources():
+        if path.startswith(MAINTAIN_RESOURCE_PATHS[resource]):
+            return True
+    return False
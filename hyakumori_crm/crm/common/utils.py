@@ -1,9 +1,13 @@
+import itertools
 import json
 import random
+import threading
 
 from cryptography.fernet import Fernet
+from django.core.cache import cache
 from django.core.serializers.json import DjangoJSONEncoder
-from sequences import get_next_value
+from django.db import connection, transaction
+from sequences.models import Sequence
 
 key = Fernet.generate_key()
 fernet = Fernet(key)
@@ -36,6 +40,12 @@ def decrypt_string(data, to_dict=True):
         raise DecryptError
 
 
+def format_sequential_id(prefix, index):
+    rand = "{:02d}".format(int(random.random() * 100))
+    formatted_index = "{:08d}".format(index)
+    return f"{prefix}{formatted_index}{rand}"
+
+
 def generate_sequential_id(prefix, id_sequence):
     """
     Generate ids using true sequential index
@@ -45,10 +55,113 @@ def generate_sequential_id(prefix, id_sequence):
     :param id_sequence: name of the sequence
     :return:
     """
-    rand = "{:02d}".format(int(random.random() * 100))
-    index = get_next_value(id_sequence)
-    formatted_index = "{:08d}".format(index)
-    return f"{prefix}{formatted_index}{rand}"
+    return generate_sequential_ids(prefix, id_sequence, 1)[0]
+
+
+def generate_sequential_ids(prefix, id_sequence, count):
+    """
+    Generate ``count`` ids at once, at most one statement is sent to the
+    database whatever the count
+    """
+    return [
+        format_sequential_id(prefix, index)
+        for index in sequence_pool.take(id_sequence, count)
+    ]
+
+
+def reserve_sequence_values(id_sequence, count):
+    """
+    Reserve ``count`` consecutive values of a sequence with one statement,
+    values are numbered like get_next_value, starting at 1.
+    :return: range of the reserved values
+    """
+    if count <= 0:
+        return range(0)
+    table = Sequence._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (name, last) VALUES (%s, %s)
+            ON CONFLICT (name) DO UPDATE SET last = {table}.last + EXCLUDED.last
+            RETURNING last
+            """,
+            [id_sequence, count],
+        )
+        last = cursor.fetchone()[0]
+    return range(last - count + 1, last + 1)
+
+
+def get_sequence_version_key(id_sequence):
+    return f"sequence_version:{id_sequence}"
+
+
+# values reserved at once by a process, values left in a block when the
+# process exits are never used
+SEQUENCE_BLOCK_SIZE = 50
+
+
+class SequencePool:
+    """
+    Blocks of sequence values reserved per process and handed out one by
+    one. A block is kept only once the reservation is committed, values of
+    a rolled back reservation may be reserved again by another process.
+    """
+
+    def __init__(self, block_size=SEQUENCE_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        # sequence name -> (version, iterator over the rest of the block)
+        self._blocks = {}
+
+    def _keep(self, id_sequence, version, values):
+        with self._lock:
+            self._blocks[id_sequence] = (version, values)
+
+    def take(self, id_sequence, count):
+        version = cache.get(get_sequence_version_key(id_sequence), 0)
+        with self._lock:
+            block_version, block = self._blocks.pop(id_sequence, (None, iter(())))
+            if block_version != version:
+                block = iter(())
+            values = list(itertools.islice(block, count))
+            if len(values) == count:
+                self._blocks[id_sequence] = (version, block)
+                return values
+
+        missing = count - len(values)
+        block = iter(
+            reserve_sequence_values(id_sequence, max(missing, self.block_size))
+        )
+        values += itertools.islice(block, missing)
+        transaction.on_commit(lambda: self._keep(id_sequence, version, block))
+        return values
+
+    def clear(self, id_sequence):
+        with self._lock:
+            self._blocks.pop(id_sequence, None)
+
+
+sequence_pool = SequencePool()
+
+
+def bump_sequence_version(id_sequence):
+    try:
+        cache.incr(get_sequence_version_key(id_sequence))
+    except ValueError:
+        cache.set(get_sequence_version_key(id_sequence), 1, None)
+
+
+def reset_sequence(id_sequence):
+    """
+    Restart a sequence from 1, blocks reserved by every process are dropped.
+    The version is bumped right away so other processes stop handing out
+    their blocks and wait on the locked sequence row, and again on commit
+    to drop the blocks reserved meanwhile.
+    """
+    Sequence.objects.filter(name=id_sequence).update(last=0)
+    sequence_pool.clear(id_sequence)
+    bump_sequence_version(id_sequence)
+    transaction.on_commit(lambda: bump_sequence_version(id_sequence))
 
 
 def get_customer_name(name_dict):
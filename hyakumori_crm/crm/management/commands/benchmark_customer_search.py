@@ -0,0 +1,163 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from hyakumori_crm.crm.models import Customer
+from hyakumori_crm.customer.service import (
+    contacts_list_with_search,
+    customercontacts_list_with_search,
+    get_customers,
+)
+
+SEARCH_CASES = ["山田", "ヤマダ", "090-12", "bench-4242", "八幡町", "group:a"]
+
+INSERT_CUSTOMERS = """
+INSERT INTO crm_contact (
+    id, created_at, updated_at, internal_id, attributes, contact_info,
+    name_kanji, name_kana, address, postal_code, telephone, mobilephone, email
+)
+SELECT
+    md5('contact' || i::text)::uuid, now(), now(), NULL, '{}'::jsonb, '{}'::jsonb,
+    jsonb_build_object(
+        'last_name', (ARRAY['山田', '佐藤', '鈴木', '高橋'])[i % 4 + 1],
+        'first_name', (ARRAY['太郎', '花子', '一郎'])[i % 3 + 1]
+    ),
+    jsonb_build_object(
+        'last_name', (ARRAY['ヤマダ', 'サトウ', 'スズキ', 'タカハシ'])[i % 4 + 1],
+        'first_name', (ARRAY['タロウ', 'ハナコ', 'イチロウ'])[i % 3 + 1]
+    ),
+    jsonb_build_object(
+        'prefecture', '岐阜県',
+        'municipality', (ARRAY['郡上市', '高山市', '下呂市', '関市'])[i % 4 + 1],
+        'sector', (ARRAY['八幡町', '白鳥町', '大和町'])[i % 3 + 1] || (i % 97)::text
+    ),
+    lpad((i % 10000000)::text, 7, '0'),
+    '0575-' || lpad((i % 10000)::text, 4, '0'),
+    '090-' || lpad((i % 100000000)::text, 8, '0'),
+    'bench' || i || '@example.com'
+FROM generate_series(%(start)s, %(stop)s) AS i;
+
+INSERT INTO crm_customer (
+    id, created_at, updated_at, internal_id, attributes, business_id,
+    name_kanji, name_kana, address, banking, tags
+)
+SELECT
+    md5('customer' || i::text)::uuid, now(), now(), 'bench-' || i, '{}'::jsonb,
+    'bench-' || i, '{}'::jsonb, '{}'::jsonb, '{}'::jsonb, '{}'::jsonb,
+    jsonb_build_object('group', (ARRAY['a', 'b', 'c'])[i % 3 + 1])
+FROM generate_series(%(start)s, %(stop)s) AS i;
+
+INSERT INTO crm_customercontact (
+    id, created_at, updated_at, attributes, customer_id, contact_id, is_basic
+)
+SELECT
+    md5('customercontact' || i::text)::uuid, now(), now(), '{}'::jsonb,
+    md5('customer' || i::text)::uuid, md5('contact' || i::text)::uuid, true
+FROM generate_series(%(start)s, %(stop)s) AS i;
+"""
+
+# customer search before search_document, kept to compare against
+LEGACY_CUSTOMER_SEARCH = """with self_contact as (
+    select c.*, cc.customer_id
+    from crm_contact c
+    join crm_customercontact cc
+    on c.id=cc.contact_id
+    where cc.is_basic = true
+    and cc.deleted is null
+    and c.deleted is null
+)
+select crm_customer.*, count(A0.id) as forests_count
+from crm_customer
+join self_contact sc
+on sc.customer_id = crm_customer.id
+left outer join crm_forestcustomer A0
+on crm_customer.id = A0.customer_id
+where crm_customer.deleted is null
+and (concat(sc.name_kanji->>'last_name', ' ',
+    sc.name_kanji->>'first_name') ilike %(search)s
+or concat(sc.name_kana->>'last_name', ' ',
+    sc.name_kana->>'first_name') ilike %(search)s
+or crm_customer.internal_id ilike %(search)s
+or sc.email ilike %(search)s
+or sc.telephone ilike %(search)s
+or sc.mobilephone ilike %(search)s
+or concat(sc.postal_code, ' ', sc.address->>'sector', ' ',
+    sc.address->>'municipality', ' ', sc.address->>'prefecture') ilike %(search)s
+or (
+    select string_agg(tags_repr, ',') tags_repr
+    from (
+        select concat_ws(':', key, value) as tags_repr
+        from jsonb_each_text(tags) as x
+        where value is not null
+    ) as ss
+)::text ilike %(search)s)
+group by crm_customer.id
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure customer search latency on generated customers, rolled back after"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=50000,
+            help="total number of customers to measure at",
+        )
+        parser.add_argument(
+            "--runs", type=int, default=30, help="runs per search and query"
+        )
+
+    def percentile(self, timings, p):
+        timings = sorted(timings)
+        return timings[min(len(timings) - 1, int(len(timings) * p))]
+
+    def measure(self, func, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def legacy_customers(self, search):
+        with connection.cursor() as cursor:
+            cursor.execute(LEGACY_CUSTOMER_SEARCH, {"search": f"%{search}%"})
+            cursor.fetchall()
+
+    def handle(self, *args, **kwargs):
+        runs = kwargs["runs"]
+        queries = {
+            "customers_legacy": self.legacy_customers,
+            # raw querysets fetch every row, like the legacy query
+            "customers": lambda s: list(get_customers(s)),
+            "contacts": lambda s: list(contacts_list_with_search(s)[:10]),
+            "customercontacts": lambda s: list(
+                customercontacts_list_with_search(s)[:10]
+            ),
+        }
+        with transaction.atomic():
+            current = Customer.objects.count()
+            if kwargs["size"] > current:
+                self.stdout.write(f"generating {kwargs['size'] - current} customers...")
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        INSERT_CUSTOMERS, {"start": current + 1, "stop": kwargs["size"]}
+                    )
+                    for table in ["crm_contact", "crm_customer", "crm_customercontact"]:
+                        cursor.execute(f"ANALYZE {table}")
+                current = kwargs["size"]
+            self.stdout.write(f"--- {current} customers, {runs} runs ---")
+            for search in SEARCH_CASES:
+                for name, query in queries.items():
+                    timings = self.measure(lambda: query(search), runs)
+                    self.stdout.write(
+                        f"{search:<12} {name:<18} "
+                        f"p50 {statistics.median(timings):8.1f}ms  "
+                        f"p95 {self.percentile(timings, 0.95):8.1f}ms"
+                    )
+            transaction.set_rollback(True)
+        self.stdout.write("DONE, generated customers rolled back")
@@ -0,0 +1,114 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from hyakumori_crm.crm.models import Forest
+from hyakumori_crm.forest.filters import ForestFilter
+
+FILTER_CASES = {
+    "municipality": {"cadastral__municipality": "郡上"},
+    "sector": {"cadastral__sector": "八幡"},
+    "lot_number": {"land_attributes__地番本番": "123"},
+    "owner_name_kanji": {"owner__name_kanji": "山田"},
+    "contract_status": {"contract_status": "契約済"},
+    "fsc_start_date": {"fsc_start_date": "2020-04"},
+    "combined": {
+        "cadastral__municipality": "郡上",
+        "owner__name_kana": "ヤマダ",
+        "contract_type": "長期",
+    },
+}
+
+INSERT_FORESTS = """
+INSERT INTO crm_forest (
+    id, created_at, updated_at, internal_id, attributes, cadastral, owner,
+    contracts, tags, land_attributes, forest_attributes
+)
+SELECT
+    md5(random()::text || i::text)::uuid, now(), now(), 'bench-' || i,
+    jsonb_build_object('customer_cache', jsonb_build_object(
+        'repr_name_kanji', (ARRAY['山田', '佐藤', '鈴木', '高橋'])[i % 4 + 1]
+            || '　' || (ARRAY['太郎', '花子', '一郎'])[i % 3 + 1],
+        'repr_name_kana', (ARRAY['ヤマダ', 'サトウ', 'スズキ', 'タカハシ'])[i % 4 + 1]
+            || '　' || (ARRAY['タロウ', 'ハナコ', 'イチロウ'])[i % 3 + 1]
+    )),
+    jsonb_build_object(
+        'prefecture', '岐阜県',
+        'municipality', (ARRAY['郡上市', '高山市', '下呂市', '関市'])[i % 4 + 1],
+        'sector', (ARRAY['八幡町', '白鳥町', '大和町'])[i % 3 + 1] || (i % 97)::text,
+        'subsector', ''
+    ),
+    '{}'::jsonb,
+    jsonb_build_array(
+        jsonb_build_object(
+            'type', (ARRAY['長期契約', '短期契約', '未契約'])[i % 3 + 1],
+            'status', (ARRAY['契約済', '交渉中', '期限切れ'])[i % 3 + 1],
+            'start_date', to_char(date '2015-01-01' + i % 3000, 'YYYY-MM-DD'),
+            'end_date', to_char(date '2025-01-01' + i % 3000, 'YYYY-MM-DD')
+        ),
+        jsonb_build_object(
+            'type', 'FSC認証',
+            'status', (ARRAY['加入', '未加入'])[i % 2 + 1],
+            'start_date', to_char(date '2018-01-01' + i % 1500, 'YYYY-MM-DD')
+        )
+    ),
+    '{}'::jsonb,
+    jsonb_build_object('地番本番', i % 5000, '地番支番', i % 7),
+    '{}'::jsonb
+FROM generate_series(%s, %s) AS i
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure ForestFilter latency on generated forests, rolled back after"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[100000, 1000000],
+            help="total number of forests to measure at",
+        )
+        parser.add_argument(
+            "--runs", type=int, default=30, help="runs per filter and size"
+        )
+
+    def percentile(self, timings, p):
+        timings = sorted(timings)
+        return timings[min(len(timings) - 1, int(len(timings) * p))]
+
+    def measure(self, data, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            forest_filter = ForestFilter(data)
+            forest_filter.is_valid()
+            list(forest_filter.qs.order_by("internal_id")[:10])
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def handle(self, *args, **kwargs):
+        runs = kwargs["runs"]
+        with transaction.atomic():
+            current = Forest.objects.count()
+            for size in sorted(kwargs["sizes"]):
+                if size > current:
+                    self.stdout.write(f"generating {size - current} forests...")
+                    with connection.cursor() as cursor:
+                        cursor.execute(INSERT_FORESTS, [current + 1, size])
+                        cursor.execute("ANALYZE crm_forest")
+                        cursor.execute("ANALYZE crm_forestsearch")
+                    current = size
+                self.stdout.write(f"--- {current} forests, {runs} runs ---")
+                for name, data in FILTER_CASES.items():
+                    timings = self.measure(data, runs)
+                    self.stdout.write(
+                        f"{name:<18} "
+                        f"p50 {statistics.median(timings):8.1f}ms  "
+                        f"p95 {self.percentile(timings, 0.95):8.1f}ms"
+                    )
+            transaction.set_rollback(True)
+        self.stdout.write("DONE, generated forests rolled back")
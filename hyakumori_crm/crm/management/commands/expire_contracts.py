@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from hyakumori_crm.contracts.tasks import EXPIRY_CHUNK_SIZE, update_status_task
+
+
+class Command(BaseCommand):
+    help = "Expire negotiated contracts which ended, as the daily task does"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only report the contracts which would expire",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPIRY_CHUNK_SIZE,
+            help="forests updated per transaction",
+        )
+        parser.add_argument("--date", help="expire as of this day, YYYY-MM-DD")
+
+    def handle(self, *args, **kwargs):
+        summary = update_status_task(
+            dry_run=kwargs["dry_run"],
+            chunk_size=kwargs["chunk_size"],
+            today=kwargs["date"],
+        )
+        self.stdout.write(json.dumps(summary, ensure_ascii=False, indent=2))
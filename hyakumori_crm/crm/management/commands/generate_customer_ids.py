@@ -1,11 +1,14 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from sequences.models import Sequence
+from django.db.models import Q
 
+from hyakumori_crm.cache.counts import invalidate_counts
 from hyakumori_crm.crm.common.constants import CUSTOMER_ID_PREFIX, CUSTOMER_ID_SEQUENCE
-from hyakumori_crm.crm.common.utils import generate_sequential_id
+from hyakumori_crm.crm.common.utils import generate_sequential_ids, reset_sequence
 from hyakumori_crm.crm.models import Customer
 
+GENERATE_IDS_CHUNK_SIZE = 2000
+
 
 class Command(BaseCommand):
     help = "Generate customer ids"
@@ -23,26 +26,43 @@ class Command(BaseCommand):
             action="store_false",
             help="disable recreate, only insert for empty value",
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=GENERATE_IDS_CHUNK_SIZE,
+            help="customers updated per statement",
+        )
         parser.set_defaults(recreate=False)
 
     def handle(self, *args, **kwargs):
         recreate = kwargs.get("recreate")
+        chunk_size = kwargs["chunk_size"]
         qs = Customer.objects.order_by(
             "name_kanji__last_name", "name_kanji__first_name"
         )
+        if not recreate:
+            qs = qs.filter(Q(business_id__isnull=True) | Q(business_id=""))
         with transaction.atomic():
             if recreate:
-                Sequence.objects.filter(name=CUSTOMER_ID_SEQUENCE).update(last=0)
-            for customer in qs.iterator():
-                if (
-                    not customer.business_id
-                    or len(customer.business_id) == 0
-                    or recreate
-                ):
-                    customer.business_id = generate_sequential_id(
-                        CUSTOMER_ID_PREFIX, CUSTOMER_ID_SEQUENCE
-                    )
-                    customer.save(update_fields=["business_id"])
-                    self.stdout.write(customer.business_id)
+                reset_sequence(CUSTOMER_ID_SEQUENCE)
+            pks = list(qs.values_list("id", flat=True))
+            for start in range(0, len(pks), chunk_size):
+                chunk = pks[start : start + chunk_size]
+                business_ids = generate_sequential_ids(
+                    CUSTOMER_ID_PREFIX, CUSTOMER_ID_SEQUENCE, len(chunk)
+                )
+                Customer.objects.bulk_update(
+                    [
+                        Customer(id=pk, business_id=business_id)
+                        for pk, business_id in zip(chunk, business_ids)
+                    ],
+                    fields=["business_id"],
+                )
+                if kwargs["verbosity"] > 1:
+                    for business_id in business_ids:
+                        self.stdout.write(business_id)
+                self.stdout.write(f"{start + len(chunk)}/{len(pks)} customers")
+            # bulk_update sends no post_save
+            invalidate_counts(Customer._meta.db_table)
 
         self.stdout.write("DONE")
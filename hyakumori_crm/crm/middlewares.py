@@ -4,7 +4,8 @@ from django.db.models import F
 from rest_framework.response import Response
 from rest_framework.exceptions import APIException
 from django_q.models import Task
-from django.core.cache import cache
+
+from hyakumori_crm.core.utils import is_path_in_maintain
 
 
 class ServiceUnavailable(APIException):
@@ -19,7 +20,7 @@ def in_maintain_middleware(get_response):
             "GET",
             "OPTIONS",
         ]:
-            if cache.get("maintain_task_id") is not None:
+            if is_path_in_maintain(request.path):
                 return JsonResponse({"detail": "Service Unavailable"}, status=503)
         resp = get_response(request)
 
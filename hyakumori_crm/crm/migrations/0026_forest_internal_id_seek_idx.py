@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-18 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0025_auto_20210316_1548'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='forest',
+            index=models.Index(fields=['internal_id', 'id'], name='forest_internal_id_seek_idx'),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 3.1.14 on 2026-10-18 03:40
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.db.models.deletion
+
+SEARCH_COLUMNS = [
+    ('municipality', "{row}.cadastral ->> 'municipality'"),
+    ('sector', "{row}.cadastral ->> 'sector'"),
+    ('lot_number', "{row}.land_attributes ->> '地番本番'"),
+    ('sub_lot_number', "{row}.land_attributes ->> '地番支番'"),
+    ('owner_name_kanji', "{row}.attributes -> 'customer_cache' ->> 'repr_name_kanji'"),
+    ('owner_name_kana', "{row}.attributes -> 'customer_cache' ->> 'repr_name_kana'"),
+    ('contract_type', "{row}.contracts -> 0 ->> 'type'"),
+    ('contract_status', "{row}.contracts -> 0 ->> 'status'"),
+    ('contract_start_date', "{row}.contracts -> 0 ->> 'start_date'"),
+    ('contract_end_date', "{row}.contracts -> 0 ->> 'end_date'"),
+    ('fsc_status', "{row}.contracts -> -1 ->> 'status'"),
+    ('fsc_start_date', "{row}.contracts -> -1 ->> 'start_date'"),
+]
+
+columns = ', '.join(name for name, _ in SEARCH_COLUMNS)
+updates = ', '.join(f'{name} = EXCLUDED.{name}' for name, _ in SEARCH_COLUMNS)
+
+
+def row_values(row):
+    return ', '.join(value.format(row=row) for _, value in SEARCH_COLUMNS)
+
+
+CREATE_TRIGGER = f"""
+CREATE OR REPLACE FUNCTION crm_forest_search_sync() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO crm_forestsearch (forest_id, {columns})
+    VALUES (NEW.id, {row_values('NEW')})
+    ON CONFLICT (forest_id) DO UPDATE SET {updates};
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crm_forest_search_sync
+AFTER INSERT OR UPDATE OF cadastral, land_attributes, contracts, attributes
+ON crm_forest FOR EACH ROW EXECUTE PROCEDURE crm_forest_search_sync();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS crm_forest_search_sync ON crm_forest;
+DROP FUNCTION IF EXISTS crm_forest_search_sync();
+"""
+
+BACKFILL = f"""
+INSERT INTO crm_forestsearch (forest_id, {columns})
+SELECT f.id, {row_values('f')} FROM crm_forest f
+ON CONFLICT (forest_id) DO NOTHING;
+"""
+
+# django icontains compiles to UPPER(column::text) LIKE UPPER(%s)
+CREATE_INDEXES = ''.join(
+    f'CREATE INDEX crm_forestsearch_{name}_trgm '
+    f'ON crm_forestsearch USING gin (UPPER({name}) gin_trgm_ops);\n'
+    for name, _ in SEARCH_COLUMNS
+)
+
+DROP_INDEXES = ''.join(
+    f'DROP INDEX IF EXISTS crm_forestsearch_{name}_trgm;\n'
+    for name, _ in SEARCH_COLUMNS
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0026_forest_internal_id_seek_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='ForestSearch',
+            fields=[
+                ('forest', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='crm.forest')),
+                ('municipality', models.TextField(null=True)),
+                ('sector', models.TextField(null=True)),
+                ('lot_number', models.TextField(null=True)),
+                ('sub_lot_number', models.TextField(null=True)),
+                ('owner_name_kanji', models.TextField(null=True)),
+                ('owner_name_kana', models.TextField(null=True)),
+                ('contract_type', models.TextField(null=True)),
+                ('contract_status', models.TextField(null=True)),
+                ('contract_start_date', models.TextField(null=True)),
+                ('contract_end_date', models.TextField(null=True)),
+                ('fsc_status', models.TextField(null=True)),
+                ('fsc_start_date', models.TextField(null=True)),
+            ],
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+        migrations.RunSQL(CREATE_INDEXES, DROP_INDEXES),
+    ]
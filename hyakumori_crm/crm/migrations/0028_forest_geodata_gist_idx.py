@@ -0,0 +1,26 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0027_forestsearch'),
+    ]
+
+    operations = [
+        # the spatial index created for the former location column is not
+        # guaranteed to have survived its renames and srid changes
+        migrations.RunSQL(
+            sql=[
+                'DROP INDEX IF EXISTS crm_forest_location_id;',
+                'CREATE INDEX IF NOT EXISTS crm_forest_geodata_gist_idx ON crm_forest USING GIST (geodata);',
+                'ANALYZE crm_forest;',
+            ],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS crm_forest_geodata_gist_idx;',
+                'CREATE INDEX IF NOT EXISTS crm_forest_location_id ON crm_forest USING GIST (geodata);',
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.1.14 on 2026-10-18 06:20
+
+from django.db import migrations
+
+# earliest end date of the negotiated (契約済) contracts of a forest, dates
+# are YYYY-MM-DD strings so text order is date order
+CREATE_FUNCTION = r"""
+CREATE OR REPLACE FUNCTION crm_forest_negotiated_end_date(contracts jsonb)
+RETURNS text AS $$
+    SELECT min(c ->> 'end_date')
+    FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(contracts) = 'array' THEN contracts ELSE '[]' END
+    ) AS c
+    WHERE c ->> 'status' = '契約済'
+    AND c ->> 'end_date' ~ '^\d{4}-\d{2}-\d{2}$'
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE INDEX crm_forest_negotiated_end_date_idx
+ON crm_forest (crm_forest_negotiated_end_date(contracts))
+WHERE crm_forest_negotiated_end_date(contracts) IS NOT NULL;
+"""
+
+DROP_FUNCTION = """
+DROP INDEX IF EXISTS crm_forest_negotiated_end_date_idx;
+DROP FUNCTION IF EXISTS crm_forest_negotiated_end_date(jsonb);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0028_forest_geodata_gist_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=CREATE_FUNCTION, reverse_sql=DROP_FUNCTION),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 3.1.14 on 2026-10-18 07:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+CREATE_TRIGGER = r"""
+CREATE OR REPLACE FUNCTION crm_try_date(value text) RETURNS date AS $$
+BEGIN
+    IF value !~ '^\d{4}-\d{2}-\d{2}$' THEN
+        RETURN NULL;
+    END IF;
+    RETURN value::date;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION crm_forest_contracts_rows(p_forest_id uuid, p_contracts jsonb)
+RETURNS TABLE (
+    forest_id uuid, position smallint, is_last boolean, type varchar,
+    status varchar, start_date date, end_date date
+) AS $$
+    SELECT p_forest_id, (e.i - 1)::smallint, e.i = jsonb_array_length(p_contracts),
+        e.c ->> 'type', e.c ->> 'status',
+        crm_try_date(e.c ->> 'start_date'), crm_try_date(e.c ->> 'end_date')
+    FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(p_contracts) = 'array' THEN p_contracts ELSE '[]' END
+    ) WITH ORDINALITY AS e (c, i)
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION crm_forest_contracts_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.contracts IS NOT DISTINCT FROM OLD.contracts THEN
+        RETURN NULL;
+    END IF;
+    DELETE FROM crm_forestcontract WHERE crm_forestcontract.forest_id = NEW.id;
+    INSERT INTO crm_forestcontract (
+        forest_id, position, is_last, type, status, start_date, end_date
+    )
+    SELECT * FROM crm_forest_contracts_rows(NEW.id, NEW.contracts);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crm_forest_contracts_sync
+AFTER INSERT OR UPDATE OF contracts
+ON crm_forest FOR EACH ROW EXECUTE PROCEDURE crm_forest_contracts_sync();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS crm_forest_contracts_sync ON crm_forest;
+DROP FUNCTION IF EXISTS crm_forest_contracts_sync();
+DROP FUNCTION IF EXISTS crm_forest_contracts_rows(uuid, jsonb);
+DROP FUNCTION IF EXISTS crm_try_date(text);
+"""
+
+BACKFILL = """
+INSERT INTO crm_forestcontract (
+    forest_id, position, is_last, type, status, start_date, end_date
+)
+SELECT r.* FROM crm_forest f, crm_forest_contracts_rows(f.id, f.contracts) r;
+ANALYZE crm_forestcontract;
+"""
+
+# expiry now seeks on crm_forestcontract
+DROP_NEGOTIATED_END_DATE = """
+DROP INDEX IF EXISTS crm_forest_negotiated_end_date_idx;
+DROP FUNCTION IF EXISTS crm_forest_negotiated_end_date(jsonb);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0029_forest_negotiated_end_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForestContract',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.SmallIntegerField()),
+                ('is_last', models.BooleanField(default=False)),
+                ('type', models.CharField(max_length=255, null=True)),
+                ('status', models.CharField(max_length=255, null=True)),
+                ('start_date', models.DateField(null=True)),
+                ('end_date', models.DateField(null=True)),
+                ('forest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contract_set', to='crm.forest')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='forestcontract',
+            index=models.Index(fields=['type', 'status', 'end_date'], name='forestcontract_type_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forestcontract',
+            index=models.Index(fields=['status', 'end_date'], name='forestcontract_status_end_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='forestcontract',
+            constraint=models.UniqueConstraint(fields=('forest', 'position'), name='unique_forest_contract_position'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+        migrations.RunSQL(DROP_NEGOTIATED_END_DATE, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,156 @@
+# Generated by Django 3.1.14 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+CREATE_FUNCTIONS = r"""
+CREATE OR REPLACE FUNCTION crm_contact_search_document(c crm_contact)
+RETURNS text AS $$
+    SELECT concat_ws(E'\n',
+        concat(c.name_kanji ->> 'last_name', ' ', c.name_kanji ->> 'first_name'),
+        concat(c.name_kana ->> 'last_name', ' ', c.name_kana ->> 'first_name'),
+        c.email, c.telephone, c.mobilephone,
+        concat(c.postal_code, ' ', c.address ->> 'sector', ' ',
+            c.address ->> 'municipality', ' ', c.address ->> 'prefecture')
+    )
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION crm_customer_search_document(
+    p_customer_id uuid, p_internal_id text, p_tags jsonb
+) RETURNS text AS $$
+    SELECT concat_ws(E'\n',
+        p_internal_id,
+        (SELECT string_agg(concat_ws(':', key, value), ',')
+            FROM jsonb_each_text(p_tags) WHERE value IS NOT NULL),
+        (SELECT c.search_document FROM crm_contact c
+            JOIN crm_customercontact cc ON cc.contact_id = c.id
+            WHERE cc.customer_id = p_customer_id AND cc.is_basic
+            AND cc.deleted IS NULL AND c.deleted IS NULL
+            LIMIT 1)
+    )
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION crm_customer_search_refresh(p_customer_id uuid)
+RETURNS void AS $$
+    UPDATE crm_customer
+    SET search_document = crm_customer_search_document(id, internal_id, tags)
+    WHERE id = p_customer_id;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION crm_contact_search_sync() RETURNS trigger AS $$
+BEGIN
+    NEW.search_document := crm_contact_search_document(NEW);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crm_contact_search_sync
+BEFORE INSERT OR UPDATE ON crm_contact
+FOR EACH ROW EXECUTE PROCEDURE crm_contact_search_sync();
+"""
+
+BACKFILL = """
+UPDATE crm_contact SET search_document = crm_contact_search_document(crm_contact);
+UPDATE crm_customer
+SET search_document = crm_customer_search_document(id, internal_id, tags);
+"""
+
+CREATE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION crm_customer_search_sync() RETURNS trigger AS $$
+BEGIN
+    NEW.search_document := crm_customer_search_document(
+        NEW.id, NEW.internal_id, NEW.tags
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crm_customer_search_sync
+BEFORE INSERT OR UPDATE OF internal_id, tags ON crm_customer
+FOR EACH ROW EXECUTE PROCEDURE crm_customer_search_sync();
+
+CREATE OR REPLACE FUNCTION crm_contact_customer_search_sync() RETURNS trigger AS $$
+BEGIN
+    PERFORM crm_customer_search_refresh(cc.customer_id)
+    FROM crm_customercontact cc
+    WHERE cc.contact_id = NEW.id AND cc.is_basic;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crm_contact_customer_search_sync
+AFTER UPDATE ON crm_contact FOR EACH ROW
+WHEN (
+    OLD.search_document IS DISTINCT FROM NEW.search_document
+    OR OLD.deleted IS DISTINCT FROM NEW.deleted
+)
+EXECUTE PROCEDURE crm_contact_customer_search_sync();
+
+CREATE OR REPLACE FUNCTION crm_customercontact_search_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        IF OLD.is_basic THEN
+            PERFORM crm_customer_search_refresh(OLD.customer_id);
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF NEW.is_basic THEN
+            PERFORM crm_customer_search_refresh(NEW.customer_id);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crm_customercontact_search_sync
+AFTER INSERT OR UPDATE OF customer_id, contact_id, is_basic, deleted OR DELETE
+ON crm_customercontact
+FOR EACH ROW EXECUTE PROCEDURE crm_customercontact_search_sync();
+
+-- django icontains compiles to UPPER(column::text) LIKE UPPER(%s)
+CREATE INDEX crm_customer_search_document_trgm
+ON crm_customer USING gin (UPPER(search_document) gin_trgm_ops);
+CREATE INDEX crm_contact_search_document_trgm
+ON crm_contact USING gin (UPPER(search_document) gin_trgm_ops);
+"""
+
+DROP_TRIGGERS = """
+DROP INDEX IF EXISTS crm_customer_search_document_trgm;
+DROP INDEX IF EXISTS crm_contact_search_document_trgm;
+DROP TRIGGER IF EXISTS crm_customercontact_search_sync ON crm_customercontact;
+DROP FUNCTION IF EXISTS crm_customercontact_search_sync();
+DROP TRIGGER IF EXISTS crm_contact_customer_search_sync ON crm_contact;
+DROP FUNCTION IF EXISTS crm_contact_customer_search_sync();
+DROP TRIGGER IF EXISTS crm_customer_search_sync ON crm_customer;
+DROP FUNCTION IF EXISTS crm_customer_search_sync();
+"""
+
+DROP_FUNCTIONS = """
+DROP TRIGGER IF EXISTS crm_contact_search_sync ON crm_contact;
+DROP FUNCTION IF EXISTS crm_contact_search_sync();
+DROP FUNCTION IF EXISTS crm_customer_search_refresh(uuid);
+DROP FUNCTION IF EXISTS crm_customer_search_document(uuid, text, jsonb);
+DROP FUNCTION IF EXISTS crm_contact_search_document(crm_contact);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0030_forestcontract'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='search_document',
+            field=models.TextField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='search_document',
+            field=models.TextField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_FUNCTIONS, DROP_FUNCTIONS),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 3.1.14 on 2026-10-18 08:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+CREATE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION crm_customer_forest_tags_refresh(p_customer_id uuid)
+RETURNS void AS $$
+DECLARE
+    v_repr text;
+BEGIN
+    SELECT string_agg(DISTINCT concat_ws(':', t.key, t.value), ',')
+    INTO v_repr
+    FROM crm_forestcustomer fc
+    JOIN crm_forest f ON f.id = fc.forest_id
+    CROSS JOIN LATERAL jsonb_each_text(f.tags) AS t
+    WHERE fc.customer_id = p_customer_id AND t.value IS NOT NULL;
+
+    IF v_repr IS NULL THEN
+        DELETE FROM crm_customerforesttags WHERE customer_id = p_customer_id;
+    ELSE
+        INSERT INTO crm_customerforesttags (customer_id, forest_tags_repr)
+        VALUES (p_customer_id, v_repr)
+        ON CONFLICT (customer_id)
+        DO UPDATE SET forest_tags_repr = EXCLUDED.forest_tags_repr;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION crm_forestcustomer_forest_tags_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM crm_customer_forest_tags_refresh(OLD.customer_id);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF TG_OP = 'INSERT' OR NEW.customer_id <> OLD.customer_id
+            OR NEW.forest_id <> OLD.forest_id THEN
+            PERFORM crm_customer_forest_tags_refresh(NEW.customer_id);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crm_forestcustomer_forest_tags_sync
+AFTER INSERT OR UPDATE OF customer_id, forest_id OR DELETE ON crm_forestcustomer
+FOR EACH ROW EXECUTE PROCEDURE crm_forestcustomer_forest_tags_sync();
+
+CREATE OR REPLACE FUNCTION crm_forest_forest_tags_sync() RETURNS trigger AS $$
+BEGIN
+    PERFORM crm_customer_forest_tags_refresh(customer_id)
+    FROM (
+        SELECT DISTINCT customer_id FROM crm_forestcustomer WHERE forest_id = NEW.id
+    ) AS customers;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crm_forest_forest_tags_sync
+AFTER UPDATE OF tags ON crm_forest FOR EACH ROW
+WHEN (OLD.tags IS DISTINCT FROM NEW.tags)
+EXECUTE PROCEDURE crm_forest_forest_tags_sync();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS crm_forest_forest_tags_sync ON crm_forest;
+DROP FUNCTION IF EXISTS crm_forest_forest_tags_sync();
+DROP TRIGGER IF EXISTS crm_forestcustomer_forest_tags_sync ON crm_forestcustomer;
+DROP FUNCTION IF EXISTS crm_forestcustomer_forest_tags_sync();
+DROP FUNCTION IF EXISTS crm_customer_forest_tags_refresh(uuid);
+"""
+
+BACKFILL = """
+INSERT INTO crm_customerforesttags (customer_id, forest_tags_repr)
+SELECT fc.customer_id, string_agg(DISTINCT concat_ws(':', t.key, t.value), ',')
+FROM crm_forestcustomer fc
+JOIN crm_forest f ON f.id = fc.forest_id
+CROSS JOIN LATERAL jsonb_each_text(f.tags) AS t
+WHERE t.value IS NOT NULL
+GROUP BY fc.customer_id
+ON CONFLICT (customer_id) DO NOTHING;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0031_customer_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerForestTags',
+            fields=[
+                ('customer', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='forest_tags', serialize=False, to='crm.customer')),
+                ('forest_tags_repr', models.TextField()),
+            ],
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+    ]
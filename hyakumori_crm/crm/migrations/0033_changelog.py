@@ -0,0 +1,101 @@
+# Generated by Django 3.1.14 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+CHANGES_CHANNEL = "crm_changes"
+
+# tables whose writes are logged, relation rows included for count caches
+LOGGED_TABLES = [
+    "users_user",
+    "crm_customer",
+    "crm_contact",
+    "crm_customercontact",
+    "crm_forest",
+    "crm_forestcustomer",
+    "crm_forestcustomercontact",
+    "crm_archive",
+    "crm_archiveforest",
+    "crm_archivecustomer",
+    "crm_archivecustomercontact",
+    "crm_archiveuser",
+    "crm_postalhistory",
+    "crm_postalhistoryforest",
+    "crm_postalhistorycustomer",
+    "crm_postalhistorycustomercontact",
+    "crm_postalhistoryuser",
+]
+
+# the consumer sets crm.changelog_skip, its cache writes are not logged.
+# NOTIFY payloads are delivered once per transaction, a bulk write wakes
+# the consumer once per table.
+LOG_CHANGE_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION crm_log_change() RETURNS trigger AS $$
+DECLARE
+    v_row_id uuid;
+BEGIN
+    IF current_setting('crm.changelog_skip', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        v_row_id := OLD.id;
+    ELSE
+        v_row_id := NEW.id;
+    END IF;
+    INSERT INTO crm_changelog (table_name, row_id, created_at)
+    VALUES (TG_TABLE_NAME, v_row_id, now())
+    ON CONFLICT (table_name, row_id) DO NOTHING;
+    PERFORM pg_notify('{CHANGES_CHANNEL}', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+CREATE_TRIGGERS = LOG_CHANGE_FUNCTION + "".join(
+    f"""
+CREATE TRIGGER {table}_log_change
+AFTER INSERT OR DELETE ON {table}
+FOR EACH ROW EXECUTE PROCEDURE crm_log_change();
+
+CREATE TRIGGER {table}_log_update
+AFTER UPDATE ON {table} FOR EACH ROW
+WHEN (OLD.* IS DISTINCT FROM NEW.*)
+EXECUTE PROCEDURE crm_log_change();
+"""
+    for table in LOGGED_TABLES
+)
+
+DROP_TRIGGERS = (
+    "".join(
+        f"""
+DROP TRIGGER IF EXISTS {table}_log_change ON {table};
+DROP TRIGGER IF EXISTS {table}_log_update ON {table};
+"""
+        for table in LOGGED_TABLES
+    )
+    + "DROP FUNCTION IF EXISTS crm_log_change();\n"
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_auto_20210316_1548'),
+        ('crm', '0032_customerforesttags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('table_name', models.CharField(max_length=63)),
+                ('row_id', models.UUIDField()),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='changelog',
+            constraint=models.UniqueConstraint(fields=('table_name', 'row_id'), name='unique_changelog_row'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,213 @@
+# Generated by Django 3.1.14 on 2026-10-18 11:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# postgres has no japanese parser, texts are indexed as overlapping
+# bigrams with their position so a word is searched as a phrase. Texts are
+# followed by a space for single characters to be searched as a prefix.
+# Positions above 16383 and lexemes past 256 positions are not recorded,
+# very long texts are only matched approximately.
+BIGRAM_FUNCTION = r"""
+CREATE OR REPLACE FUNCTION crm_bigram_tsvector(p_text text, p_weight "char")
+RETURNS tsvector AS $$
+    SELECT coalesce(setweight(string_agg(
+        '''' || replace(replace(gram, '\', '\\'), '''', '''''') || ''':'
+        || least(i, 16383),
+        ' '
+    )::tsvector, p_weight), '')
+    FROM (
+        SELECT i, substr(t, i, 2) AS gram
+        FROM (
+            SELECT regexp_replace(lower(coalesce(p_text, '')), '\s+', ' ', 'g')
+                || ' ' AS t
+        ) AS s
+        CROSS JOIN generate_series(1, char_length(t) - 1) AS i
+    ) AS g
+$$ LANGUAGE sql IMMUTABLE;
+"""
+
+DROP_BIGRAM_FUNCTION = """
+DROP FUNCTION IF EXISTS crm_bigram_tsvector(text, "char");
+"""
+
+# searched resource, its texts with their rank weight
+SEARCHED = [
+    (
+        'crm_archive',
+        'archive_id',
+        [('title', 'A'), ('content', 'B'), ('location', 'C'), ('future_action', 'C')],
+    ),
+    ('crm_postalhistory', 'postalhistory_id', [('title', 'A'), ('content', 'B')]),
+]
+
+# the listing shows dates in the primary time zone, rebuild the copies
+# when TIME_ZONE_PRIMARY changes
+SEARCH_COLUMNS = [
+    (
+        'archive_date',
+        f"to_char({{row}}.archive_date AT TIME ZONE '{settings.TIME_ZONE_PRIMARY}', "
+        "'YYYY-MM-DD HH24:MI')",
+    ),
+    (
+        'author',
+        "(SELECT concat(u.last_name, ' ', u.first_name) FROM users_user u "
+        "WHERE u.id = {row}.author_id)",
+    ),
+    (
+        'tags',
+        "(SELECT string_agg(concat_ws(':', key, value), ',') "
+        "FROM jsonb_each_text({row}.tags))",
+    ),
+    ('forests', "{row}.attributes -> 'forest_cache' ->> 'repr'"),
+    ('our_participants', "{row}.attributes -> 'user_cache' ->> 'repr'"),
+    ('their_participants', "{row}.attributes -> 'customer_cache' ->> 'repr'"),
+]
+
+columns = ', '.join(name for name, _ in SEARCH_COLUMNS)
+updates = ', '.join(f'{name} = EXCLUDED.{name}' for name, _ in SEARCH_COLUMNS)
+
+
+def row_values(row, texts):
+    document = ' || '.join(
+        f"crm_bigram_tsvector({row}.{text}, '{weight}')" for text, weight in texts
+    )
+    return ', '.join(
+        [value.format(row=row) for _, value in SEARCH_COLUMNS] + [document]
+    )
+
+
+def create_triggers(table, key, texts):
+    watched = ', '.join(
+        [text for text, _ in texts] + ['archive_date', 'author_id', 'tags', 'attributes']
+    )
+    return f"""
+CREATE OR REPLACE FUNCTION {table}_search_sync() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO {table}search ({key}, {columns}, document)
+    VALUES (NEW.id, {row_values('NEW', texts)})
+    ON CONFLICT ({key}) DO UPDATE SET {updates}, document = EXCLUDED.document;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {table}_search_sync
+AFTER INSERT OR UPDATE OF {watched}
+ON {table} FOR EACH ROW EXECUTE PROCEDURE {table}_search_sync();
+
+CREATE OR REPLACE FUNCTION users_user_{table}_search_sync() RETURNS trigger AS $$
+BEGIN
+    UPDATE {table}search AS s
+    SET author = concat(NEW.last_name, ' ', NEW.first_name)
+    FROM {table} AS r
+    WHERE r.id = s.{key} AND r.author_id = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER users_user_{table}_search_sync
+AFTER UPDATE OF first_name, last_name ON users_user FOR EACH ROW
+WHEN (OLD.first_name IS DISTINCT FROM NEW.first_name
+    OR OLD.last_name IS DISTINCT FROM NEW.last_name)
+EXECUTE PROCEDURE users_user_{table}_search_sync();
+"""
+
+
+def drop_triggers(table):
+    return f"""
+DROP TRIGGER IF EXISTS users_user_{table}_search_sync ON users_user;
+DROP FUNCTION IF EXISTS users_user_{table}_search_sync();
+DROP TRIGGER IF EXISTS {table}_search_sync ON {table};
+DROP FUNCTION IF EXISTS {table}_search_sync();
+"""
+
+
+def backfill(table, key, texts):
+    return f"""
+INSERT INTO {table}search ({key}, {columns}, document)
+SELECT r.id, {row_values('r', texts)} FROM {table} r
+ON CONFLICT ({key}) DO NOTHING;
+"""
+
+
+CREATE_TRIGGERS = BIGRAM_FUNCTION + ''.join(
+    create_triggers(*searched) for searched in SEARCHED
+)
+
+DROP_TRIGGERS = (
+    ''.join(drop_triggers(table) for table, _, _ in SEARCHED) + DROP_BIGRAM_FUNCTION
+)
+
+BACKFILL = ''.join(backfill(*searched) for searched in SEARCHED)
+
+
+# django icontains compiles to UPPER(column::text) LIKE UPPER(%s)
+def trigram_indexes(table, names):
+    return ''.join(
+        f'CREATE INDEX {table}_{name}_trgm '
+        f'ON {table} USING gin (UPPER({name}) gin_trgm_ops);\n'
+        for name in names
+    )
+
+
+def drop_trigram_indexes(table, names):
+    return ''.join(f'DROP INDEX IF EXISTS {table}_{name}_trgm;\n' for name in names)
+
+
+TRIGRAM_INDEXED = [
+    (f'{table}search', [name for name, _ in SEARCH_COLUMNS]) for table, _, _ in SEARCHED
+] + [(table, [text for text, _ in texts]) for table, _, texts in SEARCHED]
+
+CREATE_INDEXES = ''.join(trigram_indexes(*indexed) for indexed in TRIGRAM_INDEXED)
+
+DROP_INDEXES = ''.join(drop_trigram_indexes(*indexed) for indexed in TRIGRAM_INDEXED)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0033_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveSearch',
+            fields=[
+                ('archive', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='crm.archive')),
+                ('archive_date', models.TextField(null=True)),
+                ('author', models.TextField(null=True)),
+                ('tags', models.TextField(null=True)),
+                ('forests', models.TextField(null=True)),
+                ('our_participants', models.TextField(null=True)),
+                ('their_participants', models.TextField(null=True)),
+                ('document', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostalHistorySearch',
+            fields=[
+                ('postalhistory', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='crm.postalhistory')),
+                ('archive_date', models.TextField(null=True)),
+                ('author', models.TextField(null=True)),
+                ('tags', models.TextField(null=True)),
+                ('forests', models.TextField(null=True)),
+                ('our_participants', models.TextField(null=True)),
+                ('their_participants', models.TextField(null=True)),
+                ('document', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivesearch',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['document'], name='archivesearch_document_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postalhistorysearch',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['document'], name='postalsearch_document_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+        migrations.RunSQL(CREATE_INDEXES, DROP_INDEXES),
+    ]
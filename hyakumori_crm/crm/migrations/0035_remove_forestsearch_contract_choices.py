@@ -0,0 +1,91 @@
+# Generated by Django 3.1.14 on 2026-10-18 14:10
+
+from django.db import migrations
+
+# contract types and statuses are filtered on ForestContract since 0030,
+# their copies are no longer written
+SEARCH_COLUMNS = [
+    ('municipality', "{row}.cadastral ->> 'municipality'"),
+    ('sector', "{row}.cadastral ->> 'sector'"),
+    ('lot_number', "{row}.land_attributes ->> '地番本番'"),
+    ('sub_lot_number', "{row}.land_attributes ->> '地番支番'"),
+    ('owner_name_kanji', "{row}.attributes -> 'customer_cache' ->> 'repr_name_kanji'"),
+    ('owner_name_kana', "{row}.attributes -> 'customer_cache' ->> 'repr_name_kana'"),
+    ('contract_start_date', "{row}.contracts -> 0 ->> 'start_date'"),
+    ('contract_end_date', "{row}.contracts -> 0 ->> 'end_date'"),
+    ('fsc_start_date', "{row}.contracts -> -1 ->> 'start_date'"),
+]
+
+REMOVED_COLUMNS = [
+    ('contract_type', "{row}.contracts -> 0 ->> 'type'"),
+    ('contract_status', "{row}.contracts -> 0 ->> 'status'"),
+    ('fsc_status', "{row}.contracts -> -1 ->> 'status'"),
+]
+
+
+def create_trigger(search_columns):
+    columns = ', '.join(name for name, _ in search_columns)
+    updates = ', '.join(f'{name} = EXCLUDED.{name}' for name, _ in search_columns)
+    values = ', '.join(value.format(row='NEW') for _, value in search_columns)
+    return f"""
+CREATE OR REPLACE FUNCTION crm_forest_search_sync() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO crm_forestsearch (forest_id, {columns})
+    VALUES (NEW.id, {values})
+    ON CONFLICT (forest_id) DO UPDATE SET {updates};
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS crm_forest_search_sync ON crm_forest;
+CREATE TRIGGER crm_forest_search_sync
+AFTER INSERT OR UPDATE OF cadastral, land_attributes, contracts, attributes
+ON crm_forest FOR EACH ROW EXECUTE PROCEDURE crm_forest_search_sync();
+"""
+
+
+CREATE_TRIGGER = create_trigger(SEARCH_COLUMNS)
+
+RESTORE_TRIGGER = create_trigger(SEARCH_COLUMNS + REMOVED_COLUMNS)
+
+RESTORE_COLUMNS = f"""
+UPDATE crm_forestsearch s
+SET {', '.join(f"{name} = {value.format(row='f')}" for name, value in REMOVED_COLUMNS)}
+FROM crm_forest f WHERE f.id = s.forest_id;
+"""
+
+DROP_INDEXES = ''.join(
+    f'DROP INDEX IF EXISTS crm_forestsearch_{name}_trgm;\n'
+    for name, _ in REMOVED_COLUMNS
+)
+
+CREATE_INDEXES = ''.join(
+    f'CREATE INDEX crm_forestsearch_{name}_trgm '
+    f'ON crm_forestsearch USING gin (UPPER({name}) gin_trgm_ops);\n'
+    for name, _ in REMOVED_COLUMNS
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0034_archive_postalhistory_search'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DROP_INDEXES, CREATE_INDEXES),
+        migrations.RunSQL(migrations.RunSQL.noop, RESTORE_COLUMNS),
+        migrations.RunSQL(CREATE_TRIGGER, RESTORE_TRIGGER),
+        migrations.RemoveField(
+            model_name='forestsearch',
+            name='contract_status',
+        ),
+        migrations.RemoveField(
+            model_name='forestsearch',
+            name='contract_type',
+        ),
+        migrations.RemoveField(
+            model_name='forestsearch',
+            name='fsc_status',
+        ),
+    ]
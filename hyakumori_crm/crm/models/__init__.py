@@ -1,5 +1,6 @@
 from .archive import *  # noqa
 from .attachment import *  # noqa
+from .change_log import *  # noqa
 from .customer import *  # noqa
 from .forest import *  # noqa
 from .postal_history import *  # noqa
@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db.models import JSONField
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
@@ -34,6 +36,28 @@ class Archive(BaseResourceModel):
         return self.title
 
 
+class ArchiveSearch(models.Model):
+    """
+    Plain text copies of the filterable archive values and the bigram
+    document of its texts, kept in sync by the crm_archive_search_sync
+    triggers
+    """
+
+    archive = models.OneToOneField(
+        Archive, primary_key=True, on_delete=models.CASCADE, related_name="search"
+    )
+    archive_date = models.TextField(null=True)
+    author = models.TextField(null=True)
+    tags = models.TextField(null=True)
+    forests = models.TextField(null=True)
+    our_participants = models.TextField(null=True)
+    their_participants = models.TextField(null=True)
+    document = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [GinIndex(fields=["document"], name="archivesearch_document_idx")]
+
+
 class ArchiveForest(BaseRelationModel):
     archive = models.ForeignKey("Archive", on_delete=models.PROTECT)
     forest = models.ForeignKey("Forest", on_delete=models.CASCADE)
@@ -23,6 +23,13 @@ class AttachmentManager(models.Manager):
         object_type = ContentType.objects.get_for_model(obj)
         return self.filter(content_type__pk=object_type.pk, object_id=obj.pk)
 
+    def by_object_ids(self, object_ids):
+        """:return: attachments of many objects, by object id, with one query"""
+        attachments = {}
+        for attachment in self.filter(object_id__in=[str(pk) for pk in object_ids]):
+            attachments.setdefault(attachment.object_id, []).append(attachment)
+        return attachments
+
 
 class Attachment(BaseResourceModel):
     objects = AttachmentManager()
@@ -57,6 +64,10 @@ class Attachment(BaseResourceModel):
 
     @property
     def size(self):
+        # recorded on upload, the storage is only asked for older attachments
+        size = self.attributes.get("original_file_size")
+        if size is not None:
+            return size
         try:
             return self.attachment_file.size
         except FileNotFoundError:
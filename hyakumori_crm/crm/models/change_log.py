@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class ChangeLog(models.Model):
+    """
+    Rows of the core tables written since the changes consumer last ran,
+    appended by the crm_log_change triggers whatever wrote the row. A row
+    pending more than once is logged once.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    table_name = models.CharField(max_length=63)
+    row_id = models.UUIDField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["table_name", "row_id"], name="unique_changelog_row"
+            ),
+        ]
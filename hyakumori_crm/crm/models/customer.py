@@ -57,6 +57,8 @@ class Customer(BaseResourceModel):
     address = JSONField(default=DefaultCustomer.address, db_index=True)
     banking = JSONField(default=DefaultCustomer.banking)
     tags = JSONField(default=dict)
+    # internal id, tags and self contact document, see Contact.search_document
+    search_document = models.TextField(null=True, editable=False)
 
     objects = CustomerQueryset.as_manager()
 
@@ -104,6 +106,9 @@ class Contact(BaseResourceModel):
     telephone = models.CharField(default=None, max_length=200, null=True)
     mobilephone = models.CharField(default=None, max_length=200, null=True)
     email = models.EmailField(default=None, max_length=200, null=True)
+    # names, phones, email and address on one line each, written by the
+    # crm_contact_search_sync trigger and indexed with pg_trgm
+    search_document = models.TextField(null=True, editable=False)
 
     class Meta:
         permissions = [
@@ -139,6 +144,23 @@ class CustomerContact(BaseRelationModel):
         return self
 
 
+class CustomerForestTags(models.Model):
+    """
+    Distinct ``key:value`` tags of all forests of a customer, kept in sync
+    by the crm_customer_forest_tags triggers. Customers without tagged
+    forests have no row.
+    """
+
+    customer = models.OneToOneField(
+        "Customer",
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="forest_tags",
+    )
+    forest_tags_repr = models.TextField()
+
+
 class ForestCustomer(BaseRelationModel):
     forest = models.ForeignKey("Forest", on_delete=models.PROTECT)
     customer = models.ForeignKey("Customer", on_delete=models.CASCADE)
@@ -46,6 +46,12 @@ class Forest(BaseResourceModel):
         permissions = [
             ("manage_forest", "All permissions for forest"),
         ]
+        indexes = [
+            # keyset pagination of forest listing
+            models.Index(
+                fields=["internal_id", "id"], name="forest_internal_id_seek_idx"
+            ),
+        ]
 
     @property
     def geodata4326(self):
@@ -61,3 +67,58 @@ class Forest(BaseResourceModel):
 
     def repr_name(self):
         return self.internal_id
+
+
+class ForestSearch(models.Model):
+    """
+    Plain text copies of the filterable forest values, kept in sync by the
+    crm_forest_search_sync trigger and indexed with pg_trgm
+    """
+
+    forest = models.OneToOneField(
+        Forest, primary_key=True, on_delete=models.CASCADE, related_name="search"
+    )
+    municipality = models.TextField(null=True)
+    sector = models.TextField(null=True)
+    lot_number = models.TextField(null=True)
+    sub_lot_number = models.TextField(null=True)
+    owner_name_kanji = models.TextField(null=True)
+    owner_name_kana = models.TextField(null=True)
+    contract_start_date = models.TextField(null=True)
+    contract_end_date = models.TextField(null=True)
+    fsc_start_date = models.TextField(null=True)
+
+
+class ForestContract(models.Model):
+    """
+    One row per element of Forest.contracts, kept in sync by the
+    crm_forest_contracts_sync trigger. Position 0 is the main contract and
+    the last one is FSC.
+    """
+
+    forest = models.ForeignKey(
+        Forest, on_delete=models.CASCADE, related_name="contract_set"
+    )
+    position = models.SmallIntegerField()
+    is_last = models.BooleanField(default=False)
+    type = models.CharField(max_length=255, null=True)
+    status = models.CharField(max_length=255, null=True)
+    start_date = models.DateField(null=True)
+    end_date = models.DateField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["forest", "position"], name="unique_forest_contract_position"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["type", "status", "end_date"],
+                name="forestcontract_type_status_idx",
+            ),
+            # contract expiry
+            models.Index(
+                fields=["status", "end_date"], name="forestcontract_status_end_idx"
+            ),
+        ]
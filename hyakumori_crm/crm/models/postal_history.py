@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db.models import JSONField
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
@@ -32,6 +34,31 @@ class PostalHistory(BaseResourceModel):
         return self.title
 
 
+class PostalHistorySearch(models.Model):
+    """
+    Plain text copies of the filterable postal history values and the
+    bigram document of its texts, kept in sync by the
+    crm_postalhistory_search_sync triggers
+    """
+
+    postalhistory = models.OneToOneField(
+        PostalHistory,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="search",
+    )
+    archive_date = models.TextField(null=True)
+    author = models.TextField(null=True)
+    tags = models.TextField(null=True)
+    forests = models.TextField(null=True)
+    our_participants = models.TextField(null=True)
+    their_participants = models.TextField(null=True)
+    document = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [GinIndex(fields=["document"], name="postalsearch_document_idx")]
+
+
 class PostalHistoryForest(BaseRelationModel):
     postalhistory = models.ForeignKey("PostalHistory", on_delete=models.PROTECT)
     forest = models.ForeignKey("Forest", on_delete=models.CASCADE)
@@ -1,5 +1,7 @@
 from rest_framework.pagination import PageNumberPagination
 
+from hyakumori_crm.cache.counts import CachedCountPaginator
+
 
 class StandardPagination(PageNumberPagination):
     page_size = 10
@@ -8,6 +10,25 @@ class StandardPagination(PageNumberPagination):
 
 
 class ListingPagination(PageNumberPagination):
+    """
+    Totals are cached per filter, unfiltered listings can use the table
+    estimate, ``count_exact`` in the response tells which one was used.
+    """
+
     page_size = 25
     page_size_query_param = 'page_size'
     max_page_size = 1000
+
+    def __init__(self, estimate_count=False):
+        super().__init__()
+        self.estimate_count = estimate_count
+
+    def django_paginator_class(self, object_list, per_page):
+        paginator = CachedCountPaginator(object_list, per_page)
+        paginator.estimate = self.estimate_count
+        return paginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data["count_exact"] = self.page.paginator.count_exact
+        return response
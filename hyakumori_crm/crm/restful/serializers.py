@@ -1,4 +1,6 @@
+from django.db.models import Manager, QuerySet
 from rest_framework.serializers import (
+    ListSerializer,
     ModelSerializer,
     UUIDField,
     IntegerField,
@@ -7,10 +9,10 @@ from rest_framework.serializers import (
     SerializerMethodField,
     CharField,
 )
-from rest_framework_gis.fields import GeometryField
 
+from ...core.serializers import GeojsonField
 from ..models import Customer, Contact, Forest, Attachment, Archive
-from ...contracts.models import ContractType
+from ...contracts.services import get_all_contracttypes_map
 from ...forest.service import map_forests_contracts
 from ...users.serializers import UserSerializer
 
@@ -30,7 +32,7 @@ class ContactSerializer(ModelSerializer):
 
     class Meta:
         model = Contact
-        exclude = ["contact_info", "deleted"]
+        exclude = ["contact_info", "deleted", "search_document"]
 
 
 class CustomerContactSerializer(ModelSerializer):
@@ -43,7 +45,7 @@ class CustomerContactSerializer(ModelSerializer):
 
     class Meta:
         model = Contact
-        exclude = ["contact_info", "deleted"]
+        exclude = ["contact_info", "deleted", "search_document"]
 
 
 class CustomerSerializer(ModelSerializer):
@@ -83,7 +85,7 @@ class LimittedCustomerSerializer(CustomerSerializer):
 
 
 class ForestSerializer(ModelSerializer):
-    geodata = GeometryField(allow_null=True, required=False, source="geodata4326")
+    geodata = GeojsonField()
     contracts = SerializerMethodField()
 
     class Meta:
@@ -91,8 +93,7 @@ class ForestSerializer(ModelSerializer):
         exclude = ["deleted"]
 
     def get_contracts(self, forest):
-        contract_types = dict(ContractType.objects.values_list("code", "name"))
-        return map_forests_contracts(forest, contract_types).contracts
+        return map_forests_contracts(forest, get_all_contracttypes_map()).contracts
 
 
 class ForestListingSerializer(ModelSerializer):
@@ -123,12 +124,41 @@ class AttachmentSerializer(ModelSerializer):
         ]
 
 
+class AttachedResourceListSerializer(ListSerializer):
+    """
+    Archives or postal histories with their author and attachments, both
+    loaded for the whole list at once
+    """
+
+    def to_representation(self, data):
+        resources = data.all() if isinstance(data, Manager) else data
+        if isinstance(resources, QuerySet):
+            resources = resources.select_related("author").prefetch_related(
+                "author__groups"
+            )
+        resources = list(resources)
+        self.context["attachments"] = Attachment.objects.by_object_ids(
+            [resource.pk for resource in resources]
+        )
+        return super().to_representation(resources)
+
+
+def get_resource_attachments(serializer, obj):
+    attachments = serializer.context.get("attachments")
+    if attachments is None:
+        return AttachmentSerializer(
+            Attachment.objects.filter(object_id=obj.id), many=True
+        ).data
+    return AttachmentSerializer(attachments.get(str(obj.id), []), many=True).data
+
+
 class ArchiveSerializer(ModelSerializer):
     attachments = SerializerMethodField()
     author = UserSerializer()
 
     class Meta:
         model = Archive
+        list_serializer_class = AttachedResourceListSerializer
         fields = [
             "id",
             "title",
@@ -143,20 +173,20 @@ class ArchiveSerializer(ModelSerializer):
         ]
 
     def get_attachments(self, obj: Archive):
-        try:
-            return AttachmentSerializer(
-                Attachment.objects.filter(object_id=obj.id), many=True
-            ).data
-        except Attachment.DoesNotExist:
-            return []
+        return get_resource_attachments(self, obj)
 
 
 class ArchiveListingSerializer(ModelSerializer):
     author_name = SerializerMethodField(method_name="get_author_name")
+    search_snippet = SerializerMethodField()
 
     def get_author_name(self, obj: Archive):
         return obj.author.full_name
 
+    def get_search_snippet(self, obj: Archive):
+        # set on the listed page when searching
+        return getattr(obj, "search_snippet", None)
+
     class Meta:
         model = Archive
         fields = [
@@ -169,4 +199,5 @@ class ArchiveListingSerializer(ModelSerializer):
             "archive_date",
             "attributes",
             "tags",
+            "search_snippet",
         ]
@@ -7,7 +7,7 @@ from graphql import GraphQLResolveInfo
 from hyakumori_crm.graphql.decorators import login_required
 from .filters import CustomerFilter
 from .schemas import CustomerPaginator
-from .service import get_list
+from .service import count_customers, get_list, get_list_by_cursor
 from ..core.decorators import validate_model
 
 query = ObjectType("Query")
@@ -43,14 +43,32 @@ def get_customertable_headers(obj: Any, info: GraphQLResolveInfo, **kwargs) -> d
 @validate_model(CustomerPaginator)
 def list_customers(obj: Any, info: GraphQLResolveInfo, data=None, **kwargs) -> dict:
     pager_input = data.dict()
-    customers, total = get_list(
+    total, total_exact = None, None
+    if not data.is_cursor_mode or pager_input["with_total"]:
+        total, total_exact = count_customers(pager_input["filters"])
+    if data.is_cursor_mode:
+        customers, page_info = get_list_by_cursor(
+            per_page=pager_input["per_page"],
+            after=pager_input["after"],
+            before=pager_input["before"],
+            order_by=pager_input["order_by"],
+            filters=pager_input["filters"],
+        )
+        return {
+            "items": customers,
+            "total": total,
+            "total_exact": total_exact,
+            "page_info": page_info,
+        }
+    customers = get_list(
         page_num=pager_input["page_num"],
         per_page=pager_input["per_page"],
         pre_per_page=pager_input["pre_per_page"],
         order_by=pager_input["order_by"],
         filters=pager_input["filters"],
-    )
-    return {"items": customers, "total": total}
+        with_total=False,
+    )[0]
+    return {"items": customers, "total": total, "total_exact": total_exact}
 
 
 resolvers = [query]
@@ -3,11 +3,9 @@ import csv
 import pathlib
 import time
 
-from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.http.response import StreamingHttpResponse, JsonResponse
 from django.utils.translation import gettext_lazy as _
-from django.db import transaction
 from django.db.models import Q
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
@@ -29,7 +27,9 @@ from hyakumori_crm.crm.restful.serializers import (
 from hyakumori_crm.crm.schemas.tag import TagBulkUpdate
 from ..activity.services import ActivityService, CustomerActions
 from ..api.decorators import api_validate_model, get_or_404
-from ..core.utils import clear_maintain_task_id_cache
+from ..forest.service import geojson_options
+from ..tasks.imports import create_import_job
+from ..tasks.serializers import ImportJobSerializer
 
 from .schemas import (
     BankingInput,
@@ -63,9 +63,8 @@ from .service import (
     get_customers_tag_by_ids,
     get_customer_postal_histories,
     get_customer_csv,
-    get_list,
+    get_customers_for_csv,
 )
-from .tasks import csv_upload
 from .permissions import DownloadCsvPersmission, CustomerContactListPermission
 
 
@@ -165,7 +164,11 @@ class CustomerViewSets(ViewSet):
             obj = customer
             paginator = default_paginator()
             paged_list = paginator.paginate_queryset(
-                request=request, queryset=get_customer_forests(obj.pk), view=self,
+                request=request,
+                queryset=get_customer_forests(
+                    obj.pk, geojson_options(request.query_params)
+                ),
+                view=self,
             )
 
             forests = ForestSerializer(paged_list, many=True).data
@@ -285,7 +288,7 @@ class CustomerViewSets(ViewSet):
             _("Tag"),
         ]
         try:
-            customers = get_list(per_page=None, filters=filters, for_csv=True)[0]
+            customers = get_customers_for_csv(filters)
         except ValidationError:
             customers = []
 
@@ -319,22 +322,8 @@ class CustomerViewSets(ViewSet):
         with open(fp, "wb+") as destination:
             for chunk in csv_file.chunks():
                 destination.write(chunk)
-        cache.set("maintain_task_id", f"customers/{file_name}", None)
-        try:
-            r = csv_upload(fp)
-        except UnicodeDecodeError:
-            transaction.set_rollback(True)
-            return Response(
-                {"errors": {"__root__": [_("Please upload a csv file!!")]}}, 400
-            )
-        else:
-            if type(r) is int:
-                return Response({"msg": "OK"}, status=200)
-            else:
-                transaction.set_rollback(True)
-                return Response(r, status=400)
-        finally:
-            clear_maintain_task_id_cache()
+        job = create_import_job("customers", fp, author=request.user)
+        return Response(ImportJobSerializer(job).data, status=202)
 
 
 @api_view(["GET"])
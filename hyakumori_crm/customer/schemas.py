@@ -12,11 +12,11 @@ from pydantic import EmailStr, constr, root_validator, validator
 from rest_framework.serializers import ModelSerializer, UUIDField
 
 from ..core.models import HyakumoriDanticModel, Paginator
+from ..core.serializers import GeojsonField
 from ..crm.common import regexes
 from ..crm.common.constants import DEFAULT_EMAIL, EMPTY, UNKNOWN
 from ..crm.common.utils import tags_csv_to_dict
 from ..crm.models import Contact, Customer, Forest, ForestCustomer
-from rest_framework_gis.fields import GeometryField
 
 
 class Name(HyakumoriDanticModel):
@@ -122,7 +122,7 @@ class CustomerPaginator(Paginator):
 
 class ForestSerializer(ModelSerializer):
     forestcustomer_id = UUIDField(read_only=True)
-    geodata = GeometryField(allow_null=True, required=False, source="geodata4326")
+    geodata = GeojsonField()
 
     class Meta:
         model = Forest
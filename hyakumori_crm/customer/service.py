@@ -1,3 +1,4 @@
+import json
 import uuid
 import itertools
 import operator
@@ -14,21 +15,27 @@ from querybuilder.query import Query
 from querybuilder.fields import CountField
 
 from hyakumori_crm.core.models import RawSQLField
+from hyakumori_crm.core.utils import cursor_page, decode_cursor
 from hyakumori_crm.crm.models import (
     Archive,
     Contact,
     Customer,
     CustomerContact,
+    CustomerForestTags,
     Forest,
     ForestCustomer,
     ForestCustomerContact,
     PostalHistory,
 )
+from ..cache.counts import cached_count, invalidate_counts
 from ..cache.forest import refresh_customer_forest_cache
-from ..forest.service import parse_tags_for_csv
+from ..forest.service import annotate_geojson, parse_tags_for_csv
 from .schemas import ContactType, CustomerInputSchema, ContactsInput
 
 
+CUSTOMER_CSV_BATCH_SIZE = 2000
+
+
 def get_customer_by_pk(pk):
     try:
         return Customer.objects.raw(
@@ -65,34 +72,17 @@ group by crm_customer.id
 """
     and_tags_map = {}
     if search:
-        where = """
-and (concat(sc.name_kanji->>'last_name', ' ',
-    sc.name_kanji->>'first_name') ilike %(search)s
-or concat(sc.name_kana->>'last_name', ' ',
-    sc.name_kana->>'first_name') ilike %(search)s
-or crm_customer.internal_id ilike %(search)s
-or sc.email ilike %(search)s
-or sc.telephone ilike %(search)s
-or sc.mobilephone ilike %(search)s
-or concat(sc.postal_code, ' ', sc.address->>'sector', ' ',
-    sc.address->>'municipality', ' ', sc.address->>'prefecture') ilike %(search)s
-or (
-"""
+        # search_document holds the internal id, tags and basic contact
+        # fields, kept up to date by triggers and trigram indexed
         and_tags = []
         for i, v in enumerate(search.split(",")):
             and_tags_map[f"v{i}"] = "%%%s%%" % v
-            and_tags.append(
-                f"""(
-    select string_agg(tags_repr, ',') tags_repr
-    from (
-        select concat_ws(':', key, value) as tags_repr
-        from jsonb_each_text(tags) as x
-        where value is not null
-    ) as ss
-)::text ilike %(v{i})s
-"""
-            )
-        where += "and\n".join(and_tags) + "\n))"
+            and_tags.append(f"upper(crm_customer.search_document) like upper(%(v{i})s)")
+        where = """
+and (upper(crm_customer.search_document) like upper(%(search)s)
+or ({and_tags}))""".format(
+            and_tags=" and ".join(and_tags)
+        )
     else:
         where = ""
     sql = sql.format(where_clause=where)
@@ -140,30 +130,17 @@ def get_customer_contacts(pk: UUID):
     return q
 
 
-def get_customer_forests(pk: UUID):
-    return (
+def get_customer_forests(pk: UUID, geojson: Union[dict, None] = None):
+    query = (
         Forest.objects.filter(forestcustomer__customer_id=pk)
         .annotate(forestcustomer_id=F("forestcustomer__id"))
         .prefetch_related("forestcustomer_set")
         .order_by("created_at")
     )
+    return annotate_geojson(query, **(geojson or {}))
 
 
-def get_list(
-    page_num: int = 1,
-    per_page: int = 10,
-    pre_per_page: Union[int, None] = None,
-    order_by: Union[Iterator, None] = None,
-    filters: Union[Iterator, None] = None,
-    for_csv: bool = False,
-):
-    if per_page is None:
-        offset = None
-    else:
-        offset = (pre_per_page or per_page) * (page_num - 1)
-    if not order_by:
-        order_by = []
-
+def _build_list_query(filters: Union[Iterator, None] = None, for_csv: bool = False):
     fields = [
         "id",
         "internal_id",
@@ -327,6 +304,13 @@ def get_list(
             {"municipality": "address->>'municipality'"},
         ],
     )
+    # forest tags rolled up per customer by triggers
+    query = query.join(
+        {"forest_tags": CustomerForestTags},
+        condition="forest_tags.customer_id = c.id",
+        join_type="LEFT JOIN",
+        fields=["forest_tags_repr"],
+    )
     if for_csv:
         query = (
             Query()
@@ -338,67 +322,30 @@ def get_list(
             .from_table("T0")
         )
     else:
-        forest_tags_nested = (
-            Query()
-            .from_table({"fc": ForestCustomer}, fields=["customer_id"])
-            .join(
-                {"forest": Forest},
-                condition="fc.forest_id = forest.id",
-                fields=[
-                    {
-                        "forest_tags": RawSQLField(
-                            "(select array_agg(fulltag) tags_arr "
-                            "from ( "
-                            "select concat_ws(':', key, value) as fulltag "
-                            "from jsonb_each_text(forest.tags) as x "
-                            "where value is not null "
-                            ") as ss)"
-                        )
-                    }
-                ],
-            )
-        )
-        forest_tags_unnest = (
-            Query()
-            .from_table(
-                {"A0": forest_tags_nested},
-                fields=[
-                    "customer_id",
-                    {"forest_tags": RawSQLField("unnest(A0.forest_tags)")},
-                ],
-            )
-            .distinct()
-        )
-        forest_tags = (
-            Query()
-            .from_table(
-                {"A1": forest_tags_unnest},
-                fields=[
-                    "customer_id",
-                    {"forest_tags": RawSQLField("array_agg(A1.forest_tags)")},
-                ],
-            )
-            .group_by("customer_id")
-        )
-        query = query.join(
-            "forest_tags",
-            condition="forest_tags.customer_id = c.id",
-            join_type="LEFT JOIN",
-            fields=[
-                {"forest_tags_repr": RawSQLField("array_to_string(forest_tags, ',')")}
-            ],
-        )
-        query = (
-            Query()
-            .with_query(query, alias="T0")
-            .with_query(forest_tags, alias="forest_tags")
-            .with_query(forest_tags_unnest, alias="A1")
-            .with_query(forest_tags_nested, alias="A0")
-            .from_table("T0")
-        )
+        query = Query().with_query(query, alias="T0").from_table("T0")
     if filters:
         query.where(filters)
-    total = query.copy().count()
+    return query
+
+
+def get_list(
+    page_num: int = 1,
+    per_page: int = 10,
+    pre_per_page: Union[int, None] = None,
+    order_by: Union[Iterator, None] = None,
+    filters: Union[Iterator, None] = None,
+    for_csv: bool = False,
+    with_total: bool = True,
+):
+    if per_page is None:
+        offset = None
+    else:
+        offset = (pre_per_page or per_page) * (page_num - 1)
+    if not order_by:
+        order_by = []
+
+    query = _build_list_query(filters, for_csv)
+    total = count_customers(filters)[0] if with_total else None
 
     for order_field in order_by:
         query.order_by(order_field)
@@ -407,6 +354,77 @@ def get_list(
     return query.select(), total
 
 
+def count_customers(filters: Union[Iterator, None] = None):
+    """
+    :return: (total, exact), cached per filter and estimated when unfiltered
+    """
+    query = _build_list_query(filters)
+    return cached_count(
+        (query.get_sql(), query.get_args()),
+        (
+            Customer._meta.db_table,
+            CustomerContact._meta.db_table,
+            Contact._meta.db_table,
+            ForestCustomer._meta.db_table,
+            Forest._meta.db_table,
+        ),
+        query.copy().count,
+        estimate=not filters,
+    )
+
+
+def _list_seek_condition(sort_key, value, pk, ascending):
+    """
+    Rows after (value, pk) in (sort_key, id) order, nulls sort last when
+    ascending and first when descending, as postgres does by default.
+    """
+    if ascending:
+        if value is None:
+            return Q(**{f"{sort_key}__exact": None}) & Q(id__gt=pk)
+        return (
+            Q(**{f"{sort_key}__gt": value})
+            | Q(**{sort_key: value, "id__gt": pk})
+            | Q(**{f"{sort_key}__exact": None})
+        )
+    if value is None:
+        return ~Q(**{f"{sort_key}__exact": None}) | Q(id__lt=pk)
+    return Q(**{f"{sort_key}__lt": value}) | Q(**{sort_key: value, "id__lt": pk})
+
+
+def get_list_by_cursor(
+    per_page: int = 10,
+    after: Union[str, None] = None,
+    before: Union[str, None] = None,
+    order_by: Union[Iterator, None] = None,
+    filters: Union[Iterator, None] = None,
+):
+    """
+    Keyset pagination on the first sort field (business_id by default) plus id
+    """
+    order_by = list(order_by or [])
+    sort_field = order_by[0] if order_by else "business_id"
+    sort_key = sort_field.lstrip("-")
+    descending = sort_field.startswith("-")
+    backward = before is not None
+    token = before if backward else after
+    # direction of the fetch in (sort_key, id) ascending terms
+    ascending = descending == backward
+
+    query = _build_list_query(filters)
+    if token:
+        value, pk = decode_cursor(token)
+        query.where(_list_seek_condition(sort_key, value, pk, ascending))
+
+    direction = "" if ascending else "-"
+    query.order_by(f"{direction}{sort_key}")
+    query.order_by(f"{direction}id")
+    query.limit(per_page + 1)
+    customers, page_info = cursor_page(
+        query.select(), per_page, backward, token, lambda c: (c[sort_key], c["id"])
+    )
+    return customers, page_info
+
+
 def _get_forest_repr(f):
     result = f"{f['cadastral']['sector']} {f['land_attributes']['地番本番']}"
     if f["land_attributes"]["地番支番"]:
@@ -414,23 +432,45 @@ def _get_forest_repr(f):
     return result
 
 
+def get_customers_for_csv(
+    filters: Union[Iterator, None] = None,
+    batch_size: int = CUSTOMER_CSV_BATCH_SIZE,
+):
+    """
+    Rows of the csv export read through a named cursor, batch by batch.
+    The query is built before the first row is pulled, so invalid filters
+    raise here and not in the middle of the response.
+    """
+    query = _build_list_query(filters, for_csv=True)
+    return _stream_rows(query.get_sql(), query.get_args(), batch_size)
+
+
+def _stream_rows(sql, args, batch_size):
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, args)
+        rows = cursor.fetchmany(batch_size)
+        # description of a named cursor is only available after the first fetch
+        columns = [col[0] for col in cursor.description or []]
+        while rows:
+            for row in rows:
+                yield dict(zip(columns, row))
+            rows = cursor.fetchmany(batch_size)
+
+
+def _unique_by_id(items):
+    """first item of each id, in order, items without id are skipped"""
+    seen = set()
+    for item in items or ():
+        item_id = item["id"]
+        if item_id and item_id not in seen:
+            seen.add(item_id)
+            yield item
+
+
 def get_customer_csv(customers):
     for c in customers:
-        if c["forests_json"] is None:
-            forests_repr = ""
-        else:
-            forests_repr = ";".join(
-                [
-                    _get_forest_repr(f)
-                    for f in ({f["id"]: f for f in c["forests_json"]}.values())
-                ]
-            )
-        if c["contacts_json"] is not None:
-            contacts = list(
-                {c["id"]: c for c in c["contacts_json"] if c["id"]}.values()
-            )
-        else:
-            contacts = []
+        forests_repr = ";".join(map(_get_forest_repr, _unique_by_id(c["forests_json"])))
+        contacts = list(_unique_by_id(c["contacts_json"]))
         contacts_name_repr = ";".join(
             [
                 f"{c['name_kanji']['last_name']} {c['name_kanji']['first_name']}"
@@ -445,6 +485,9 @@ def get_customer_csv(customers):
         )
         contacts_emails = ";".join([c["email"] for c in contacts if c["email"]])
         any_contact_own_forests = any(c["forest_count"] for c in contacts)
+        tags = c["tags"]
+        if isinstance(tags, str):
+            tags = json.loads(tags)
         yield [
             c["business_id"],
             c["fullname_kanji"],
@@ -469,7 +512,7 @@ def get_customer_csv(customers):
             c["bank_account_type"],
             f"'{c['bank_account_number'] or ''}'",
             c["bank_account_name"],
-            parse_tags_for_csv(c["tags"]),
+            parse_tags_for_csv(tags),
         ]
 
 
@@ -516,15 +559,8 @@ def update_basic_info(data):
     customer.name_kanji = self_contact.name_kanji
     customer.address = self_contact.address
     customer.save(update_fields=["address", "name_kana", "name_kanji", "updated_at"])
-
-    # cache saving for forest
-    values_list = customer.forestcustomer_set.values_list("forest_id", flat=True)
-    if len(values_list) > 0:
-        async_task(
-            refresh_customer_forest_cache,
-            list(values_list),
-            task_name=f"update_basic_info__forest_cache__{uuid.uuid4().hex.replace('-', '')}",
-        )
+    # forest, archive and postal history caches depend on the self contact,
+    # its write is fed to them by the change log
 
     return customer
 
@@ -551,17 +587,7 @@ def contacts_list_with_search(search_str: str = None):
     ).all()
 
     if search_str:
-        queryset = queryset.filter(
-            Q(customer_name_kanji_text__icontains=search_str)
-            | Q(customer_name_kana_text__icontains=search_str)
-            | Q(postal_code__icontains=search_str)
-            | Q(telephone__icontains=search_str)
-            | Q(mobilephone__icontains=search_str)
-            | Q(email__icontains=search_str)
-            | Q(address__sector__icontains=search_str)
-            | Q(address__prefecture__icontains=search_str)
-            | Q(address__municipality__icontains=search_str)
-        )
+        queryset = queryset.filter(search_document__icontains=search_str)
     return queryset
 
 
@@ -577,6 +603,7 @@ def customercontacts_list_with_search(search_str: str = None):
             is_basic=F("customercontact__is_basic"),
             forests_count=Subquery(cc_forests_count.values("forests_count")[:1]),
             cc_attrs=F("customercontact__attributes"),
+            customer_search_document=F("customercontact__customer__search_document"),
             customer_name_kanji=RawSQL(
                 """select C0.name_kanji
                     from crm_contact C0
@@ -610,18 +637,13 @@ def customercontacts_list_with_search(search_str: str = None):
     )
     if search_str:
         queryset = queryset.filter(
-            Q(customer_name_kanji_text__icontains=search_str)
-            | Q(customer_name_kana_text__icontains=search_str)
-            | Q(postal_code__icontains=search_str)
-            | Q(telephone__icontains=search_str)
-            | Q(mobilephone__icontains=search_str)
-            | Q(email__icontains=search_str)
-            | Q(address__sector__icontains=search_str)
-            | Q(address__prefecture__icontains=search_str)
-            | Q(address__municipality__icontains=search_str)
+            Q(search_document__icontains=search_str)
             | reduce(
                 operator.and_,
-                (Q(tags_repr__icontains=v) for v in search_str.split(",")),
+                (
+                    Q(customer_search_document__icontains=v)
+                    for v in search_str.split(",")
+                ),
             )
         )
     return queryset
@@ -831,9 +853,11 @@ def update_customer_tags(data: dict):
     Customer.objects.filter(id__in=ids).update(
         tags=RawSQL("tags || jsonb_build_object(%s, %s)", params=[tag_key, new_value])
     )
+    invalidate_counts(Customer._meta.db_table)
 
 
-def save_customer_from_csv_data(customer, data):
+def apply_customer_csv_data(customer, data):
+    """set csv values on the customer and its self contact, without saving"""
     self_contact = customer.self_contact
     self_contact.name_kanji = data.name_kanji
     self_contact.name_kana = data.name_kana
@@ -842,7 +866,5 @@ def save_customer_from_csv_data(customer, data):
     self_contact.telephone = data.telephone
     self_contact.mobilephone = data.mobilephone
     self_contact.email = data.email
-    self_contact.save()
     customer.tags = data.tags_json
     customer.banking = data.banking
-    customer.save()
@@ -1,15 +1,26 @@
 import csv
 
 from django.db import OperationalError
+from django.db.models import Prefetch
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 import pydantic
 
 from hyakumori_crm.core.decorators import errors_wrapper
+from hyakumori_crm.crm.common.constants import CUSTOMER_ID_PREFIX, CUSTOMER_ID_SEQUENCE
+from hyakumori_crm.crm.common.utils import generate_sequential_ids
 from hyakumori_crm.crm.models import Customer, Contact, CustomerContact, Forest
 
 from .schemas import CustomerUploadCsv
-from .service import save_customer_from_csv_data
+from .service import apply_customer_csv_data
+from ..cache.archive import (
+    refresh_customers_cache_by_ids as refresh_archive_customers_cache,
+)
+from ..cache.counts import invalidate_counts
 from ..cache.forest import refresh_customer_forest_cache
+from ..cache.postal_history import (
+    refresh_customers_cache_by_ids as refresh_postalhistory_customers_cache,
+)
 
 
 header_map = {
@@ -42,58 +53,146 @@ header_map = {
 }
 
 
-def csv_upload(fp):
+CSV_UPLOAD_CHUNK_SIZE = 500
+
+SELF_CONTACT_CSV_FIELDS = [
+    "name_kanji",
+    "name_kana",
+    "postal_code",
+    "address",
+    "telephone",
+    "mobilephone",
+    "email",
+    "updated_at",
+]
+
+
+def csv_validation_errors(e: pydantic.ValidationError):
+    errors = {}
+    for key, msgs in errors_wrapper(e.errors()).items():
+        if key == "__root__":
+            errors[key] = msgs
+        else:
+            errors[header_map[key]] = msgs
+    return errors
+
+
+def lock_customers(business_ids):
+    """
+    Lock the customers of a chunk with one query, self contacts prefetched
+    :return: customers by business id
+    """
+    customers = (
+        Customer.objects.select_for_update(nowait=True)
+        .filter(business_id__in=business_ids)
+        .prefetch_related(
+            Prefetch(
+                "customercontact_set",
+                queryset=CustomerContact.objects.filter(is_basic=True).select_related(
+                    "contact"
+                ),
+            )
+        )
+    )
+    return {c.business_id: c for c in customers}
+
+
+def csv_upload_chunk(chunk, customer_ids):
+    """
+    Validate and save a chunk of csv rows at once.
+    :param chunk: list of (line number, row data)
+    :param customer_ids: ids of updated customers are appended to it
+    :return: error of the first failing line, None if whole chunk was saved
+    """
+    try:
+        customers = lock_customers(
+            {row["business_id"] for line, row in chunk if row["business_id"]}
+        )
+    except OperationalError:
+        return {
+            "errors": {"__root__": [_("Current resources are not ready for update!!")]}
+        }
+
+    updated = {}
+    created = []
+    for line, row_data in chunk:
+        if not row_data["business_id"]:
+            c = Customer()
+            c._self_contact = Contact()
+            created.append(c)
+        else:
+            c = customers.get(row_data["business_id"])
+            if c is None:
+                return {"line": line, "errors": {"__root__": [_("Customer not found")]}}
+            updated[c.pk] = c
+        try:
+            apply_customer_csv_data(c, CustomerUploadCsv(**row_data))
+        except pydantic.ValidationError as e:
+            return {"line": line, "errors": csv_validation_errors(e)}
+
+    # one statement for the whole chunk instead of one per new customer
+    business_ids = generate_sequential_ids(
+        CUSTOMER_ID_PREFIX, CUSTOMER_ID_SEQUENCE, len(created)
+    )
+    for c, business_id in zip(created, business_ids):
+        c.business_id = business_id
+    Contact.objects.bulk_create([c.self_contact for c in created])
+    Customer.objects.bulk_create(created)
+    CustomerContact.objects.bulk_create(
+        [
+            CustomerContact(is_basic=True, customer=c, contact=c.self_contact)
+            for c in created
+        ]
+    )
+
+    now = timezone.now()
+    for c in updated.values():
+        c.updated_at = now
+        c.self_contact.updated_at = now
+    Contact.objects.bulk_update(
+        [c.self_contact for c in updated.values()], fields=SELF_CONTACT_CSV_FIELDS
+    )
+    Customer.objects.bulk_update(
+        updated.values(), fields=["tags", "banking", "updated_at"]
+    )
+    customer_ids.extend(updated)
+    return None
+
+
+def csv_upload(fp, progress=None):
     with open(fp, mode="r", encoding="utf-8-sig") as f:
         reader = csv.DictReader(f)
         if list(header_map.values()) != reader.fieldnames:
             return {"errors": {"__root__": [_("Invalid csv file!")]}}
-        line_count = 0
+        # header line
+        line_count = 1
         customer_ids = []
+        chunk = []
         for row in reader:
-            if line_count == 0:
-                line_count += 1
-            row_data = {k: row[v] for k, v in header_map.items()}
-            customer_contact = None
-            if not row_data["business_id"]:
-                c = Customer()
-                self_contact = Contact()
-                c._self_contact = self_contact
-                customer_contact = CustomerContact(
-                    is_basic=True, customer=c, contact=self_contact
-                )
-            else:
-                try:
-                    c = Customer.objects.select_for_update(nowait=True).get(
-                        business_id=row_data["business_id"]
-                    )
-                    customer_ids.append(c.id)
-                except Customer.DoesNotExist:
-                    return {
-                        "line": line_count + 1,
-                        "errors": {"__root__": [_("Customer not found")]},
-                    }
-                except OperationalError:
-                    return {
-                        "errors": {
-                            "__root__": [
-                                _("Current resources are not ready for update!!")
-                            ]
-                        }
-                    }
-            try:
-                customer_data = CustomerUploadCsv(**row_data)
-                save_customer_from_csv_data(c, customer_data)
-                if customer_contact is not None:
-                    customer_contact.save()
-            except pydantic.ValidationError as e:
-                errors = {}
-                for key, msgs in errors_wrapper(e.errors()).items():
-                    if key == "__root__":
-                        errors[key] = msgs
-                    else:
-                        errors[header_map[key]] = msgs
-                return {"line": line_count + 1, "errors": errors}
             line_count += 1
+            chunk.append((line_count, {k: row[v] for k, v in header_map.items()}))
+            if len(chunk) >= CSV_UPLOAD_CHUNK_SIZE:
+                error = csv_upload_chunk(chunk, customer_ids)
+                if error is not None:
+                    return error
+                chunk = []
+                if progress is not None:
+                    progress(line_count - 1)
+        if chunk:
+            error = csv_upload_chunk(chunk, customer_ids)
+            if error is not None:
+                return error
+        if line_count == 1:
+            return 0
+
+        # bulk writes send no post_save, refresh related caches once
+        invalidate_counts(
+            Customer._meta.db_table,
+            Contact._meta.db_table,
+            CustomerContact._meta.db_table,
+        )
+        refresh_archive_customers_cache(customer_ids)
+        refresh_postalhistory_customers_cache(customer_ids)
         fids = Forest.objects.filter(
             forestcustomer__customer_id__in=customer_ids
         ).values_list("id", flat=True)
@@ -44,6 +44,8 @@ type CustomerList implements HyakumoriResponse {
   error: JSON
   items: [CustomerItem!]
   total: Int
+  total_exact: Boolean
+  page_info: PageInfo
 }
 
 type CustomerResponse implements HyakumoriResponse {
@@ -77,6 +79,9 @@ input TableCustomerFilterInput {
   sortBy: [String]
   sortDesc: [Boolean]
   filters: JSON
+  after: String
+  before: String
+  withTotal: Boolean
 }
 """
 )
@@ -1,15 +1,108 @@
+import json
 import operator
 from functools import reduce
 
-from django.db.models import Q, Subquery
+from django import forms
+from django.contrib.gis import forms as gis_forms
+from django.contrib.gis.geos import GEOSException, GEOSGeometry, Point, Polygon
+from django.contrib.gis.measure import D
+from django.core.exceptions import ValidationError
+from django.db.models import Exists, OuterRef, Q, Subquery
 from django.db.models.expressions import RawSQL
-from django_filters import CharFilter
+from django.utils.translation import gettext_lazy as _
+from django_filters import CharFilter, Filter
 
-from hyakumori_crm.crm.models import Forest
+from hyakumori_crm.cache.reference import contract_types
+from hyakumori_crm.crm.models import Forest, ForestContract
+from hyakumori_crm.crm.schemas.contract import (
+    ContractType as ContractTypeEnum,
+    ContractTypeStatus,
+    FSCContactStatus,
+)
 from hyakumori_crm.tags.filters import TagsFilterSet
 from hyakumori_crm.core.filters import MultipleOrFilterSet
 
 
+GEODATA_SRID = Forest._meta.get_field("geodata").srid
+
+
+def _parse_numbers(value, count, message):
+    if isinstance(value, str):
+        value = value.split(",")
+    try:
+        numbers = [float(v) for v in value]
+    except (TypeError, ValueError):
+        raise ValidationError(message)
+    if len(numbers) != count:
+        raise ValidationError(message)
+    return numbers
+
+
+class GeometryField(gis_forms.GeometryField):
+    """
+    WKT, EWKT or GeoJSON given as string or object, in lon/lat when it has
+    no srid. Cleaned value is already transformed to the geodata srid.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("srid", GEODATA_SRID)
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, dict):
+            value = json.dumps(value)
+        try:
+            geometry = GEOSGeometry(value)
+        except (GEOSException, ValueError, TypeError):
+            raise ValidationError(
+                self.error_messages["invalid_geom"], code="invalid_geom"
+            )
+        if not geometry.srid:
+            geometry.srid = 4326
+        return super().to_python(geometry)
+
+
+class BBoxField(forms.Field):
+    """``min_lon,min_lat,max_lon,max_lat`` as polygon in the geodata srid"""
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        bbox = _parse_numbers(value, 4, _("Invalid bounding box"))
+        polygon = Polygon.from_bbox(bbox)
+        polygon.srid = 4326
+        return polygon.transform(GEODATA_SRID, clone=True)
+
+
+class DistanceField(forms.Field):
+    """``lon,lat,meters`` as (point in the geodata srid, distance)"""
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, dict):
+            value = [value.get("lon"), value.get("lat"), value.get("distance")]
+        lon, lat, meters = _parse_numbers(value, 3, _("Invalid distance"))
+        if meters < 0:
+            raise ValidationError(_("Invalid distance"))
+        point = Point(lon, lat, srid=4326).transform(GEODATA_SRID, clone=True)
+        return point, D(m=meters)
+
+
+class GeometryFilter(Filter):
+    field_class = GeometryField
+
+
+class BBoxFilter(Filter):
+    field_class = BBoxField
+
+
+class DistanceFilter(Filter):
+    field_class = DistanceField
+
+
 class ForestFilter(TagsFilterSet, MultipleOrFilterSet):
     # internal_id = CharFilter(method="icontains_filter")
     cadastral__municipality = CharFilter(method="icontains_filter")
@@ -18,12 +111,37 @@ class ForestFilter(TagsFilterSet, MultipleOrFilterSet):
     land_attributes__地番支番 = CharFilter(method="icontains_filter")
     owner__name_kana = CharFilter(method="owner_icontains_filter")
     owner__name_kanji = CharFilter(method="owner_icontains_filter")
-    contract_type = CharFilter(method="contract_icontains_filter")
-    contract_status = CharFilter(method="contract_icontains_filter")
+    contract_type = CharFilter(method="contract_choice_filter")
+    contract_status = CharFilter(method="contract_choice_filter")
     contract_start_date = CharFilter(method="contract_icontains_filter")
     contract_end_date = CharFilter(method="contract_icontains_filter")
-    fsc_status = CharFilter(method="fsc_icontains_filter")
+    fsc_status = CharFilter(method="contract_choice_filter")
     fsc_start_date = CharFilter(method="fsc_icontains_filter")
+    # spatial filters, input geometries are transformed once to the srid of
+    # geodata so the predicates can use its GiST index
+    bbox = BBoxFilter(field_name="geodata", lookup_expr="intersects")
+    intersects = GeometryFilter(field_name="geodata", lookup_expr="intersects")
+    within_distance = DistanceFilter(field_name="geodata", lookup_expr="dwithin")
+
+    # filtered on the trigram indexed copies kept in ForestSearch
+    search_fields = {
+        "cadastral__municipality": "search__municipality",
+        "cadastral__sector": "search__sector",
+        "land_attributes__地番本番": "search__lot_number",
+        "land_attributes__地番支番": "search__sub_lot_number",
+        "owner__name_kana": "search__owner_name_kana",
+        "owner__name_kanji": "search__owner_name_kanji",
+        "contract_start_date": "search__contract_start_date",
+        "contract_end_date": "search__contract_end_date",
+        "fsc_start_date": "search__fsc_start_date",
+    }
+
+    # ForestContract field and the lookup of the main or the FSC contract
+    contract_fields = {
+        "contract_type": ("type", {"position": 0}),
+        "contract_status": ("status", {"position": 0}),
+        "fsc_status": ("status", {"is_last": True}),
+    }
 
     @property
     def qs(self):
@@ -111,14 +229,13 @@ class ForestFilter(TagsFilterSet, MultipleOrFilterSet):
             )
         return None
 
-    def owner_icontains_filter(self, queryset, name, value):
-        search_field = ""
-        if name.find("name_kana") >= 0:
-            search_field = "attributes__customer_cache__repr_name_kana"
-        if name.find("name_kanji") >= 0:
-            search_field = "attributes__customer_cache__repr_name_kanji"
+    def icontains_filter(self, queryset, name, value):
+        return super().icontains_filter(
+            queryset, self.search_fields.get(name, name), value
+        )
 
-        search_field_filter = search_field + "__icontains"
+    def owner_icontains_filter(self, queryset, name, value):
+        search_field_filter = self.search_fields[name] + "__icontains"
         keywords = value.replace("\u3000", "").split(",")
         filters = []
         for keyword in keywords:
@@ -133,14 +250,50 @@ class ForestFilter(TagsFilterSet, MultipleOrFilterSet):
         return queryset
 
     def fsc_icontains_filter(self, queryset, name, value):
-        suffix_name = name.split("fsc_")[-1]
-        filter_name = "contracts__-1__" + suffix_name
-        return super().icontains_filter(queryset, filter_name, value)
+        return self.icontains_filter(queryset, name, value)
 
     def contract_icontains_filter(self, queryset, name, value):
-        suffix_name = name.split("contract_")[-1]
-        filter_name = "contracts__0__" + suffix_name
-        return super().icontains_filter(queryset, filter_name, value)
+        return self.icontains_filter(queryset, name, value)
+
+    @staticmethod
+    def get_contract_choices(name):
+        if name == "contract_type":
+            names = {c.name for c in contract_types.all()}
+            return names | {c.value for c in ContractTypeEnum}
+        if name == "fsc_status":
+            return {s.value for s in FSCContactStatus}
+        return {s.value for s in ContractTypeStatus}
+
+    def contract_choice_filter(self, queryset, name, value):
+        """
+        Contract types and statuses have a handful of known values, keywords
+        are matched against them first so ForestContract is searched by
+        equality on its indexes. Keywords matching none of them are searched
+        in the stored values.
+        """
+        field, contract = self.contract_fields[name]
+        keywords = list(set(map(lambda v: v.strip().upper(), value.split(","))))
+        if len(keywords) == 1 and keywords[0] == "":
+            with_value = ForestContract.objects.filter(
+                forest=OuterRef("pk"), **contract, **{f"{field}__isnull": False}
+            )
+            return queryset.filter(~Exists(with_value))
+
+        choices = self.get_contract_choices(name)
+        values = set()
+        conditions = Q()
+        for keyword in filter(None, keywords):
+            matched = {choice for choice in choices if keyword in choice.upper()}
+            if matched:
+                values |= matched
+            else:
+                conditions |= Q(**{f"{field}__icontains": keyword})
+        if values:
+            conditions |= Q(**{f"{field}__in": values})
+        contracts = ForestContract.objects.filter(
+            conditions, forest=OuterRef("pk"), **contract
+        )
+        return queryset.filter(Exists(contracts))
 
     class Meta:
         model = Forest
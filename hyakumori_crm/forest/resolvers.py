@@ -1,12 +1,20 @@
 import json
 from typing import Any
 
-from graphql import GraphQLResolveInfo, default_field_resolver
+from graphql import FieldNode, GraphQLResolveInfo, default_field_resolver
+from graphql.execution.values import get_argument_values
 from ariadne import QueryType, SchemaDirectiveVisitor
 from django.utils.translation import gettext as _
 
 from ..core.decorators import validate_model
-from .service import get_forests_by_condition
+from .service import (
+    count_forests,
+    get_expiring_contracts,
+    get_forests_by_condition,
+    get_forests_by_cursor,
+    group_expiring_contracts,
+    parse_expiring_days,
+)
 from .schemas import ForestPaginator
 from .filters import ForestFilter
 from ..graphql.decorators import login_required
@@ -19,9 +27,15 @@ class GeojsonDirective(SchemaDirectiveVisitor):
         original_resolver = field.resolve or default_field_resolver
 
         def resolve_formatted_date(obj, info, **kwargs):
-            result = original_resolver(obj, info, **kwargs)
+            # already serialized by the database, see annotate_geojson
+            if hasattr(obj, f"{info.field_name}_geojson"):
+                result = getattr(obj, f"{info.field_name}_geojson")
+                return None if result is None else json.loads(result)
+            result = original_resolver(obj, info)
             if result is None:
                 return None
+            if kwargs.get("simplify"):
+                result = result.simplify(kwargs["simplify"], preserve_topology=True)
             return json.loads(result.transform(4326, clone=True).geojson)
         field.resolve = resolve_formatted_date
         return field
@@ -115,19 +129,74 @@ def get_foresttable_headers(obj: Any, info: GraphQLResolveInfo, **kwargs) -> dic
     return {"ok": True, "headers": headers}
 
 
+def _selected_fields(node, name):
+    if node.selection_set is None:
+        return []
+    return [
+        selection
+        for selection in node.selection_set.selections
+        if isinstance(selection, FieldNode) and selection.name.value == name
+    ]
+
+
+def get_requested_geojson(info: GraphQLResolveInfo):
+    """
+    Arguments of ``forests { geodata }`` when it is selected, None otherwise,
+    so geometries are only serialized when the client asks for them
+    """
+    geodata_field = info.schema.get_type("Forest").fields["geodata"]
+    for field_node in info.field_nodes:
+        for forests_node in _selected_fields(field_node, "forests"):
+            for geodata_node in _selected_fields(forests_node, "geodata"):
+                return get_argument_values(
+                    geodata_field, geodata_node, info.variable_values
+                )
+    return None
+
+
 @query.field("list_forests")
 @login_required(with_policies=["can_view_forests"])
 @validate_model(ForestPaginator)
 def get_list_forests(obj, info, data, **kwargs) -> dict:
     pager_input = data.dict()
-    forests, total = get_forests_by_condition(
+    geojson = get_requested_geojson(info)
+    total, total_exact = None, None
+    if not data.is_cursor_mode or pager_input["with_total"]:
+        total, total_exact = count_forests(pager_input["filters"])
+    if data.is_cursor_mode:
+        forests, page_info = get_forests_by_cursor(
+            per_page=pager_input["per_page"],
+            after=pager_input["after"],
+            before=pager_input["before"],
+            filters=pager_input["filters"],
+            geojson=geojson,
+        )
+        return dict(
+            forests=forests,
+            total=total,
+            total_exact=total_exact,
+            page_info=page_info,
+        )
+    forests, _ = get_forests_by_condition(
         page_num=pager_input["page_num"],
         per_page=pager_input["per_page"],
         pre_per_page=pager_input["pre_per_page"],
         order_by=pager_input["order_by"],
         filters=pager_input["filters"],
+        with_total=False,
+        geojson=geojson,
+    )
+    return dict(forests=forests, total=total, total_exact=total_exact)
+
+
+@query.field("expiring_contracts")
+@login_required(with_policies=["can_view_forests"])
+def get_expiring_contracts_report(obj, info, days=None, **kwargs) -> dict:
+    days = parse_expiring_days(days)
+    contracts = get_expiring_contracts(days)
+    return dict(
+        ok=True, days=days, municipalities=group_expiring_contracts(contracts)
     )
-    return dict(forests=forests, total=total)
 
 
 resolvers = [query]
@@ -5,18 +5,16 @@ import operator
 import time
 from functools import reduce
 
-from django.core.cache import cache
-from django.db import transaction
 from django.db.models import Q, F, Count
 from django.db.models.expressions import RawSQL
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils.translation import gettext_lazy as _
 from rest_framework import mixins
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
-from hyakumori_crm.core.utils import default_paginator
+from hyakumori_crm.core.utils import default_paginator, Echo
 from hyakumori_crm.crm.models import Forest, Archive, PostalHistory
 from hyakumori_crm.crm.restful.serializers import (
     CustomerSerializer,
@@ -31,8 +29,9 @@ from ..api.decorators import (
     api_validate_model,
     get_or_404,
 )
-from ..core.utils import clear_maintain_task_id_cache
 from ..permissions.enums import SystemGroups
+from ..tasks.imports import create_import_job
+from ..tasks.serializers import ImportJobSerializer
 
 from .schemas import (
     ForestInput,
@@ -55,11 +54,19 @@ from .service import (
     get_forests_for_csv,
     update_forest_tags,
     csv_headers,
-    csv_upload,
     get_forests_tag_by_ids,
     bulk_update_forest_contact_status,
+    annotate_geojson,
+    geojson_options,
+    get_expiring_contracts,
+    group_expiring_contracts,
+    parse_expiring_days,
+    expiring_contract_data_mapping,
+    expiring_contract_csv_row,
+    EXPIRING_CONTRACTS_CSV_HEADERS,
 )
 from .permissions import DownloadCsvPersmission
+from .tiles import get_forest_tile, is_valid_tile
 
 
 class ForestViewSets(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
@@ -67,6 +74,14 @@ class ForestViewSets(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericVi
     permission_classes = [Forest.model_perm_cls()]
     queryset = Forest.objects.all()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ["list", "retrieve"]:
+            queryset = annotate_geojson(
+                queryset, **geojson_options(self.request.query_params)
+            )
+        return queryset
+
     @action(["GET"], detail=False, url_path="minimal")
     def list_minimal(self, request):
         query = (
@@ -194,18 +209,55 @@ class ForestViewSets(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericVi
             csv_data = get_forests_for_csv()
         else:
             csv_data = get_forests_for_csv(request.data)
-        response = HttpResponse(
-            content=codecs.BOM_UTF8,
+
+        def generator(headers, rows):
+            yield headers
+            for row in rows:
+                yield forest_csv_data_mapping(row)
+
+        pseudo_buffer = Echo(codecs.BOM_UTF8.decode())
+        writer = csv.writer(pseudo_buffer, dialect="excel")
+        response = StreamingHttpResponse(
+            (writer.writerow(row) for row in generator(csv_headers(), csv_data)),
+            content_type="text/csv; charset=utf-8-sig",
+            charset="utf-8",  # prevent get from content-type
+        )
+        response["Content-Disposition"] = "attachment"
+        return response
+
+    @action(detail=False, methods=["GET"], url_path="expiring-contracts")
+    def expiring_contracts(self, request):
+        days = parse_expiring_days(request.GET.get("days"))
+        contracts = get_expiring_contracts(days)
+        return Response(
+            {"days": days, "municipalities": group_expiring_contracts(contracts)}
+        )
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        url_path="expiring-contracts/download-csv",
+        permission_classes=[DownloadCsvPersmission],
+    )
+    def download_expiring_contracts_csv(self, request):
+        days = parse_expiring_days(request.GET.get("days"))
+        contracts = get_expiring_contracts(days).iterator()
+
+        def generator():
+            yield EXPIRING_CONTRACTS_CSV_HEADERS
+            for contract in contracts:
+                yield expiring_contract_csv_row(
+                    expiring_contract_data_mapping(contract)
+                )
+
+        pseudo_buffer = Echo(codecs.BOM_UTF8.decode())
+        writer = csv.writer(pseudo_buffer, dialect="excel")
+        response = StreamingHttpResponse(
+            (writer.writerow(row) for row in generator()),
             content_type="text/csv; charset=utf-8-sig",
             charset="utf-8",  # prevent get from content-type
         )
         response["Content-Disposition"] = "attachment"
-        headers = csv_headers()
-        writer = csv.writer(response, dialect="excel")
-        writer.writerow(headers)
-        for forest in csv_data:
-            csv_row = forest_csv_data_mapping(forest)
-            writer.writerow(csv_row)
         return response
 
     @action(detail=False, methods=["PUT"], url_path="ids")
@@ -239,22 +291,8 @@ class ForestViewSets(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericVi
         with open(fp, "wb+") as destination:
             for chunk in csv_file.chunks():
                 destination.write(chunk)
-        cache.set("maintain_task_id", f"forests/{file_name}", None)
-        try:
-            r = csv_upload(fp)
-        except UnicodeDecodeError:
-            transaction.set_rollback(True)
-            return Response(
-                {"errors": {"__root__": [_("Please upload a csv file!!")]}}, 400
-            )
-        else:
-            if type(r) is int:
-                return Response({"msg": "OK"}, status=200)
-            else:
-                transaction.set_rollback(True)
-                return Response(r, status=400)
-        finally:
-            clear_maintain_task_id_cache()
+        job = create_import_job("forests", fp, author=request.user)
+        return Response(ImportJobSerializer(job).data, status=202)
 
     @action(detail=False, methods=["PUT"], url_path="contracts/status")
     @api_validate_model(ForestContractStatusBulkUpdate)
@@ -301,3 +339,13 @@ def set_default_customer_contact_view(
     set_default_customer_contact(data)
     ActivityService.log(ForestActions.customers_updated, data.forest, request=request)
     return Response({"id": data.forest.id})
+
+
+@api_view(["GET"])
+@permission_classes([Forest.model_perm_cls()])
+def forest_tile_view(request, z, x, y):
+    if not is_valid_tile(z, x, y):
+        raise Http404()
+    return HttpResponse(
+        get_forest_tile(z, x, y), content_type="application/vnd.mapbox-vector-tile"
+    )
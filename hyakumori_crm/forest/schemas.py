@@ -18,7 +18,7 @@ from hyakumori_crm.crm.schemas.contract import (
     ContractTypeStatus,
     FSCContactStatus,
 )
-from hyakumori_crm.contracts.models import ContractType as ContractTypeModel
+from hyakumori_crm.contracts.services import get_assignable_contracttype_names
 from hyakumori_crm.crm.schemas.forest import LandAttribute, ForestAttribute
 from hyakumori_crm.crm.common.utils import tags_csv_to_dict
 from hyakumori_crm.forest.filters import ForestFilter
@@ -38,9 +38,7 @@ class Cadastral(HyakumoriDanticModel):
 
 
 def validate_contract_type(value):
-    values = ContractTypeModel.objects.filter(attributes__assignable=True).values_list(
-        "name", flat=True
-    )
+    values = get_assignable_contracttype_names()
     if value and value not in values:
         raise EnumError(enum_values=values, permitted=", ".join(v for v in values))
     return value
@@ -2,20 +2,31 @@ import csv
 import itertools
 import json
 from collections import defaultdict
+from datetime import timedelta
 from typing import Iterator, Union
 
 import pydantic
 from django.core.exceptions import ValidationError
 from django.db import OperationalError, connection
-from django.db.models import F, OuterRef, Subquery, Count
+from django.contrib.gis.db.models import MultiPolygonField
+from django.contrib.gis.db.models.functions import AsGeoJSON, Transform
+from django.db.models import F, Func, OuterRef, Subquery, Count, Value
 from django.db.models.expressions import RawSQL
+from django.db.models.fields.json import KeyTextTransform, KeyTransform
 from django.db import ProgrammingError
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from querybuilder.query import Query, QueryWindow
 from querybuilder.fields import RowNumberField
 
+from ..cache.archive import refresh_forests_cache as refresh_archive_forests_cache
+from ..cache.counts import invalidate_counts, queryset_count
 from ..cache.forest import refresh_customer_forest_cache
+from ..cache.postal_history import (
+    refresh_forests_cache as refresh_postalhistory_forests_cache,
+)
 from ..core.decorators import errors_wrapper
+from ..core.utils import cursor_page, decode_cursor
 from ..crm.common.constants import (
     FOREST_CADASTRAL,
     FOREST_LAND_ATTRIBUTES,
@@ -25,6 +36,7 @@ from ..crm.common.constants import (
 )
 from ..crm.models import (
     Forest,
+    ForestContract,
     ForestCustomer,
     Customer,
     CustomerContact,
@@ -32,6 +44,7 @@ from ..crm.models import (
     Contact,
 )
 from ..crm.schemas.contract import ContractType as ContractTypeEnum
+from ..crm.schemas.contract import ContractTypeStatus
 
 from .schemas import (
     CustomerDefaultInput,
@@ -146,6 +159,8 @@ def get_forests_by_condition(
     pre_per_page: Union[int, None] = None,
     order_by: Union[Iterator, None] = None,
     filters: Union[ForestFilter, None] = None,
+    with_total: bool = True,
+    geojson: Union[dict, None] = None,
 ):
     offset = (pre_per_page or per_page) * (page_num - 1)
     if not order_by:
@@ -153,11 +168,139 @@ def get_forests_by_condition(
     if filters and not filters.is_valid():
         return [], 0
     query = filters.qs
-    total = query.count()
+    if geojson is not None:
+        query = annotate_geojson(query, **geojson)
+    total = count_forests(filters)[0] if with_total else None
     forests = query.order_by("internal_id")[offset : offset + per_page]
     return forests, total
 
 
+def count_forests(filters: ForestFilter):
+    """
+    :return: (total, exact), cached per filter and estimated when unfiltered
+    """
+    if filters and not filters.is_valid():
+        return 0, True
+    # tables only referenced by the customer tags subquery
+    return queryset_count(
+        filters.qs,
+        tables=("crm_forestcustomer", "crm_customer"),
+        estimate=not filters.data,
+    )
+
+
+def annotate_geojson(queryset, simplify=None, precision=None):
+    """
+    Serialize geodata to GeoJSON in the database as ``geodata_geojson``,
+    so the geometry is never parsed into GEOS objects.
+    :param simplify: tolerance in meters, applied before reprojecting
+    :param precision: max decimal digits of the coordinates
+    """
+    geometry = F("geodata")
+    if simplify:
+        geometry = Func(
+            geometry,
+            Value(simplify),
+            function="ST_SimplifyPreserveTopology",
+            output_field=MultiPolygonField(srid=2447),
+        )
+    kwargs = {} if precision is None else {"precision": precision}
+    return queryset.annotate(
+        geodata_geojson=AsGeoJSON(Transform(geometry, 4326), **kwargs)
+    )
+
+
+def geojson_options(params):
+    """
+    ``simplify`` and ``precision`` of annotate_geojson from query params,
+    invalid values are ignored
+    """
+    options = {}
+    try:
+        simplify = float(params.get("simplify", 0))
+        if simplify > 0:
+            options["simplify"] = simplify
+    except ValueError:
+        pass
+    try:
+        precision = int(params["precision"])
+        if 0 <= precision <= 15:
+            options["precision"] = precision
+    except (KeyError, ValueError):
+        pass
+    return options
+
+
+def _seek_forests(query, where, params, ordering, limit):
+    if where:
+        query = query.extra(where=[where], params=params)
+    return list(query.order_by(*ordering)[:limit])
+
+
+def get_forests_by_cursor(
+    per_page: int = 10,
+    after: Union[str, None] = None,
+    before: Union[str, None] = None,
+    filters: Union[ForestFilter, None] = None,
+    geojson: Union[dict, None] = None,
+):
+    """
+    Keyset pagination ordered by (internal_id, id), forests without
+    internal_id come last. Each page is a seek on the
+    (internal_id, id) index.
+    """
+    if filters and not filters.is_valid():
+        return [], None
+    query = filters.qs
+    if geojson is not None:
+        query = annotate_geojson(query, **geojson)
+    limit = per_page + 1
+    backward = before is not None
+    token = before if backward else after
+    internal_id, pk = decode_cursor(token) if token else (None, None)
+    key = "crm_forest.internal_id"
+    row = "(crm_forest.internal_id, crm_forest.id)"
+
+    if not backward:
+        ordering = ("internal_id", "id")
+        if not token:
+            forests = _seek_forests(query, None, [], ordering, limit)
+        elif internal_id is None:
+            forests = _seek_forests(
+                query, f"{key} IS NULL AND crm_forest.id > %s", [pk], ordering, limit
+            )
+        else:
+            forests = _seek_forests(
+                query, f"{row} > (%s, %s)", [internal_id, pk], ordering, limit
+            )
+            if len(forests) < limit:
+                forests += _seek_forests(
+                    query, f"{key} IS NULL", [], ordering, limit - len(forests)
+                )
+    else:
+        # descending puts nulls first
+        ordering = ("-internal_id", "-id")
+        if not token:
+            forests = _seek_forests(query, None, [], ordering, limit)
+        elif internal_id is None:
+            forests = _seek_forests(
+                query, f"{key} IS NULL AND crm_forest.id < %s", [pk], ordering, limit
+            )
+            if len(forests) < limit:
+                forests += _seek_forests(
+                    query, f"{key} IS NOT NULL", [], ordering, limit - len(forests)
+                )
+        else:
+            forests = _seek_forests(
+                query, f"{row} < (%s, %s)", [internal_id, pk], ordering, limit
+            )
+
+    forests, page_info = cursor_page(
+        forests, per_page, backward, token, lambda f: (f.internal_id, f.id)
+    )
+    return forests, page_info
+
+
 def update_basic_info(forest: Forest, forest_in: ForestInput):
     forest.cadastral = forest_in.cadastral.dict()
     forest.land_attributes["地番本番"] = forest_in.land_attributes.get("地番本番")
@@ -176,6 +319,8 @@ def update_forest_tags(data: dict):
     Forest.objects.filter(id__in=ids).update(
         tags=RawSQL("tags || jsonb_build_object(%s, %s)", params=[tag_key, new_value])
     )
+    # queryset updates skip post_save
+    invalidate_counts(Forest._meta.db_table)
 
 
 def update_owners(owner_pks_in):
@@ -311,7 +456,13 @@ def csv_headers():
     )
 
 
-def get_forests_for_csv(forest_ids: list = None):
+FOREST_CSV_BATCH_SIZE = 2000
+CSV_UPLOAD_CHUNK_SIZE = 500
+
+
+def get_forests_for_csv(
+    forest_ids: list = None, batch_size: int = FOREST_CSV_BATCH_SIZE
+):
     forestcustomercontact_rank_query = Query().from_table(
         ForestCustomerContact,
         [
@@ -424,10 +575,21 @@ def get_forests_for_csv(forest_ids: list = None):
     )
     if forest_ids is not None and len(forest_ids) > 0:
         queryset = queryset.where(id__in=forest_ids)
-    try:
-        return queryset.select()
-    except ProgrammingError:
-        return []
+    sql, args = queryset.get_sql(), queryset.get_args()
+    # named cursor, rows are pulled from the server batch by batch so memory
+    # stays flat no matter how many forests are exported
+    with connection.chunked_cursor() as cursor:
+        try:
+            cursor.execute(sql, args)
+            rows = cursor.fetchmany(batch_size)
+        except ProgrammingError:
+            return
+        # description of a named cursor is only available after the first fetch
+        columns = [col[0] for col in cursor.description or []]
+        while rows:
+            for row in rows:
+                yield dict(zip(columns, row))
+            rows = cursor.fetchmany(batch_size)
 
 
 def parse_tags_for_csv(tags: dict):
@@ -442,129 +604,68 @@ def parse_tags_for_csv(tags: dict):
         return result[0 : len(result) - 2]
 
 
+def _load_json_column(value):
+    if value is None:
+        return {}
+    if isinstance(value, (str, bytes)):
+        return json.loads(value)
+    return value
+
+
+def _join_name(name: dict):
+    return "\u3000".join(
+        filter(lambda x: x, [name.get("last_name"), name.get("first_name")])
+    )
+
+
+def _join_address(address: dict):
+    return " ".join(
+        filter(
+            lambda x: x,
+            [
+                address.get("prefecture"),
+                address.get("municipality"),
+                address.get("sector"),
+            ],
+        )
+    )
+
+
+_CSV_CADASTRAL_KEYS = ("prefecture", "municipality", "sector", "subsector")
+_CSV_LAND_ATTRIBUTES_KEYS = tuple(FOREST_LAND_ATTRIBUTES)
+_CSV_FOREST_ATTRIBUTES_KEYS = tuple(FOREST_ATTRIBUTES)
+
+
 def forest_csv_data_mapping(forest):
+    """
+    Map a row of `get_forests_for_csv` to a csv row (same order as `csv_headers`).
+    Each json column is decoded only once per row.
+    """
+    cadastral = _load_json_column(forest["cadastral"])
+    land_attributes = _load_json_column(forest["land_attributes"])
+    contracts = _load_json_column(forest["contracts"])
+    forest_attributes = _load_json_column(forest["forest_attributes"])
+    contract = contracts[0]
+    fsc = contracts[-1]
     return [
         forest["id"],
         forest["internal_id"],
-        json.loads(forest["cadastral"]).get("prefecture"),
-        json.loads(forest["cadastral"]).get("municipality"),
-        json.loads(forest["cadastral"]).get("sector"),
-        json.loads(forest["cadastral"]).get("subsector"),
-        json.loads(forest["land_attributes"]).get("地番本番"),
-        json.loads(forest["land_attributes"]).get("地番支番"),
-        json.loads(forest["land_attributes"]).get("地目"),
-        json.loads(forest["land_attributes"]).get("林班"),
-        json.loads(forest["land_attributes"]).get("小班"),
-        json.loads(forest["land_attributes"]).get("区画"),
-        "\u3000".join(
-            filter(
-                lambda x: x,
-                [
-                    json.loads((forest.get("customer_name_kanji") or '{}')).get("last_name"),
-                    json.loads((forest.get("customer_name_kanji") or '{}')).get("first_name"),
-                ],
-            )
-        ),
-        "\u3000".join(
-            filter(
-                lambda x: x,
-                [
-                    json.loads((forest.get("customer_name_kana") or '{}')).get("last_name"),
-                    json.loads((forest.get("customer_name_kana") or '{}')).get("first_name"),
-                ],
-            )
-        ),
-        " ".join(
-            filter(
-                lambda x: x,
-                [
-                    json.loads((forest.get("customer_address") or '{}')).get("prefecture"),
-                    json.loads((forest.get("customer_address") or '{}')).get("municipality"),
-                    json.loads((forest.get("customer_address") or '{}')).get("sector"),
-                ],
-            )
-        ),
-        "\u3000".join(
-            filter(
-                lambda x: x,
-                [
-                    json.loads((forest.get("contact_name_kanji") or '{}')).get("last_name"),
-                    json.loads((forest.get("contact_name_kanji") or '{}')).get("first_name"),
-                ],
-            )
-        ),
-        "\u3000".join(
-            filter(
-                lambda x: x,
-                [
-                    json.loads((forest.get("contact_name_kana") or '{}')).get("last_name"),
-                    json.loads((forest.get("contact_name_kana") or '{}')).get("first_name"),
-                ],
-            )
-        ),
-        " ".join(
-            filter(
-                lambda x: x,
-                [
-                    json.loads((forest.get("contact_address") or '{}')).get("prefecture"),
-                    json.loads((forest.get("contact_address") or '{}')).get("municipality"),
-                    json.loads((forest.get("contact_address") or '{}')).get("sector"),
-                ],
-            )
-        ),
-        json.loads(forest["contracts"])[0].get("type"),
-        json.loads(forest["contracts"])[0].get("status"),
-        f'"{json.loads(forest["contracts"])[0].get("start_date") or ""}"',
-        f'"{json.loads(forest["contracts"])[0].get("end_date") or ""}"',
-        json.loads(forest["contracts"])[-1].get("status"),
-        f'"{json.loads(forest["contracts"])[-1].get("start_date") or ""}"',
-        parse_tags_for_csv(json.loads(forest["tags"])),
-        json.loads(forest["forest_attributes"]).get("地番面積_ha"),
-        json.loads(forest["forest_attributes"]).get("面積_ha"),
-        json.loads(forest["forest_attributes"]).get("面積_m2"),
-        json.loads(forest["forest_attributes"]).get("平均傾斜度"),
-        json.loads(forest["forest_attributes"]).get("第1林相ID"),
-        json.loads(forest["forest_attributes"]).get("第1林相名"),
-        json.loads(forest["forest_attributes"]).get("第1Area"),
-        json.loads(forest["forest_attributes"]).get("第1面積_ha"),
-        json.loads(forest["forest_attributes"]).get("第1立木本"),
-        json.loads(forest["forest_attributes"]).get("第1立木密"),
-        json.loads(forest["forest_attributes"]).get("第1平均樹"),
-        json.loads(forest["forest_attributes"]).get("第1樹冠長"),
-        json.loads(forest["forest_attributes"]).get("第1平均DBH"),
-        json.loads(forest["forest_attributes"]).get("第1合計材"),
-        json.loads(forest["forest_attributes"]).get("第1ha材積"),
-        json.loads(forest["forest_attributes"]).get("第1収量比"),
-        json.loads(forest["forest_attributes"]).get("第1相対幹"),
-        json.loads(forest["forest_attributes"]).get("第1形状比"),
-        json.loads(forest["forest_attributes"]).get("第2林相ID"),
-        json.loads(forest["forest_attributes"]).get("第2林相名"),
-        json.loads(forest["forest_attributes"]).get("第2Area"),
-        json.loads(forest["forest_attributes"]).get("第2面積_ha"),
-        json.loads(forest["forest_attributes"]).get("第2立木本"),
-        json.loads(forest["forest_attributes"]).get("第2立木密"),
-        json.loads(forest["forest_attributes"]).get("第2平均樹"),
-        json.loads(forest["forest_attributes"]).get("第2樹冠長"),
-        json.loads(forest["forest_attributes"]).get("第2平均DBH"),
-        json.loads(forest["forest_attributes"]).get("第2合計材"),
-        json.loads(forest["forest_attributes"]).get("第2ha材積"),
-        json.loads(forest["forest_attributes"]).get("第2収量比"),
-        json.loads(forest["forest_attributes"]).get("第2相対幹"),
-        json.loads(forest["forest_attributes"]).get("第2形状比"),
-        json.loads(forest["forest_attributes"]).get("第3林相ID"),
-        json.loads(forest["forest_attributes"]).get("第3林相名"),
-        json.loads(forest["forest_attributes"]).get("第3Area"),
-        json.loads(forest["forest_attributes"]).get("第3面積_ha"),
-        json.loads(forest["forest_attributes"]).get("第3立木本"),
-        json.loads(forest["forest_attributes"]).get("第3立木密"),
-        json.loads(forest["forest_attributes"]).get("第3平均樹"),
-        json.loads(forest["forest_attributes"]).get("第3樹冠長"),
-        json.loads(forest["forest_attributes"]).get("第3平均DBH"),
-        json.loads(forest["forest_attributes"]).get("第3合計材"),
-        json.loads(forest["forest_attributes"]).get("第3ha材積"),
-        json.loads(forest["forest_attributes"]).get("第3収量比"),
-        json.loads(forest["forest_attributes"]).get("第3相対幹"),
-        json.loads(forest["forest_attributes"]).get("第3形状比"),
+        *(cadastral.get(key) for key in _CSV_CADASTRAL_KEYS),
+        *(land_attributes.get(key) for key in _CSV_LAND_ATTRIBUTES_KEYS),
+        _join_name(_load_json_column(forest.get("customer_name_kanji"))),
+        _join_name(_load_json_column(forest.get("customer_name_kana"))),
+        _join_address(_load_json_column(forest.get("customer_address"))),
+        _join_name(_load_json_column(forest.get("contact_name_kanji"))),
+        _join_name(_load_json_column(forest.get("contact_name_kana"))),
+        _join_address(_load_json_column(forest.get("contact_address"))),
+        contract.get("type"),
+        contract.get("status"),
+        f'"{contract.get("start_date") or ""}"',
+        f'"{contract.get("end_date") or ""}"',
+        fsc.get("status"),
+        f'"{fsc.get("start_date") or ""}"',
+        parse_tags_for_csv(_load_json_column(forest["tags"])),
+        *(forest_attributes.get(key) for key in _CSV_FOREST_ATTRIBUTES_KEYS),
     ]
 
 
@@ -633,53 +734,99 @@ def update_forest_csv(forest, data: ForestCsvInput):
     forest.contracts = map_input_to_contracts(forest, data.contracts)
     forest.tags = data.tags_json
     forest.forest_attributes = list_to_dict(data.forest_attributes)
-    forest.save()
 
 
-def csv_upload(fp):
+def csv_validation_errors(e: pydantic.ValidationError):
+    errors = defaultdict(list)
+    for key, msgs in errors_wrapper(e.errors()).items():
+        if key == "__root__":
+            errors[key] = msgs
+        else:
+            try:
+                errors[csv_errors_map[key]].extend(msgs)
+            except KeyError:
+                errors[key].extend(msgs)
+    return errors
+
+
+def csv_upload_chunk(chunk):
+    """
+    Validate and save a chunk of csv rows at once.
+    :param chunk: list of (line number, parsed row data)
+    :return: error of the first failing line, None if whole chunk was saved
+    """
+    cleaned_rows = []
+    validation_error = None
+    for line, row_data in chunk:
+        try:
+            cleaned_rows.append((line, ForestCsvInput(**row_data)))
+        except pydantic.ValidationError as e:
+            validation_error = {"line": line, "errors": csv_validation_errors(e)}
+            break
+
+    try:
+        forests = Forest.objects.select_for_update(nowait=True).in_bulk(
+            [data.id for _, data in cleaned_rows if data.id is not None]
+        )
+    except OperationalError:
+        return {
+            "errors": {"__root__": ["Current resources are not ready for update!!"]},
+        }
+
+    for line, data in cleaned_rows:
+        forest = forests.get(data.id)
+        if forest is None:
+            return {"line": line, "errors": {"__root__": [_("Forest not found")]}}
+        update_forest_csv(forest, data)
+    if validation_error is not None:
+        return validation_error
+
+    now = timezone.now()
+    for forest in forests.values():
+        forest.updated_at = now
+    Forest.objects.bulk_update(
+        forests.values(),
+        fields=[
+            "cadastral",
+            "land_attributes",
+            "contracts",
+            "tags",
+            "forest_attributes",
+            "updated_at",
+        ],
+    )
+    # bulk_update bypasses post_save, refresh related caches once per chunk
+    refresh_archive_forests_cache(list(forests))
+    refresh_postalhistory_forests_cache(list(forests))
+    invalidate_counts(Forest._meta.db_table)
+    return None
+
+
+def csv_upload(fp, progress=None):
     with open(fp, mode="r", encoding="utf-8-sig") as f:
         reader = csv.reader(f)
         line_count = 0
         headers = csv_headers()
+        chunk = []
         for row in reader:
             if line_count == 0:
                 line_count += 1
                 if row != headers:
                     return {"errors": {"__root__": [_("Invalid csv file!")]}}
                 continue
-            row_data = parse_csv_data_to_dict(row)
-            try:
-                clean_forest = ForestCsvInput(**row_data)
-            except pydantic.ValidationError as e:
-                errors = defaultdict(list)
-                for key, msgs in errors_wrapper(e.errors()).items():
-                    if key == "__root__":
-                        errors[key] = msgs
-                    else:
-                        try:
-                            errors[csv_errors_map[key]].extend(msgs)
-                        except KeyError:
-                            errors[key].extend(msgs)
-
-                return {"line": line_count + 1, "errors": errors}
-            try:
-                forest = Forest.objects.select_for_update(nowait=True).get(
-                    pk=row_data["id"]
-                )
-            except (Forest.DoesNotExist, ValidationError):
-                return {
-                    "line": line_count + 1,
-                    "errors": {"__root__": [_("Forest not found")]},
-                }
-            except OperationalError:
-                return {
-                    "errors": {
-                        "__root__": ["Current resources are not ready for update!!"]
-                    },
-                }
-            else:
-                update_forest_csv(forest, clean_forest)
-                line_count += 1
+            line_count += 1
+            chunk.append((line_count, parse_csv_data_to_dict(row)))
+            if len(chunk) >= CSV_UPLOAD_CHUNK_SIZE:
+                error = csv_upload_chunk(chunk)
+                if error is not None:
+                    return error
+                chunk = []
+                if progress is not None:
+                    progress(line_count - 1)
+        if chunk:
+            error = csv_upload_chunk(chunk)
+            if error is not None:
+                return error
         if line_count == 0:
             return {"errors": {"__root__": [_("Invalid csv file!")]}}
         return line_count
@@ -705,8 +852,108 @@ csv_errors_map = {
 
 
 def bulk_update_forest_contact_status(data: ForestContractStatusBulkUpdate):
-    return Forest.objects.filter(pk__in=data.pks).update(
+    updated = Forest.objects.filter(pk__in=data.pks).update(
         contracts=RawSQL(
             "jsonb_set(contracts, '{0,status}', %s)", params=[f'"{data.status.value}"']
         )
     )
+    invalidate_counts(Forest._meta.db_table)
+    return updated
+
+
+EXPIRING_CONTRACT_TYPES = [ContractTypeEnum.long_term, ContractTypeEnum.work_road]
+EXPIRING_CONTRACTS_DAYS = 30
+EXPIRING_CONTRACTS_MAX_DAYS = 366
+EXPIRING_CONTRACTS_CSV_HEADERS = [
+    "市町村",
+    "大字",
+    "土地管理ID",
+    "契約種類",
+    "契約状況",
+    "開始日",
+    "終了日",
+    "残り日数",
+    "所有者",
+    "所有者（カナ）",
+]
+
+
+def parse_expiring_days(value):
+    """Days of the expiring contracts report, invalid values use the default"""
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return EXPIRING_CONTRACTS_DAYS
+    return min(max(days, 0), EXPIRING_CONTRACTS_MAX_DAYS)
+
+
+def get_expiring_contracts(days: int = EXPIRING_CONTRACTS_DAYS):
+    """
+    Negotiated long term and work road contracts ending in the next ``days``,
+    ordered by municipality. A range scan on the (type, status, end_date)
+    index of ForestContract.
+    """
+    today = timezone.localdate()
+    return (
+        ForestContract.objects.filter(
+            type__in=[t.value for t in EXPIRING_CONTRACT_TYPES],
+            status=ContractTypeStatus.negotiated.value,
+            end_date__gte=today,
+            end_date__lte=today + timedelta(days=days),
+        )
+        .annotate(
+            internal_id=F("forest__internal_id"),
+            municipality=KeyTextTransform("municipality", "forest__cadastral"),
+            sector=KeyTextTransform("sector", "forest__cadastral"),
+            owner_name_kanji=KeyTextTransform(
+                "repr_name_kanji", KeyTransform("customer_cache", "forest__attributes")
+            ),
+            owner_name_kana=KeyTextTransform(
+                "repr_name_kana", KeyTransform("customer_cache", "forest__attributes")
+            ),
+        )
+        .order_by("municipality", "end_date", "internal_id")
+        .values(
+            "forest_id",
+            "internal_id",
+            "municipality",
+            "sector",
+            "type",
+            "status",
+            "start_date",
+            "end_date",
+            "owner_name_kanji",
+            "owner_name_kana",
+        )
+    )
+
+
+def expiring_contract_data_mapping(contract, today=None):
+    today = today or timezone.localdate()
+    return dict(contract, days_left=(contract["end_date"] - today).days)
+
+
+def group_expiring_contracts(contracts):
+    today = timezone.localdate()
+    groups = []
+    for municipality, rows in itertools.groupby(
+        contracts, key=lambda c: c["municipality"]
+    ):
+        rows = [expiring_contract_data_mapping(c, today) for c in rows]
+        groups.append(dict(municipality=municipality, count=len(rows), contracts=rows))
+    return groups
+
+
+def expiring_contract_csv_row(contract):
+    return [
+        contract["municipality"],
+        contract["sector"],
+        contract["internal_id"],
+        contract["type"],
+        contract["status"],
+        contract["start_date"],
+        contract["end_date"],
+        contract["days_left"],
+        contract["owner_name_kanji"],
+        contract["owner_name_kana"],
+    ]
@@ -0,0 +1,134 @@
+import math
+
+from django.core.cache import cache
+from django.db import connection
+
+from ..cache.counts import get_table_version
+from ..crm.models import Forest
+
+# half of the web mercator world width, in meters
+WEB_MERCATOR_HALF_WIDTH = 20037508.342789244
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_MAX_ZOOM = 22
+TILE_CACHE_TIMEOUT = 60 * 60 * 24
+TILE_LAYER_NAME = "forests"
+# geodata is in a transverse mercator zone which cannot transform points
+# far from its central meridian, tiles are clamped to these lon/lat bounds
+# before being transformed
+GEODATA_AREA_BOUNDS = (122.0, 20.0, 154.0, 46.0)
+# segments of the clamped tile transformed to the geodata srid
+TILE_FILTER_SEGMENTS = 32
+
+TILE_SQL = """
+WITH bounds AS (
+    SELECT ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 3857) AS geom
+),
+mvtgeom AS (
+    SELECT
+        ST_AsMVTGeom(
+            ST_Transform(f.geodata, 3857), bounds.geom, %(extent)s, %(buffer)s, true
+        ) AS geom,
+        f.id::text AS id,
+        f.internal_id,
+        f.cadastral ->> 'municipality' AS municipality,
+        f.cadastral ->> 'sector' AS sector,
+        f.land_attributes ->> '地番本番' AS lot_number,
+        f.land_attributes ->> '地番支番' AS sub_lot_number,
+        f.contracts -> 0 ->> 'type' AS contract_type,
+        f.contracts -> 0 ->> 'status' AS contract_status,
+        f.contracts -> -1 ->> 'status' AS fsc_status,
+        f.attributes -> 'customer_cache' ->> 'repr_name_kanji' AS owner_name_kanji,
+        f.attributes -> 'customer_cache' ->> 'repr_name_kana' AS owner_name_kana
+    FROM crm_forest f, bounds
+    WHERE f.deleted IS NULL
+        AND f.geodata && ST_Transform(
+            ST_Segmentize(
+                ST_MakeEnvelope(
+                    %(fxmin)s, %(fymin)s, %(fxmax)s, %(fymax)s, 3857
+                ),
+                %(segment)s
+            ),
+            2447
+        )
+)
+SELECT ST_AsMVT(mvtgeom, %(layer)s, %(extent)s, 'geom') FROM mvtgeom
+"""
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_bounds(z, x, y):
+    """EPSG:3857 bounds of a xyz tile"""
+    size = 2 * WEB_MERCATOR_HALF_WIDTH / 2 ** z
+    xmin = -WEB_MERCATOR_HALF_WIDTH + x * size
+    ymax = WEB_MERCATOR_HALF_WIDTH - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def lonlat_to_web_mercator(lon, lat):
+    radius = WEB_MERCATOR_HALF_WIDTH / math.pi
+    return (
+        radius * math.radians(lon),
+        radius * math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)),
+    )
+
+
+def clamp_tile_bounds(bounds):
+    """
+    Part of the EPSG:3857 ``bounds`` within GEODATA_AREA_BOUNDS, None when
+    they do not overlap
+    """
+    lon_min, lat_min, lon_max, lat_max = GEODATA_AREA_BOUNDS
+    area = lonlat_to_web_mercator(lon_min, lat_min) + lonlat_to_web_mercator(
+        lon_max, lat_max
+    )
+    xmin, ymin = max(bounds[0], area[0]), max(bounds[1], area[1])
+    xmax, ymax = min(bounds[2], area[2]), min(bounds[3], area[3])
+    if xmin >= xmax or ymin >= ymax:
+        return None
+    return xmin, ymin, xmax, ymax
+
+
+def render_forest_tile(z, x, y):
+    xmin, ymin, xmax, ymax = tile_bounds(z, x, y)
+    clamped = clamp_tile_bounds((xmin, ymin, xmax, ymax))
+    if clamped is None:
+        return b""
+    fxmin, fymin, fxmax, fymax = clamped
+    with connection.cursor() as cursor:
+        cursor.execute(
+            TILE_SQL,
+            dict(
+                xmin=xmin,
+                ymin=ymin,
+                xmax=xmax,
+                ymax=ymax,
+                fxmin=fxmin,
+                fymin=fymin,
+                fxmax=fxmax,
+                fymax=fymax,
+                segment=max(fxmax - fxmin, fymax - fymin) / TILE_FILTER_SEGMENTS,
+                extent=TILE_EXTENT,
+                buffer=TILE_BUFFER,
+                layer=TILE_LAYER_NAME,
+            ),
+        )
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] is not None else b""
+
+
+def get_forest_tile(z, x, y):
+    """
+    Tiles are cached by the write version of crm_forest, so any forest
+    change makes the cached tiles stale.
+    """
+    version = get_table_version(Forest._meta.db_table)
+    key = f"forest_tile:{version}:{z}:{x}:{y}"
+    tile = cache.get(key)
+    if tile is None:
+        tile = render_forest_tile(z, x, y)
+        cache.set(key, tile, TILE_CACHE_TIMEOUT)
+    return tile
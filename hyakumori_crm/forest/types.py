@@ -14,7 +14,7 @@ types = gql(
         tags: JSON
         land_attributes: JSON
         forest_attributes: JSON
-        geodata: JSON @wkt_to_geojson
+        geodata(simplify: Float, precision: Int): JSON @wkt_to_geojson
         updated_by: User
         updated_at: DateTime
         created_at: DateTime
@@ -23,6 +23,33 @@ types = gql(
     extend type Query {
         list_forests(data: ForestListFilterInput): ForestListResponse
         foresttable_headers: ForestTableHeaderResponse
+        expiring_contracts(days: Int): ExpiringContractsResponse
+    }
+
+    type ExpiringContract {
+        forest_id: ID!
+        internal_id: String
+        sector: String
+        type: String
+        status: String
+        start_date: Date
+        end_date: Date
+        days_left: Int
+        owner_name_kanji: String
+        owner_name_kana: String
+    }
+
+    type ExpiringContractGroup {
+        municipality: String
+        count: Int
+        contracts: [ExpiringContract!]
+    }
+
+    type ExpiringContractsResponse implements HyakumoriResponse {
+        ok: Boolean!
+        error: JSON
+        days: Int
+        municipalities: [ExpiringContractGroup!]
     }
 
     type ForestListResponse implements HyakumoriResponse {
@@ -30,6 +57,8 @@ types = gql(
         error: JSON
         forests: [Forest!]
         total: Int
+        total_exact: Boolean
+        page_info: PageInfo
     }
 
     input ForestListFilterInput {
@@ -39,6 +68,9 @@ types = gql(
         sortBy: [String]
         sortDesc: [Boolean]
         filters: JSON
+        after: String
+        before: String
+        withTotal: Boolean
     }
 
     type ForestTableHeaderResponse implements HyakumoriResponse {
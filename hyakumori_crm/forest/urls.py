@@ -5,12 +5,18 @@ from .restful import (
     update_owners_view,
     set_default_customer_view,
     set_default_customer_contact_view,
+    forest_tile_view,
 )
 
 router = SimpleRouter(trailing_slash=False)
 router.register("forests", ForestViewSets, basename="forest")
 
 api_urls = [
+    path(
+        "forests/tiles/<int:z>/<int:x>/<int:y>.mvt",
+        view=forest_tile_view,
+        name="forests-tiles",
+    ),
     path(
         "forests/<uuid:pk>/customers/update",
         view=update_owners_view,
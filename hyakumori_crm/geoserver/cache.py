@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from urllib.parse import parse_qsl
+
+from django.conf import settings
+from django.core.cache import cache
+
+from hyakumori_crm.cache.counts import get_table_version
+
+logger = logging.getLogger(__name__)
+
+# only map rendering requests are cached, capabilities and transactions
+# always go to geoserver
+CACHEABLE_REQUESTS = {"GETMAP", "GETTILE", "GETLEGENDGRAPHIC", "GETFEATURE"}
+# case insensitive parameter values
+UPPERCASE_PARAMS = {"SERVICE", "REQUEST", "VERSION", "SRS", "CRS"}
+# cache busters added by map clients
+IGNORED_PARAMS = {"_"}
+STORED_HEADERS = ("Content-Type", "Content-Disposition")
+GENERATION_KEY = "geoserver_cache:generation"
+EVICTION_LOCK_KEY = "geoserver_cache:evict"
+# seconds between two eviction scans of the cache directory
+EVICTION_INTERVAL = 60
+
+
+def normalize_params(query_string):
+    params = {}
+    for key, value in parse_qsl(query_string, keep_blank_values=True):
+        key = key.upper()
+        if key in IGNORED_PARAMS:
+            continue
+        params[key] = value.upper() if key in UPPERCASE_PARAMS else value
+    return sorted(params.items())
+
+
+def get_cache_key(path, query_string):
+    """
+    None when the request is not cacheable. The key changes on purge and
+    on any write to forests, so stale entries are never served and only
+    wait for eviction.
+    """
+    params = normalize_params(query_string)
+    if dict(params).get("REQUEST") not in CACHEABLE_REQUESTS:
+        return None
+    generation = cache.get(GENERATION_KEY, 0)
+    version = get_table_version("crm_forest")
+    raw = json.dumps([path, params, generation, version])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def is_cacheable_response(response):
+    content_type = response.get("Content-Type", "").lower()
+    # geoserver answers errors with 200 and a service exception document
+    return (
+        response.status_code == 200
+        and "se_xml" not in content_type
+        and "exception" not in content_type
+    )
+
+
+def _entry_paths(key):
+    directory = os.path.join(settings.GEOSERVER_CACHE_DIR, key[:2])
+    return os.path.join(directory, key), os.path.join(directory, f"{key}.json")
+
+
+def get_entry(key):
+    """:return: (body path, meta) of a fresh entry, None otherwise"""
+    body_path, meta_path = _entry_paths(key)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if time.time() - meta["created"] > settings.GEOSERVER_CACHE_TTL:
+            return None
+        # mtime is the last access, used for lru eviction
+        os.utime(body_path)
+    except (OSError, ValueError, KeyError):
+        return None
+    return body_path, meta
+
+
+class EntryWriter:
+    """Write an entry to a temporary file, visible only once complete"""
+
+    def __init__(self, key, response):
+        self.key = key
+        self.body_path, self.meta_path = _entry_paths(key)
+        os.makedirs(os.path.dirname(self.body_path), exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(self.body_path), prefix=".tmp", delete=False
+        )
+        headers = {h: response[h] for h in STORED_HEADERS if response.has_header(h)}
+        self.meta = dict(created=time.time(), headers=headers)
+
+    def write(self, chunk):
+        self.file.write(chunk)
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.file.name, self.body_path)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(self.meta_path), prefix=".tmp", delete=False
+        ) as f:
+            json.dump(self.meta, f)
+        os.replace(f.name, self.meta_path)
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.unlink(self.file.name)
+        except OSError:
+            pass
+
+
+def store_entry(key, response, content):
+    try:
+        writer = EntryWriter(key, response)
+    except OSError as e:
+        logger.warning("geoserver cache is not writable", exc_info=e)
+        return
+    try:
+        writer.write(content)
+        writer.commit()
+    except OSError as e:
+        writer.abort()
+        logger.warning("could not write geoserver cache entry", exc_info=e)
+        return
+    maybe_evict()
+
+
+def cache_streaming_content(key, response, streaming_content):
+    """
+    Yield the upstream chunks as they come while copying them to the
+    cache, an interrupted response is not kept.
+    """
+    try:
+        writer = EntryWriter(key, response)
+    except OSError as e:
+        logger.warning("geoserver cache is not writable", exc_info=e)
+        yield from streaming_content
+        return
+    try:
+        for chunk in streaming_content:
+            writer.write(chunk)
+            yield chunk
+    except BaseException:
+        writer.abort()
+        raise
+    try:
+        writer.commit()
+    except OSError as e:
+        writer.abort()
+        logger.warning("could not write geoserver cache entry", exc_info=e)
+        return
+    maybe_evict()
+
+
+def _remove_entry(body_path):
+    for path in (body_path, f"{body_path}.json"):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def evict(max_size=None):
+    """
+    Remove entries not read for longer than the ttl, then the least
+    recently read ones until the cache fits in ``max_size`` bytes.
+    :return: number of entries removed
+    """
+    if max_size is None:
+        max_size = settings.GEOSERVER_CACHE_MAX_SIZE
+    now = time.time()
+    entries = []
+    removed = 0
+    try:
+        directories = [d.path for d in os.scandir(settings.GEOSERVER_CACHE_DIR)]
+    except OSError:
+        return 0
+    for directory in directories:
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > settings.GEOSERVER_CACHE_TTL:
+                _remove_entry(entry.path)
+                removed += 1
+            elif not entry.name.startswith(".tmp"):
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for mtime, size, path in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        _remove_entry(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def maybe_evict():
+    # one scan per interval across all workers
+    if cache.add(EVICTION_LOCK_KEY, 1, EVICTION_INTERVAL):
+        evict()
+
+
+def purge():
+    """Drop every cached geoserver response, e.g. after forest data changed"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+    shutil.rmtree(settings.GEOSERVER_CACHE_DIR, ignore_errors=True)
@@ -3,12 +3,16 @@ import os
 from rest_framework_simplejwt import authentication as jwt_auth
 from rest_framework import authentication
 from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, HttpResponseNotModified
 from django.shortcuts import redirect
+from django.utils.http import parse_etags
 from rest_framework.request import Request
 from revproxy.response import get_django_response
 from revproxy.views import ProxyView
 from base64 import b64encode
 
+from . import cache as geoserver_cache
+
 geoserver_user = os.getenv("GEOSERVER_USER")
 geoserver_pass = os.getenv("GEOSERVER_PASS")
 geoserver_url = os.getenv("GEOSERVER_URL")
@@ -40,6 +44,16 @@ class GeoserverProxyView(ProxyView):
         if redirect_to:
             return redirect(redirect_to)
 
+        cache_key = None
+        if request.method == "GET":
+            cache_key = geoserver_cache.get_cache_key(
+                path, request.META.get("QUERY_STRING", "")
+            )
+        if cache_key:
+            cached_response = self._get_cached_response(request, cache_key)
+            if cached_response:
+                return cached_response
+
         proxy_response = self._created_proxy_response(request, path)
 
         self._replace_host_on_redirect_location(request, proxy_response)
@@ -47,10 +61,47 @@ class GeoserverProxyView(ProxyView):
 
         response = get_django_response(proxy_response,
                                        strict_cookies=self.strict_cookies)
+        if cache_key and geoserver_cache.is_cacheable_response(response):
+            self._cache_response(response, cache_key)
 
         self.log.debug("RESPONSE RETURNED: %s", response)
         return response
 
+    def _set_cache_headers(self, response, cache_key, status):
+        # the key covers request and data version, so it is a valid etag
+        response["ETag"] = f'"{cache_key}"'
+        response["Cache-Control"] = "private, no-cache"
+        response["X-Cache"] = status
+
+    def _get_cached_response(self, request, cache_key):
+        etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if f'"{cache_key}"' in etags:
+            response = HttpResponseNotModified()
+            self._set_cache_headers(response, cache_key, "HIT")
+            return response
+        entry = geoserver_cache.get_entry(cache_key)
+        if entry is None:
+            return None
+        body_path, meta = entry
+        try:
+            response = FileResponse(open(body_path, "rb"))
+        except OSError:
+            # evicted in between
+            return None
+        for header, value in meta["headers"].items():
+            response[header] = value
+        self._set_cache_headers(response, cache_key, "HIT")
+        return response
+
+    def _cache_response(self, response, cache_key):
+        if response.streaming:
+            response.streaming_content = geoserver_cache.cache_streaming_content(
+                cache_key, response, response.streaming_content
+            )
+        else:
+            geoserver_cache.store_entry(cache_key, response, response.content)
+        self._set_cache_headers(response, cache_key, "MISS")
+
     def get_request_headers(self):
         if not hasattr(self.request, 'user') or not self.request.user.has_perms(["crm.view_forest"]):
             raise PermissionDenied()
@@ -19,6 +19,13 @@ interface Editor {
     updated_by: User
 }
 
+type PageInfo {
+    has_next_page: Boolean!
+    has_previous_page: Boolean!
+    start_cursor: String
+    end_cursor: String
+}
+
 interface HyakumoriResponse {
     ok: Boolean!
     error: JSON
@@ -33,6 +33,7 @@ from .schemas import (
     PostalHistorySerializer,
 )
 from .service import (
+    add_search_snippets,
     add_related_forest,
     add_related_user,
     create_postal_history,
@@ -75,13 +76,19 @@ def postal_history_obj_permission(f):
 @api_validate_model(PostalHistoryInput)
 def postal_histories(request, data: PostalHistoryInput = None):
     if request.method == "GET":
-        paginator_listing = ListingPagination()
-        qs = get_filtered_postal_history_queryset(
-            PostalHistoryFilter(**request.GET.dict()), request.user
-        )
+        listing_filter = PostalHistoryFilter(**request.GET.dict())
+        unfiltered = all(
+            v is None for v in listing_filter.dict().values()
+        ) and not request.user.member_of(SystemGroups.GROUP_LIMITED_USER)
+        paginator_listing = ListingPagination(estimate_count=unfiltered)
+        qs = get_filtered_postal_history_queryset(listing_filter, request.user)
+        search = (listing_filter.search or "").strip()
+        ordering = ["-search_rank", "-created_at"] if search else ["-created_at"]
         paged_list = paginator_listing.paginate_queryset(
-            request=request, queryset=qs.order_by("-created_at")
+            request=request, queryset=qs.order_by(*ordering)
         )
+        if search:
+            add_search_snippets(paged_list, search)
         return paginator_listing.get_paginated_response(
             PostalHistoryListingSerializer(paged_list, many=True).data
         )
@@ -15,18 +15,25 @@ from ..crm.models import (
     CustomerContact,
     PostalHistoryCustomer,
     PostalHistoryCustomerContact,
-    Attachment,
 )
-from ..crm.restful.serializers import AttachmentSerializer
+from ..crm.restful.serializers import (
+    AttachedResourceListSerializer,
+    get_resource_attachments,
+)
 from ..users.serializers import UserSerializer
 
 
 class PostalHistoryListingSerializer(ModelSerializer):
     author_name = SerializerMethodField(method_name="get_author_name")
+    search_snippet = SerializerMethodField()
 
     def get_author_name(self, obj: PostalHistory):
         return obj.author.full_name
 
+    def get_search_snippet(self, obj: PostalHistory):
+        # set on the listed page when searching
+        return getattr(obj, "search_snippet", None)
+
     class Meta:
         model = PostalHistory
         fields = [
@@ -37,6 +44,7 @@ class PostalHistoryListingSerializer(ModelSerializer):
             "archive_date",
             "attributes",
             "tags",
+            "search_snippet",
         ]
 
 
@@ -46,6 +54,7 @@ class PostalHistorySerializer(ModelSerializer):
 
     class Meta:
         model = PostalHistory
+        list_serializer_class = AttachedResourceListSerializer
         fields = [
             "id",
             "title",
@@ -58,12 +67,7 @@ class PostalHistorySerializer(ModelSerializer):
         ]
 
     def get_attachments(self, obj: PostalHistory):
-        try:
-            return AttachmentSerializer(
-                Attachment.objects.filter(object_id=obj.id), many=True
-            ).data
-        except Attachment.DoesNotExist:
-            return []
+        return get_resource_attachments(self, obj)
 
 
 class PostalHistoryInput(HyakumoriDanticModel):
@@ -86,6 +90,8 @@ class PostalHistoryFilter(HyakumoriDanticModel):
     our_participants: str = None
     associated_forest: str = None
     tags: str = None
+    # words searched in the texts, results are ranked
+    search: str = None
 
     class Config:
         arbitrary_types_allowed = True
@@ -7,14 +7,13 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError as DjValidationError
 from django.db import connection
-from django.db.models import F, Subquery, OuterRef, Count, Q, CharField, Value as V
-from django.db.models.functions import Concat
+from django.db.models import F, Subquery, OuterRef, Count, Q
 from django.db.models.expressions import RawSQL
-from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from pydantic import ValidationError
 from rest_framework.request import Request
 
+from hyakumori_crm.cache.counts import invalidate_counts
 from hyakumori_crm.cache.postal_history import (
     refresh_customers_cache,
     refresh_forest_cache,
@@ -31,8 +30,8 @@ from ..crm.models import (
     PostalHistoryCustomerContact,
     CustomerContact,
 )
+from ..core.search import bigram_search, search_snippet
 from ..forest.service import get_forest_by_pk
-from ..tags.filters import TagsFilterSet
 from ..permissions.enums import SystemGroups
 
 from .schemas import PostalHistoryInput, PostalHistoryFilter, PostalHistoryCustomerInput
@@ -336,17 +335,19 @@ def get_filtered_postal_history_queryset(
     postal_history_filter: PostalHistoryFilter, user
 ):
     postal_history_filter = postal_history_filter.dict()
+    search = (postal_history_filter.pop("search") or "").strip()
     active_filters = dict()
+    # trigram indexed columns and copies kept in PostalHistorySearch
     mapping = {
         "id": "id",
-        "archive_date": "archive_date_text",
+        "archive_date": "search__archive_date",
         "title": "title",
-        "author": "author_fullname",
         "content": "content",
-        "associated_forest": "attributes__forest_cache__repr",
-        "our_participants": "attributes__user_cache__repr",
-        "their_participants": "attributes__customer_cache__repr",
-        "tags": "tags_repr",
+        "author": "search__author",
+        "associated_forest": "search__forests",
+        "our_participants": "search__our_participants",
+        "their_participants": "search__their_participants",
+        "tags": "search__tags",
     }
     for k, v in postal_history_filter.items():
         if v is not None:
@@ -356,38 +357,34 @@ def get_filtered_postal_history_queryset(
         qs = qs.distinct().filter(
             Q(author_id=user.id) | Q(postalhistoryuser__user_id=user.id)
         )
-    if len(active_filters.keys()) > 0:
-        qs = qs.annotate(
-            archive_date_text=RawSQL(
-                "to_char((archive_date at time zone %s), 'YYYY-MM-DD HH24:MI')",
-                [settings.TIME_ZONE_PRIMARY],
-            ),
-            author_fullname=Concat(
-                F("author__last_name"),
-                V(" "),
-                F("author__first_name"),
-                output_field=CharField(),
-            ),
-        ).select_related("author")
-        qs = TagsFilterSet.get_tags_repr_queryset(qs)
-        for k, value in active_filters.items():
-            values = list(set(map(lambda v: v.strip(), value.split(","))))
-            if len(values) == 1 and values[0] == "":
-                conditions = Q(**{f"{k}__isnull": True}) | Q(**{f"{k}__exact": None})
-            else:
-                search_field_filter = k + "__icontains"
-                conditions = reduce(
-                    operator.or_,
-                    (
-                        Q(**{search_field_filter: value})
-                        for value in values
-                        if len(value) > 0
-                    ),
-                )
-            qs = qs.filter(conditions)
+    for k, value in active_filters.items():
+        values = list(set(map(lambda v: v.strip(), value.split(","))))
+        if len(values) == 1 and values[0] == "":
+            conditions = Q(**{f"{k}__isnull": True}) | Q(**{f"{k}__exact": None})
+        else:
+            search_field_filter = k + "__icontains"
+            conditions = reduce(
+                operator.or_,
+                (
+                    Q(**{search_field_filter: value})
+                    for value in values
+                    if len(value) > 0
+                ),
+            )
+        qs = qs.filter(conditions)
+    if search:
+        qs = bigram_search(qs, search)
     return qs
 
 
+def add_search_snippets(postal_histories, search):
+    for postal_history in postal_histories:
+        postal_history.search_snippet = search_snippet(
+            [postal_history.content, postal_history.title], search
+        )
+    return postal_histories
+
+
 def update_postal_history_tag(data: dict):
     ids = data.get("ids")
     tag_key = data.get("key")
@@ -395,6 +392,7 @@ def update_postal_history_tag(data: dict):
     PostalHistory.objects.filter(id__in=ids).update(
         tags=RawSQL("tags || jsonb_build_object(%s, %s)", params=[tag_key, new_value])
     )
+    invalidate_counts(PostalHistory._meta.db_table)
 
 
 def update_postal_history_other_participants(postal_history, participants):
@@ -315,6 +315,13 @@ SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 # https://docs.djangoproject.com/en/3.0/ref/settings/#std:setting-MEDIA_URL
 MEDIA_ROOT = os.getenv("MEDIA_PATH", os.path.join(BASE_DIR, "media"))
 
+# Geoserver responses cache, on local disk
+GEOSERVER_CACHE_DIR = os.getenv(
+    "GEOSERVER_CACHE_DIR", os.path.join(BASE_DIR, "geoserver_cache")
+)
+GEOSERVER_CACHE_TTL = int(os.getenv("GEOSERVER_CACHE_TTL", 60 * 60))
+GEOSERVER_CACHE_MAX_SIZE = int(os.getenv("GEOSERVER_CACHE_MAX_SIZE", 512 * 1024 ** 2))
+
 Q_CLUSTER = {"name": "hyakumori-q", "django_redis": "default"}
 
 # for mitm.html downloading sw.js in firefox
@@ -6,6 +6,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.db import connection, IntegrityError
 from django.utils.translation import gettext as _
 
+from hyakumori_crm.cache.reference import content_types, tag_settings
 from hyakumori_crm.crm.models import Customer, Forest, get_user_model
 from hyakumori_crm.tags.exceptions import ContentTypeNotFound, TagFieldNotExists, ObjectNotFound, DuplicatedTagSetting
 from hyakumori_crm.tags.models import TagSetting
@@ -17,11 +18,11 @@ class TagService:
 
     @classmethod
     def get_content_type(cls, app_name: str, object_type: str):
-        content_type = ContentType.objects.filter(app_label=app_name, model=object_type).first()
-        if content_type is None:
+        try:
+            return content_types.get(app_label=app_name, model=object_type)
+        except ContentType.DoesNotExist:
             raise ContentTypeNotFound(_("Could not resolve content type for %(app_name)s, model %(object_type)s"
                                         % {'app_name': app_name, 'object_type': object_type}))
-        return content_type
 
     @classmethod
     def setup_tags(cls):
@@ -125,7 +126,9 @@ class TagService:
             raise ObjectNotFound(_("Could not retrieve object: %(object_type)s, with ID: %(object_id)s")
                                  % {'object_type': object_type, 'object_id': tag_input.object_id})
         # get list of tags
-        available_tags_for_types = cls.get_setting_for_type(app_name, object_type).values_list("name", flat=True)
+        available_tags_for_types = [
+            tag_setting.name for tag_setting in tag_settings.all() if tag_setting.content_type_id == content_type.id
+        ]
         _before = dict(**instance.tags)
 
         instance.tags = dict()
@@ -0,0 +1,151 @@
+import csv
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from django_q.tasks import async_task
+from rest_framework.exceptions import APIException
+
+from hyakumori_crm.core.utils import (
+    acquire_maintain_task_id_cache,
+    release_maintain_task_id_cache,
+    set_maintain_task_id_cache,
+)
+from .models import ImportJob, ImportJobStatus
+
+logger = logging.getLogger(__name__)
+
+IMPORT_RESOURCES = {
+    "forests": "hyakumori_crm.forest.service.csv_upload",
+    "customers": "hyakumori_crm.customer.tasks.csv_upload",
+}
+
+# seconds between two progress writes to cache
+IMPORT_PROGRESS_INTERVAL = 1
+# lock of a job not committed yet, expires when its request rolls back
+IMPORT_PENDING_LOCK_TIMEOUT = 60 * 10
+
+
+class ImportInProgress(APIException):
+    status_code = 503
+    default_detail = _("Another import is running, try again later.")
+    default_code = "import_in_progress"
+
+
+def get_import_progress_key(job_id):
+    return f"import_job:{job_id}"
+
+
+def count_csv_rows(fp):
+    with open(fp, mode="r", encoding="utf-8-sig") as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+
+def load_import_progress(job: ImportJob):
+    """
+    Rows processed of a running job are kept in cache, because the job row
+    is only written outside of the import transaction.
+    """
+    if job.status == ImportJobStatus.RUNNING:
+        rows_processed = cache.get(get_import_progress_key(job.id))
+        if rows_processed is not None:
+            job.rows_processed = rows_processed
+    return job
+
+
+def create_import_job(resource, file_path, author=None):
+    """
+    The resource is locked by the job until it finishes, a second import
+    of the resource raises ImportInProgress in the meantime
+    """
+    if resource not in IMPORT_RESOURCES:
+        raise ValueError(f"Unknown import resource: {resource}")
+    job = ImportJob(resource=resource, file_path=file_path, author=author)
+    if not acquire_maintain_task_id_cache(
+        str(job.id), resource=resource, timeout=IMPORT_PENDING_LOCK_TIMEOUT
+    ):
+        raise ImportInProgress()
+    job.save()
+
+    def enqueue():
+        set_maintain_task_id_cache(str(job.id), resource=resource)
+        async_task(
+            run_import_job,
+            job.id,
+            hook=import_job_hook,
+            task_name=f"import_{resource}__{job.id.hex}",
+        )
+
+    transaction.on_commit(enqueue)
+    return job
+
+
+def finish_import_job(job: ImportJob, result):
+    job.finished_at = timezone.now()
+    if type(result) is int:
+        job.status = ImportJobStatus.SUCCEEDED
+        job.rows_processed = max(result - 1, 0)
+        job.errors = None
+    else:
+        job.status = ImportJobStatus.FAILED
+        job.errors = result
+    job.save(
+        update_fields=[
+            "status",
+            "started_at",
+            "rows_total",
+            "rows_processed",
+            "errors",
+            "finished_at",
+        ]
+    )
+
+
+def run_import_job(job_id):
+    job = ImportJob.objects.get(pk=job_id)
+    csv_upload = import_string(IMPORT_RESOURCES[job.resource])
+    progress_key = get_import_progress_key(job.id)
+    last_report = 0
+
+    def progress(rows_processed):
+        nonlocal last_report
+        now = time.monotonic()
+        if now - last_report >= IMPORT_PROGRESS_INTERVAL:
+            cache.set(progress_key, rows_processed, None)
+            last_report = now
+
+    job.status = ImportJobStatus.RUNNING
+    job.started_at = timezone.now()
+    try:
+        job.rows_total = count_csv_rows(job.file_path)
+        job.save(update_fields=["status", "started_at", "rows_total"])
+        with transaction.atomic():
+            result = csv_upload(job.file_path, progress=progress)
+            if type(result) is not int:
+                transaction.set_rollback(True)
+    except UnicodeDecodeError:
+        result = {"errors": {"__root__": [_("Please upload a csv file!!")]}}
+    finally:
+        cache.delete(progress_key)
+        release_maintain_task_id_cache(str(job.id), resource=job.resource)
+
+    finish_import_job(job, result)
+    return job.status
+
+
+def import_job_hook(task):
+    """Mark the job failed when the worker crashed before finishing it"""
+    job_id = task.args[0]
+    if task.success:
+        return
+    logger.error("import job %s crashed: %s", job_id, task.result)
+    job = ImportJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return
+    release_maintain_task_id_cache(str(job.id), resource=job.resource)
+    if not job.is_finished:
+        finish_import_job(job, {"errors": {"__root__": [_("Import failed!")]}})
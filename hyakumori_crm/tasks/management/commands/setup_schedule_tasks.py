@@ -27,8 +27,12 @@ class Command(BaseCommand):
 
     def handle(self, *args, **kwargs):
         if kwargs.get("recreate"):
-            Schedule.objects.filter(name="do_healthcheck").delete()
+            Schedule.objects.filter(
+                name__in=["do_healthcheck", "consume_changes"]
+            ).delete()
             remove_contract_schedules()
+        # the dirty marks were replaced by the change log
+        Schedule.objects.filter(name="drain_dirty_caches").delete()
 
         create_schedule(
             func="hyakumori_crm.tasks.healthcheck.do_healthcheck",
@@ -36,4 +40,11 @@ class Command(BaseCommand):
             schedule_type=Schedule.MINUTES,
             minutes=1,
         )
+        # caches follow writes even without a consume_changes listener
+        create_schedule(
+            func="hyakumori_crm.cache.changes.consume_changes",
+            name="consume_changes",
+            schedule_type=Schedule.MINUTES,
+            minutes=1,
+        )
         setup_contracts_schedules()
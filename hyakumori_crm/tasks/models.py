@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import JSONField
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from hyakumori_crm.core.models import UUIDPrimary, TimestampMixin, AttributesMixin
+
+
+class ImportJobStatus(models.TextChoices):
+    PENDING = "pending", _("Pending")
+    RUNNING = "running", _("Running")
+    SUCCEEDED = "succeeded", _("Succeeded")
+    FAILED = "failed", _("Failed")
+
+
+class ImportJob(UUIDPrimary, TimestampMixin, AttributesMixin):
+    resource = models.CharField(max_length=50, db_index=True)
+    file_path = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=20, choices=ImportJobStatus.choices, default=ImportJobStatus.PENDING
+    )
+    rows_total = models.IntegerField(default=0)
+    rows_processed = models.IntegerField(default=0)
+    errors = JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    author = models.ForeignKey(
+        get_user_model(),
+        verbose_name=_("user"),
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="import_jobs",
+    )
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = _("import job")
+        verbose_name_plural = _("import jobs")
+
+    def __str__(self):
+        return _("ImportJob, id: {id}").format(id=self.id)
+
+    @property
+    def is_finished(self):
+        return self.status in (ImportJobStatus.SUCCEEDED, ImportJobStatus.FAILED)
+
+    @property
+    def eta(self):
+        """Estimated remaining seconds, based on the average speed so far"""
+        if self.is_finished or not self.started_at or self.rows_processed <= 0:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        remaining = max(self.rows_total - self.rows_processed, 0)
+        return round(elapsed / self.rows_processed * remaining, 1)
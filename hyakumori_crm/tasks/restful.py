@@ -0,0 +1,33 @@
+from rest_framework import mixins
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.viewsets import GenericViewSet
+
+from ..permissions import is_admin_request
+from .imports import load_import_progress
+from .models import ImportJob
+from .serializers import ImportJobSerializer
+
+
+class ImportJobViewSets(
+    mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet
+):
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = ImportJob.objects.all()
+        if not is_admin_request(self.request):
+            queryset = queryset.filter(author=self.request.user)
+        resource = self.request.GET.get("resource")
+        if resource:
+            queryset = queryset.filter(resource=resource)
+        return queryset
+
+    def get_object(self):
+        return load_import_progress(super().get_object())
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            page = [load_import_progress(job) for job in page]
+        return page
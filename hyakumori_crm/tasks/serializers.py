@@ -0,0 +1,22 @@
+from rest_framework import serializers
+
+from .models import ImportJob
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    eta = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = (
+            "id",
+            "resource",
+            "status",
+            "rows_total",
+            "rows_processed",
+            "errors",
+            "eta",
+            "started_at",
+            "finished_at",
+            "created_at",
+        )
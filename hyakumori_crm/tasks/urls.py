@@ -0,0 +1,8 @@
+from rest_framework.routers import SimpleRouter
+
+from .restful import ImportJobViewSets
+
+router = SimpleRouter(trailing_slash=False)
+router.register("import-jobs", ImportJobViewSets, basename="import-job")
+
+api_urls = router.urls
@@ -0,0 +1,60 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+
+from hyakumori_crm.crm.models import Archive, Attachment, PostalHistory
+from hyakumori_crm.crm.restful.serializers import ArchiveSerializer
+from hyakumori_crm.postal_history.schemas import PostalHistorySerializer
+from hyakumori_crm.users.models import User
+
+
+def attach(resource, creator, size):
+    return Attachment.objects.create(
+        content_type=ContentType.objects.get_for_model(resource),
+        object_id=str(resource.pk),
+        creator=creator,
+        # never written to the storage, the size comes from the attributes
+        attachment_file=f"attachments/missing/{resource.pk}.pdf",
+        attributes={"original_file_size": size},
+    )
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create_user(
+        "staff@example.com", "staff", first_name="Taro", last_name="Yamada"
+    )
+
+
+@pytest.mark.django_db
+def test_archive_list_queries(author, django_assert_num_queries):
+    archives = [
+        Archive.objects.create(title=f"archive {i}", author=author) for i in range(5)
+    ]
+    for i, archive in enumerate(archives):
+        attach(archive, author, 100 + i)
+        attach(archive, author, 200 + i)
+
+    # archives with authors, author groups, attachments
+    with django_assert_num_queries(3):
+        data = ArchiveSerializer(Archive.objects.all(), many=True).data
+
+    assert len(data) == 5
+    by_id = {item["id"]: item for item in data}
+    for i, archive in enumerate(archives):
+        item = by_id[str(archive.pk)]
+        assert item["author"]["full_name"] == "Yamada Taro"
+        assert sorted(a["size"] for a in item["attachments"]) == [100 + i, 200 + i]
+
+
+@pytest.mark.django_db
+def test_postal_history_list_queries(author, django_assert_num_queries):
+    postal_histories = [
+        PostalHistory.objects.create(title=f"postal {i}", author=author)
+        for i in range(3)
+    ]
+    attach(postal_histories[0], author, 10)
+
+    with django_assert_num_queries(3):
+        data = PostalHistorySerializer(PostalHistory.objects.all(), many=True).data
+
+    assert sum(len(item["attachments"]) for item in data) == 1
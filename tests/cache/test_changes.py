@@ -0,0 +1,77 @@
+import pytest
+from django.utils import timezone
+
+from hyakumori_crm.cache.changes import consume_changes
+from hyakumori_crm.cache.forest import CUSTOMER_CACHE
+from hyakumori_crm.crm.models import (
+    Archive,
+    ArchiveUser,
+    ChangeLog,
+    Contact,
+    Customer,
+    CustomerContact,
+    Forest,
+    ForestCustomer,
+)
+from hyakumori_crm.users.models import User
+
+
+@pytest.fixture
+def change_log_triggers(migration_sql):
+    migration_sql("0033_changelog", "CREATE_TRIGGERS")
+
+
+@pytest.mark.django_db
+def test_queryset_update_refreshes_caches(change_log_triggers):
+    user = User.objects.create_user(
+        "staff@example.com", "staff", first_name="Taro", last_name="Yamada"
+    )
+    archive = Archive.objects.create(title="archive")
+    ArchiveUser.objects.create(archive=archive, user=user)
+    # no signal is sent, the row is logged once
+    User.objects.filter(pk=user.pk).update(first_name="Jiro")
+    User.objects.filter(pk=user.pk).update(last_name="Suzuki")
+    assert ChangeLog.objects.filter(table_name="users_user").count() == 1
+
+    summary = consume_changes()
+
+    assert summary["updated"]["crm.archive"] == 1
+    archive.refresh_from_db()
+    assert archive.attributes["user_cache"]["repr"] == "Suzuki Jiro"
+    assert not ChangeLog.objects.exists()
+
+
+@pytest.mark.django_db
+def test_link_changes_refresh_forest_customers(change_log_triggers):
+    customer = Customer.objects.create()
+    first, second = [
+        Contact.objects.create(
+            name_kanji=dict(first_name=name, last_name="Yamada"),
+            name_kana=dict(first_name=name, last_name="Yamada"),
+        )
+        for name in ["Taro", "Jiro"]
+    ]
+    basic = CustomerContact.objects.create(
+        customer=customer, contact=first, is_basic=True
+    )
+    other = CustomerContact.objects.create(customer=customer, contact=second)
+    forest = Forest.objects.create()
+    link = ForestCustomer.objects.create(forest=forest, customer=customer)
+    consume_changes()
+    forest.refresh_from_db()
+    assert forest.attributes["customer_cache"]["repr_name_kanji"] == "Yamada Taro"
+
+    # the basic contact of the customer changes
+    CustomerContact.objects.filter(pk=basic.pk).update(is_basic=False)
+    CustomerContact.objects.filter(pk=other.pk).update(is_basic=True)
+    summary = consume_changes()
+    assert summary["updated"]["crm.forest"] == 1
+    forest.refresh_from_db()
+    assert forest.attributes["customer_cache"]["repr_name_kanji"] == "Yamada Jiro"
+
+    # the customer is unlinked from the forest
+    ForestCustomer.objects.filter(pk=link.pk).update(deleted=timezone.now())
+    summary = consume_changes()
+    assert summary["updated"]["crm.forest"] == 1
+    forest.refresh_from_db()
+    assert forest.attributes["customer_cache"] == CUSTOMER_CACHE.empty
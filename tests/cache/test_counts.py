@@ -0,0 +1,31 @@
+import pytest
+from django.db import transaction
+
+from hyakumori_crm.cache.counts import get_table_version
+from hyakumori_crm.crm.models import Forest
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    # versions are kept in cache
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_versions_are_bumped_on_commit(locmem_cache):
+    version = get_table_version("crm_forest")
+
+    with transaction.atomic():
+        Forest.objects.create(internal_id="F1")
+        # a count read now does not see the write, it keeps the old version
+        assert get_table_version("crm_forest") == version
+    committed = get_table_version("crm_forest")
+    assert committed > version
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            Forest.objects.create(internal_id="F2")
+            raise RuntimeError
+    assert get_table_version("crm_forest") == committed
@@ -0,0 +1,32 @@
+import pytest
+
+from hyakumori_crm.cache.archive import USER_CACHE
+from hyakumori_crm.crm.models import Archive, ArchiveUser
+from hyakumori_crm.users.models import User
+
+
+@pytest.mark.django_db
+def test_refresh_writes_changed_blobs_only():
+    user = User.objects.create_user(
+        "staff@example.com", "staff", first_name="Taro", last_name="Yamada"
+    )
+    archives = [Archive.objects.create(title=f"archive {i}") for i in range(2)]
+    link = ArchiveUser.objects.create(archive=archives[0], user=user)
+    ids = [archive.pk for archive in archives]
+
+    assert USER_CACHE.refresh(ids) == 2
+    assert USER_CACHE.refresh(ids) == 0
+    archives[0].refresh_from_db()
+    assert archives[0].attributes["user_cache"] == {
+        "count": 1,
+        "list": [{"user_id": str(user.pk), "full_name": "Yamada Taro"}],
+        "repr": "Yamada Taro",
+    }
+    archives[1].refresh_from_db()
+    assert archives[1].attributes["user_cache"] == USER_CACHE.empty
+
+    # soft deleted links are not listed
+    link.delete()
+    assert USER_CACHE.refresh(ids) == 1
+    archives[0].refresh_from_db()
+    assert archives[0].attributes["user_cache"] == USER_CACHE.empty
@@ -0,0 +1,43 @@
+import pytest
+
+from hyakumori_crm.cache.forest import CUSTOMER_CACHE, refresh_customer_forest_cache
+from hyakumori_crm.crm.models import (
+    Contact,
+    Customer,
+    CustomerContact,
+    Forest,
+    ForestCustomer,
+)
+
+
+def create_customer(last_name, first_name):
+    customer = Customer.objects.create()
+    name = dict(last_name=last_name, first_name=first_name)
+    contact = Contact.objects.create(name_kanji=name, name_kana=name)
+    CustomerContact.objects.create(customer=customer, contact=contact, is_basic=True)
+    return customer, contact
+
+
+@pytest.mark.django_db
+def test_refresh_customer_forest_cache_by_batches():
+    customer, contact = create_customer("Yamada", "Taro")
+    other, _ = create_customer("Suzuki", "Hanako")
+    forests = [Forest.objects.create(internal_id=f"F{i}") for i in range(3)]
+    ForestCustomer.objects.create(forest=forests[0], customer=customer)
+    ForestCustomer.objects.create(forest=forests[0], customer=other)
+    ForestCustomer.objects.create(forest=forests[1], customer=customer)
+    ids = [forest.pk for forest in forests]
+    Forest.objects.filter(pk__in=ids).update(attributes={})
+
+    report = refresh_customer_forest_cache(ids, batch_size=2)
+    assert [(b["forests"], b["updated"]) for b in report] == [(2, 2), (1, 1)]
+    forests[0].refresh_from_db()
+    cache = forests[0].attributes["customer_cache"]
+    assert cache["repr_name_kanji"] == "Yamada Taro,Suzuki Hanako"
+    assert cache["list"][str(customer.pk)]["contact_id"] == str(contact.pk)
+    forests[2].refresh_from_db()
+    assert forests[2].attributes["customer_cache"] == CUSTOMER_CACHE.empty
+
+    # unchanged caches are not written again
+    report = refresh_customer_forest_cache(ids, batch_size=2)
+    assert [b["updated"] for b in report] == [0, 0]
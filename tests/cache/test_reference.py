@@ -0,0 +1,37 @@
+import pytest
+from django.db import transaction
+
+from hyakumori_crm.cache.reference import contract_types
+from hyakumori_crm.contracts.models import ContractType
+from hyakumori_crm.contracts.services import get_all_contracttypes_map
+
+
+@pytest.mark.django_db(transaction=True)
+def test_contract_types_lookups_are_cached(django_assert_num_queries):
+    ContractType.objects.create(name="長期契約", code="long_term")
+
+    with django_assert_num_queries(1):
+        for _ in range(10):
+            assert get_all_contracttypes_map() == {"long_term": "長期契約"}
+            assert contract_types.get(code="long_term").name == "長期契約"
+
+    with pytest.raises(ContractType.DoesNotExist):
+        contract_types.get(code="short_term")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_contract_types_rolled_back_write():
+    ContractType.objects.create(name="長期契約", code="long_term")
+    assert contract_types.as_dict("code", "name") == {"long_term": "長期契約"}
+    version = contract_types._get_version()
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            ContractType.objects.create(name="作業道契約", code="work_road")
+            # the writing transaction sees its row, the shared copy does not
+            assert "work_road" in contract_types.as_dict("code", "name")
+            assert [c.code for c in contract_types._state[0]] == ["long_term"]
+            raise RuntimeError
+
+    assert contract_types.as_dict("code", "name") == {"long_term": "長期契約"}
+    assert contract_types._get_version() == version
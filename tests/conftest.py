@@ -0,0 +1,38 @@
+import importlib
+
+import pytest
+from django.db import connection
+
+
+@pytest.fixture(autouse=True)
+def clear_reference_tables():
+    # rows loaded by a test are rolled back with it
+    yield
+    from hyakumori_crm.cache.reference import REFERENCE_TABLES
+
+    for table in REFERENCE_TABLES.values():
+        table.clear()
+
+
+@pytest.fixture
+def migration_sql(db):
+    """
+    Tests run with --nomigrations, the triggers and functions created by
+    the crm migrations are executed with
+    ``migration_sql("0030_forestcontract", "CREATE_TRIGGER")``
+    """
+
+    def execute(name, *statements):
+        migration = importlib.import_module(f"hyakumori_crm.crm.migrations.{name}")
+        with connection.cursor() as cursor:
+            # created by 0027, used by the search migrations
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for statement in statements:
+                cursor.execute(getattr(migration, statement))
+
+    return execute
+
+
+@pytest.fixture
+def forest_contracts_trigger(migration_sql):
+    migration_sql("0030_forestcontract", "CREATE_TRIGGER")
@@ -0,0 +1,58 @@
+import pytest
+
+from hyakumori_crm.contracts.tasks import update_status_task
+from hyakumori_crm.crm.models import Forest, ForestContract
+from hyakumori_crm.crm.schemas.contract import ContractTypeStatus
+
+
+def contracts(status, end_date):
+    return [
+        {"type": "長期契約", "status": status, "end_date": end_date},
+        {"type": "FSC認証", "status": "加入", "start_date": "2020-01-01"},
+    ]
+
+
+def statuses():
+    return {
+        forest.internal_id: forest.contracts[0]["status"]
+        for forest in Forest.objects.all()
+    }
+
+
+@pytest.mark.django_db
+def test_update_status_task_by_chunks(forest_contracts_trigger):
+    negotiated = ContractTypeStatus.negotiated.value
+    expired = ContractTypeStatus.expired.value
+    for i in range(3):
+        Forest.objects.create(
+            internal_id=f"F{i}", contracts=contracts(negotiated, "2026-03-31")
+        )
+    Forest.objects.create(
+        internal_id="later", contracts=contracts(negotiated, "2026-04-02")
+    )
+    Forest.objects.create(
+        internal_id="unnegotiated",
+        contracts=contracts(ContractTypeStatus.unnegotiated.value, "2026-03-31"),
+    )
+    before = statuses()
+
+    summary = update_status_task(dry_run=True, chunk_size=2, today="2026-04-01")
+    assert (summary["forests"], summary["contracts"], summary["chunks"]) == (3, 3, 2)
+    assert sorted(c["internal_id"] for c in summary["expired"]) == ["F0", "F1", "F2"]
+    assert statuses() == before
+
+    summary = update_status_task(chunk_size=2, today="2026-04-01")
+    assert (summary["forests"], summary["contracts"], summary["chunks"]) == (3, 3, 2)
+    assert statuses() == {
+        "F0": expired,
+        "F1": expired,
+        "F2": expired,
+        "later": negotiated,
+        "unnegotiated": ContractTypeStatus.unnegotiated.value,
+    }
+    # the FSC contract is kept, the contract rows follow
+    assert all(f.contracts[1]["status"] == "加入" for f in Forest.objects.all())
+    assert ForestContract.objects.filter(position=0, status=expired).count() == 3
+
+    summary = update_status_task(chunk_size=2, today="2026-04-01")
+    assert summary["forests"] == 0
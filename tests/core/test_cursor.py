@@ -0,0 +1,35 @@
+import uuid
+
+import pytest
+
+from hyakumori_crm.core.utils import cursor_page, decode_cursor, encode_cursor
+
+
+def test_cursor_roundtrip():
+    pk = uuid.uuid4()
+    assert decode_cursor(encode_cursor("1001", pk)) == ["1001", str(pk)]
+    assert decode_cursor(encode_cursor(None, pk)) == [None, str(pk)]
+
+
+def test_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("1001"))
+
+
+def test_cursor_page():
+    rows = [(str(i), i) for i in range(4)]
+
+    page, page_info = cursor_page(rows, 3, False, None, lambda r: r)
+    assert page == rows[:3]
+    assert page_info["has_next_page"] is True
+    assert page_info["has_previous_page"] is False
+    assert decode_cursor(page_info["end_cursor"]) == ["2", 2]
+
+    # backward pages are fetched in reverse order
+    page, page_info = cursor_page(rows[::-1], 3, True, "token", lambda r: r)
+    assert page == rows[1:]
+    assert page_info["has_next_page"] is True
+    assert page_info["has_previous_page"] is True
+    assert decode_cursor(page_info["start_cursor"]) == ["1", 1]
@@ -0,0 +1,36 @@
+import pytest
+
+from hyakumori_crm.core.search import bigram_search, bigram_tsquery, search_snippet
+from hyakumori_crm.crm.models import Archive
+
+
+def test_bigram_tsquery():
+    assert bigram_tsquery("森林 A") == "('森林') & 'a':*"
+    assert bigram_tsquery("間伐計画") == "('間伐' <-> '伐計' <-> '計画')"
+    assert bigram_tsquery("it's") == "('it' <-> 't''' <-> '''s')"
+
+
+def test_search_snippet():
+    text = "前回の協議で<間伐>の計画を確認した"
+    assert search_snippet([None, text], "間伐", context=3) == (
+        "…議で&lt;<mark>間伐</mark>&gt;の計…"
+    )
+    assert search_snippet([text], "搬出") is None
+
+
+@pytest.fixture
+def search_triggers(migration_sql):
+    migration_sql("0034_archive_postalhistory_search", "CREATE_TRIGGERS")
+
+
+@pytest.mark.django_db
+def test_bigram_search_ranks_titles_first(search_triggers):
+    in_content = Archive.objects.create(title="定例", content="間伐計画の説明")
+    in_title = Archive.objects.create(title="間伐計画", content="説明")
+    Archive.objects.create(title="間伐", content="計画の変更")
+
+    archives = bigram_search(Archive.objects.all(), "間伐計画").order_by(
+        "-search_rank"
+    )
+
+    assert list(archives) == [in_title, in_content]
@@ -0,0 +1,59 @@
+import re
+
+import pytest
+from django.db import transaction
+from sequences.models import Sequence
+
+from hyakumori_crm.crm.common import regexes
+from hyakumori_crm.crm.common.utils import (
+    SequencePool,
+    generate_sequential_ids,
+    reserve_sequence_values,
+    reset_sequence,
+)
+
+
+@pytest.mark.django_db
+def test_reserve_sequence_values():
+    assert reserve_sequence_values("test_ids", 3) == range(1, 4)
+    assert reserve_sequence_values("test_ids", 2) == range(4, 6)
+    assert Sequence.objects.get(name="test_ids").last == 5
+
+
+@pytest.mark.django_db
+def test_generate_sequential_ids(django_assert_num_queries):
+    with django_assert_num_queries(1):
+        ids = generate_sequential_ids("DFFC", "test_ids", 120)
+
+    assert len(ids) == 120
+    assert all(re.fullmatch(regexes.CUSTOMER_ID, i) for i in ids)
+    assert [int(i[4:12]) for i in ids] == list(range(1, 121))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sequence_pool_hands_out_reserved_block(django_assert_num_queries):
+    pool = SequencePool(block_size=10)
+
+    assert pool.take("test_ids", 3) == [1, 2, 3]
+    with django_assert_num_queries(0):
+        assert pool.take("test_ids", 7) == [4, 5, 6, 7, 8, 9, 10]
+    assert pool.take("test_ids", 2) == [11, 12]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reset_sequence_drops_reserved_blocks(settings):
+    # blocks are versioned in cache
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    # the pool of another process
+    pool = SequencePool(block_size=10)
+    assert pool.take("test_ids", 3) == [1, 2, 3]
+
+    with transaction.atomic():
+        reset_sequence("test_ids")
+        # the block reserved before the reset is not handed out any more
+        assert pool.take("test_ids", 2) == [1, 2]
+
+    # blocks reserved while resetting are dropped on commit
+    assert pool.take("test_ids", 2) == [11, 12]
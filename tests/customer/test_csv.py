@@ -0,0 +1,126 @@
+import csv
+import json
+
+import pytest
+
+from hyakumori_crm.crm.models import Customer
+from hyakumori_crm.customer.schemas import CustomerInputSchema
+from hyakumori_crm.customer.service import create, get_customer_csv
+from hyakumori_crm.customer.tasks import csv_upload, header_map
+
+
+def test_get_customer_csv_dedup():
+    forest = {
+        "id": "f1",
+        "cadastral": {"sector": "八幡町"},
+        "land_attributes": {"地番本番": 10, "地番支番": 2},
+    }
+    contact = {
+        "id": "c1",
+        "name_kanji": {"last_name": "山田", "first_name": "太郎"},
+        "mobilephone": "090",
+        "telephone": None,
+        "email": None,
+        "forest_count": 1,
+    }
+    empty_contact = dict(contact, id=None)
+    row = dict.fromkeys(
+        [
+            "business_id",
+            "fullname_kanji",
+            "fullname_kana",
+            "prefecture",
+            "municipality",
+            "sector",
+            "postal_code",
+            "telephone",
+            "mobilephone",
+            "email",
+            "family_contact_count",
+            "other_contact_count",
+            "bank_name",
+            "bank_branch_name",
+            "bank_account_type",
+            "bank_account_number",
+            "bank_account_name",
+        ]
+    )
+    row.update(
+        forests_json=[forest, forest],
+        contacts_json=[contact, empty_contact, contact],
+        tags=json.dumps({"団地": "A"}),
+    )
+
+    csv_row = next(get_customer_csv([row]))
+
+    assert csv_row[10] == "八幡町 10-2"
+    assert csv_row[11] == "山田 太郎"
+    assert csv_row[12] == "090"
+    assert csv_row[17] == "有"
+    assert csv_row[-1] == "団地:A"
+
+
+def write_customer_csv(path, rows):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(header_map.values()))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(
+                {header: row.get(key, "") for key, header in header_map.items()}
+            )
+
+
+@pytest.mark.django_db
+def test_csv_upload_creates_and_updates(tmp_path):
+    existing = create(
+        CustomerInputSchema(
+            basic_contact={
+                "name_kana": {"first_name": "Foo", "last_name": "Bar"},
+                "name_kanji": {"first_name": "Foo", "last_name": "Bar"},
+            }
+        )
+    )
+    fp = tmp_path / "customers.csv"
+    write_customer_csv(
+        fp,
+        [
+            {
+                "business_id": existing.business_id,
+                "fullname_kanji": "山田　太郎",
+                "fullname_kana": "ヤマダ　タロウ",
+                "tags": "団地:A",
+            },
+            {"fullname_kanji": "佐藤　花子", "fullname_kana": "サトウ　ハナコ"},
+            {"fullname_kanji": "鈴木　一郎", "fullname_kana": "スズキ　イチロウ"},
+        ],
+    )
+
+    assert csv_upload(str(fp)) == 4
+
+    existing = Customer.objects.get(pk=existing.pk)
+    assert existing.tags == {"団地": "A"}
+    assert existing.self_contact.name_kanji == {"first_name": "太郎", "last_name": "山田"}
+    created = Customer.objects.exclude(pk=existing.pk).order_by("business_id")
+    assert [c.self_contact.name_kana["last_name"] for c in created] == [
+        "サトウ",
+        "スズキ",
+    ]
+    assert len({c.business_id for c in created}) == 2
+
+
+@pytest.mark.django_db
+def test_csv_upload_unknown_customer(tmp_path):
+    fp = tmp_path / "customers.csv"
+    write_customer_csv(
+        fp,
+        [
+            {"fullname_kanji": "佐藤", "fullname_kana": "サトウ"},
+            {"business_id": "DFFC0000009901", "fullname_kanji": "山田"},
+        ],
+    )
+
+    result = csv_upload(str(fp))
+
+    assert result["line"] == 3
+    assert list(result["errors"]) == ["__root__"]
+    assert Customer.objects.count() == 1
@@ -1,6 +1,14 @@
 import pytest
-from hyakumori_crm.crm.models.customer import Customer, Contact
-from hyakumori_crm.customer.service import create, get_list
+from django.db.models import Q
+
+from hyakumori_crm.crm.models import CustomerContact, Forest, ForestCustomer
+from hyakumori_crm.crm.models.customer import Customer, CustomerForestTags, Contact
+from hyakumori_crm.customer.service import (
+    contacts_list_with_search,
+    create,
+    get_customers,
+    get_list,
+)
 from hyakumori_crm.customer.schemas import CustomerInputSchema
 from hyakumori_crm.users.models import User
 
@@ -37,3 +45,76 @@ def test_get_list(customer_input, admin_user):
     customers, total = get_list()
     assert total == 1
     assert customers[0]["fullname_kana"] == "Bar\u3000Foo"
+
+
+@pytest.fixture
+def forest_tags_triggers(migration_sql):
+    migration_sql("0032_customerforesttags", "CREATE_TRIGGERS")
+
+
+@pytest.mark.django_db
+def test_get_list_forest_tags(customer_input, admin_user, forest_tags_triggers):
+    c = create(customer_in=customer_input)
+    forest = Forest.objects.create(tags={"area": "north", "empty": None})
+    link = ForestCustomer.objects.create(forest=forest, customer=c)
+
+    customers, _ = get_list()
+    assert customers[0]["forest_tags_repr"] == "area:north"
+
+    forest.tags = {"area": "south"}
+    forest.save()
+    customers, _ = get_list(filters=Q(forest_tags_repr__icontains="south"))
+    assert customers[0]["forest_tags_repr"] == "area:south"
+
+    # a link moved to another customer refreshes both of them
+    other = Customer.objects.create(internal_id="C002")
+    ForestCustomer.objects.filter(pk=link.pk).update(customer=other)
+    assert not CustomerForestTags.objects.filter(customer=c).exists()
+    assert CustomerForestTags.objects.get(customer=other).forest_tags_repr == (
+        "area:south"
+    )
+    ForestCustomer.objects.filter(pk=link.pk).update(customer=c)
+
+    link.force_delete()
+    customers, _ = get_list()
+    assert customers[0]["forest_tags_repr"] is None
+
+
+@pytest.fixture
+def search_document_triggers(migration_sql):
+    migration_sql(
+        "0031_customer_search_document", "CREATE_FUNCTIONS", "CREATE_TRIGGERS"
+    )
+
+
+@pytest.mark.django_db
+def test_search_document(search_document_triggers):
+    customer = Customer.objects.create(internal_id="C001", tags={"area": "north"})
+    contact = Contact.objects.create(
+        name_kanji={"first_name": "太郎", "last_name": "山田"},
+        name_kana={"first_name": "タロウ", "last_name": "ヤマダ"},
+        postal_code="123-4567",
+        address={"prefecture": "岐阜県", "municipality": "郡上市"},
+    )
+    CustomerContact.objects.create(customer=customer, contact=contact, is_basic=True)
+    Customer.objects.create(internal_id="C002")
+
+    def found(search):
+        return [c.internal_id for c in get_customers(search)]
+
+    for search in ["山田 太郎", "タロウ", "c001", "123-4567", "郡上市", "area:north"]:
+        assert found(search) == ["C001"], search
+    # comma separated terms all match
+    assert found("area:north,山田") == ["C001"]
+    assert found("area:north,鈴木") == []
+
+    # contact writes reach the customer document
+    contact.email = "taro@example.com"
+    contact.save()
+    assert found("TARO@example") == ["C001"]
+    assert list(contacts_list_with_search("taro@")) == [contact]
+
+    # so does a change of the basic contact
+    CustomerContact.objects.filter(customer=customer).update(is_basic=False)
+    customer.refresh_from_db()
+    assert customer.search_document == "C001\narea:north"
@@ -0,0 +1,122 @@
+import json
+
+import psycopg2
+import pytest
+from django.db import connection, transaction
+
+from hyakumori_crm.crm.models import Forest
+from hyakumori_crm.forest.service import (
+    csv_headers,
+    csv_upload_chunk,
+    forest_csv_data_mapping,
+)
+
+
+def test_forest_csv_data_mapping():
+    row = {
+        "id": "b5ab4b5c-5f0e-4c3b-9f4b-5c1c0d4c2f11",
+        "internal_id": "1001",
+        "cadastral": json.dumps(
+            {"prefecture": "岐阜県", "municipality": "郡上市", "sector": "八幡町"}
+        ),
+        "land_attributes": json.dumps({"地番本番": 10, "地番支番": 2}),
+        "contracts": json.dumps(
+            [
+                {"type": "長期契約", "status": "契約済", "start_date": "2020-04-01"},
+                {"type": "FSC認証", "status": "加入", "start_date": None},
+            ]
+        ),
+        "tags": json.dumps({"団地": "A"}),
+        "forest_attributes": json.dumps({"面積_ha": 1.5}),
+        "customer_name_kanji": json.dumps({"last_name": "山田", "first_name": "太郎"}),
+        "customer_name_kana": None,
+        "customer_address": json.dumps({"prefecture": "岐阜県", "sector": "1-1"}),
+        "contact_name_kanji": None,
+        "contact_name_kana": None,
+        "contact_address": None,
+    }
+
+    csv_row = forest_csv_data_mapping(row)
+    headers = csv_headers()
+
+    assert len(csv_row) == len(headers)
+    mapped = dict(zip(headers, csv_row))
+    assert mapped["市町村"] == "郡上市"
+    assert mapped["地番支番"] == 2
+    assert mapped["土地所有者名（漢字）"] == "山田　太郎"
+    assert mapped["土地所有者名（カナ）"] == ""
+    assert mapped["所有者住所"] == "岐阜県 1-1"
+    assert mapped["契約状況"] == "契約済"
+    assert mapped["開始日"] == '"2020-04-01"'
+    assert mapped["終了日"] == '""'
+    assert mapped["FSC認証"] == "加入"
+    assert mapped["面積_ha"] == 1.5
+    assert mapped["第3形状比"] is None
+
+
+def chunk_row(forest, municipality="郡上市", lot_number="10"):
+    return {
+        "id": str(forest.pk) if forest else None,
+        "internal_id": forest.internal_id if forest else "F0",
+        "cadastral": {"prefecture": "岐阜県", "municipality": municipality},
+        "contracts": {},
+        "land_attributes": [{"key": "地番本番", "value": lot_number}],
+        "forest_attributes": [],
+        "tags": "団地:A",
+    }
+
+
+@pytest.mark.django_db
+def test_csv_upload_chunk_saves_rows():
+    forests = [Forest.objects.create(internal_id=f"F{i}") for i in range(2)]
+
+    chunk = [(2, chunk_row(forests[0])), (3, chunk_row(forests[1]))]
+    assert csv_upload_chunk(chunk) is None
+    for forest in forests:
+        forest.refresh_from_db()
+        assert forest.cadastral["municipality"] == "郡上市"
+        assert forest.land_attributes["地番本番"] == 10
+        assert forest.tags == {"団地": "A"}
+
+
+@pytest.mark.django_db
+def test_csv_upload_chunk_line_errors():
+    forest = Forest.objects.create(
+        internal_id="F1", cadastral={"municipality": "高山市"}
+    )
+
+    # a failing line stops the chunk, its previous rows are not written
+    error = csv_upload_chunk(
+        [(2, chunk_row(forest)), (3, chunk_row(forest, lot_number="abc"))]
+    )
+    assert error["line"] == 3
+    assert "地番本番" in error["errors"]
+    forest.refresh_from_db()
+    assert forest.cadastral["municipality"] == "高山市"
+
+    error = csv_upload_chunk([(2, chunk_row(forest)), (3, chunk_row(None))])
+    assert error["line"] == 3
+    assert "__root__" in error["errors"]
+    forest.refresh_from_db()
+    assert forest.cadastral["municipality"] == "高山市"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_csv_upload_chunk_locked_forest():
+    forest = Forest.objects.create(internal_id="F1")
+    locker = psycopg2.connect(**connection.get_connection_params())
+    try:
+        with locker.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM crm_forest WHERE id = %s FOR UPDATE", [str(forest.pk)]
+            )
+        with transaction.atomic():
+            error = csv_upload_chunk([(2, chunk_row(forest))])
+            transaction.set_rollback(True)
+    finally:
+        locker.rollback()
+        locker.close()
+
+    assert error == {
+        "errors": {"__root__": ["Current resources are not ready for update!!"]}
+    }
@@ -0,0 +1,149 @@
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.utils.translation import gettext_lazy as _
+
+from hyakumori_crm.crm.models import Forest
+from hyakumori_crm.forest.filters import ForestFilter, GeometryField
+
+
+@pytest.fixture
+def forest_search_trigger(migration_sql):
+    migration_sql("0035_remove_forestsearch_contract_choices", "CREATE_TRIGGER")
+
+
+def filtered(data):
+    forest_filter = ForestFilter(data)
+    assert forest_filter.is_valid(), forest_filter.errors
+    return sorted(forest_filter.qs.values_list("internal_id", flat=True))
+
+
+@pytest.mark.django_db
+def test_contract_choice_filter(forest_contracts_trigger):
+    Forest.objects.create(
+        internal_id="F1",
+        contracts=[
+            {"type": "長期契約", "status": "契約済"},
+            {"type": "FSC認証", "status": "加入"},
+        ],
+    )
+    Forest.objects.create(
+        internal_id="F2",
+        contracts=[
+            {"type": "特別契約", "status": "交渉中"},
+            {"type": "FSC認証", "status": "未加入"},
+        ],
+    )
+    Forest.objects.create(internal_id="F3", contracts=[])
+
+    assert filtered({"contract_type": "長期"}) == ["F1"]
+    # keywords matching no known value are searched in the stored ones
+    assert filtered({"contract_type": "特別"}) == ["F2"]
+    assert filtered({"contract_type": "長期,特別"}) == ["F1", "F2"]
+    assert filtered({"contract_type": "存在しない"}) == []
+    assert filtered({"contract_type": ""}) == ["F3"]
+    assert filtered({"contract_status": "契約済"}) == ["F1"]
+    assert filtered({"contract_status": "交渉"}) == ["F2"]
+    # 加入 is part of both FSC statuses
+    assert filtered({"fsc_status": "未加入"}) == ["F2"]
+    assert filtered({"fsc_status": "加入"}) == ["F1", "F2"]
+
+
+@pytest.mark.django_db
+def test_search_fields_filter(forest_search_trigger):
+    forest = Forest.objects.create(
+        internal_id="F1",
+        cadastral={"municipality": "郡上市", "sector": "八幡町"},
+        land_attributes={"地番本番": 10, "地番支番": 2},
+        contracts=[
+            {"type": "長期契約", "start_date": "2020-04-01", "end_date": "2030-03-31"},
+            {"type": "FSC認証", "start_date": "2021-05-01"},
+        ],
+        attributes={
+            "customer_cache": {
+                "repr_name_kanji": "山田 太郎,鈴木 花子",
+                "repr_name_kana": "ヤマダ タロウ,スズキ ハナコ",
+            }
+        },
+    )
+    Forest.objects.create(internal_id="F2")
+
+    cases = {
+        "cadastral__municipality": "郡上",
+        "cadastral__sector": "八幡",
+        "land_attributes__地番本番": "10",
+        "land_attributes__地番支番": "2",
+        "owner__name_kanji": "鈴木 花子",
+        "owner__name_kana": "ヤマダ タロウ",
+        "contract_start_date": "2020-04",
+        "contract_end_date": "2030",
+        "fsc_start_date": "2021-05-01",
+    }
+    assert set(cases) == set(ForestFilter.search_fields)
+    for name, value in cases.items():
+        assert filtered({name: value}) == ["F1"], name
+        assert filtered({name: "存在しない"}) == [], name
+
+    # empty keywords list the forests without the value
+    assert filtered({"cadastral__municipality": ""}) == ["F2"]
+    # keywords are or-ed, words of an owner name are and-ed
+    assert filtered({"cadastral__sector": "八幡,美並"}) == ["F1"]
+    assert filtered({"owner__name_kanji": "山田 次郎"}) == []
+
+    # the copies follow the forest
+    forest.cadastral = {"municipality": "高山市"}
+    forest.save()
+    assert filtered({"cadastral__municipality": "郡上"}) == []
+    assert filtered({"cadastral__municipality": "高山"}) == ["F1"]
+
+
+def square(lon, lat, size=0.01):
+    polygon = Polygon.from_bbox((lon, lat, lon + size, lat + size))
+    polygon.srid = 4326
+    return MultiPolygon(polygon, srid=4326).transform(2447, clone=True)
+
+
+@pytest.mark.django_db
+def test_spatial_filters():
+    Forest.objects.create(internal_id="F1", geodata=square(139.70, 35.60))
+    Forest.objects.create(internal_id="F2", geodata=square(139.80, 35.70))
+    Forest.objects.create(internal_id="F3")
+
+    assert filtered({"bbox": "139.69,35.59,139.72,35.62"}) == ["F1"]
+    assert filtered({"bbox": [139.0, 35.0, 140.0, 36.0]}) == ["F1", "F2"]
+    assert filtered(
+        {
+            "intersects": {
+                "type": "Polygon",
+                "coordinates": [
+                    [
+                        [139.805, 35.705],
+                        [139.9, 35.705],
+                        [139.9, 35.8],
+                        [139.805, 35.705],
+                    ]
+                ],
+            }
+        }
+    ) == ["F2"]
+    assert filtered({"intersects": "POINT (139.705 35.605)"}) == ["F1"]
+    # the east side of F1 is about 450 meters away
+    assert filtered({"within_distance": "139.715,35.605,1000"}) == ["F1"]
+    assert filtered(
+        {"within_distance": {"lon": 139.715, "lat": 35.605, "distance": 100}}
+    ) == []
+
+
+@pytest.mark.django_db
+def test_spatial_filters_invalid_input():
+    invalid_geom = GeometryField.default_error_messages["invalid_geom"]
+    cases = [
+        ("bbox", "139.69,35.59,139.72", _("Invalid bounding box")),
+        ("bbox", "a,b,c,d", _("Invalid bounding box")),
+        ("within_distance", "139.7,35.6", _("Invalid distance")),
+        ("within_distance", "139.7,35.6,-1", _("Invalid distance")),
+        ("intersects", "not a geometry", invalid_geom),
+    ]
+    for name, value, message in cases:
+        forest_filter = ForestFilter({name: value})
+        assert not forest_filter.is_valid()
+        assert forest_filter.errors[name] == [str(message)], value
@@ -0,0 +1,118 @@
+import json
+import math
+from datetime import timedelta
+
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.utils import timezone
+
+from hyakumori_crm.crm.models import Forest
+from hyakumori_crm.forest.service import (
+    annotate_geojson,
+    geojson_options,
+    get_expiring_contracts,
+    group_expiring_contracts,
+    parse_expiring_days,
+)
+
+
+def circle(lon, lat, radius=0.01, points=200):
+    ring = [
+        (
+            lon + radius * math.cos(2 * math.pi * i / points),
+            lat + radius * math.sin(2 * math.pi * i / points),
+        )
+        for i in range(points)
+    ]
+    polygon = Polygon(ring + ring[:1], srid=4326)
+    return MultiPolygon(polygon, srid=4326).transform(2447, clone=True)
+
+
+def ring_of(geojson):
+    geometry = json.loads(geojson)
+    assert geometry["type"] == "MultiPolygon"
+    return geometry["coordinates"][0][0]
+
+
+@pytest.mark.django_db
+def test_annotate_geojson():
+    forest = Forest.objects.create(geodata=circle(139.7, 35.6))
+    empty = Forest.objects.create()
+    queryset = Forest.objects.all()
+
+    exact = annotate_geojson(queryset).get(pk=forest.pk)
+    ring = ring_of(exact.geodata_geojson)
+    assert len(ring) == 201
+    # reprojected to lon/lat
+    assert ring[0] == pytest.approx([139.71, 35.6], abs=1e-6)
+    assert annotate_geojson(queryset).get(pk=empty.pk).geodata_geojson is None
+
+    # about 30 meters between two points of the ring, 100 meters tolerance
+    simplified = annotate_geojson(queryset, simplify=100).get(pk=forest.pk)
+    simplified_ring = ring_of(simplified.geodata_geojson)
+    assert 4 <= len(simplified_ring) < len(ring)
+    assert simplified_ring[0] == pytest.approx([139.71, 35.6], abs=1e-3)
+
+    rounded = annotate_geojson(queryset, precision=2).get(pk=forest.pk)
+    assert ring_of(rounded.geodata_geojson)[0] == [139.71, 35.6]
+
+
+def test_geojson_options():
+    assert geojson_options({"simplify": "10.5", "precision": "6"}) == {
+        "simplify": 10.5,
+        "precision": 6,
+    }
+    assert geojson_options({"simplify": "0", "precision": "16"}) == {}
+    assert geojson_options({"simplify": "a", "precision": "b"}) == {}
+
+
+@pytest.mark.django_db
+def test_group_expiring_contracts(forest_contracts_trigger):
+    today = timezone.localdate()
+
+    def create(internal_id, municipality, days, type="長期契約", status="契約済"):
+        end_date = (today + timedelta(days=days)).isoformat()
+        Forest.objects.create(
+            internal_id=internal_id,
+            cadastral={"municipality": municipality},
+            contracts=[
+                {"type": type, "status": status, "end_date": end_date},
+                {"type": "FSC認証", "status": "加入", "end_date": end_date},
+            ],
+            attributes={"customer_cache": {"repr_name_kanji": f"{internal_id} 所有者"}},
+        )
+
+    create("F1", "Takayama", 10)
+    create("F2", "Gujo", 20, type="作業道契約")
+    create("F3", "Gujo", 5)
+    create("ended", "Gujo", -1)
+    create("later", "Gujo", 40)
+    create("expired", "Gujo", 5, status="期限切")
+    create("other_type", "Gujo", 5, type="FSC認証")
+
+    groups = group_expiring_contracts(get_expiring_contracts(30))
+
+    assert [(g["municipality"], g["count"]) for g in groups] == [
+        ("Gujo", 2),
+        ("Takayama", 1),
+    ]
+    gujo = groups[0]["contracts"]
+    assert [(c["internal_id"], c["type"], c["days_left"]) for c in gujo] == [
+        ("F3", "長期契約", 5),
+        ("F2", "作業道契約", 20),
+    ]
+    assert gujo[0]["owner_name_kanji"] == "F3 所有者"
+    assert [c["internal_id"] for c in get_expiring_contracts(45)] == [
+        "F3",
+        "F2",
+        "later",
+        "F1",
+    ]
+
+
+def test_parse_expiring_days():
+    assert parse_expiring_days("7") == 7
+    assert parse_expiring_days(None) == 30
+    assert parse_expiring_days("a") == 30
+    assert parse_expiring_days("-1") == 0
+    assert parse_expiring_days("1000") == 366
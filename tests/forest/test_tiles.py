@@ -0,0 +1,95 @@
+import math
+
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Polygon
+
+from hyakumori_crm.crm.models import Forest
+from hyakumori_crm.forest.tiles import (
+    WEB_MERCATOR_HALF_WIDTH,
+    clamp_tile_bounds,
+    get_forest_tile,
+    is_valid_tile,
+    render_forest_tile,
+    tile_bounds,
+)
+
+
+def square(lon, lat, size=0.01):
+    polygon = Polygon.from_bbox((lon, lat, lon + size, lat + size))
+    polygon.srid = 4326
+    return MultiPolygon(polygon, srid=4326).transform(2447, clone=True)
+
+
+def tile_of(z, lon, lat):
+    n = 2 ** z
+    lat = math.radians(lat)
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * n)
+    return z, x, y
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+
+def test_tile_bounds():
+    w = WEB_MERCATOR_HALF_WIDTH
+    assert tile_bounds(0, 0, 0) == pytest.approx((-w, -w, w, w))
+    assert tile_bounds(1, 1, 0) == pytest.approx((0, 0, w, w))
+    assert tile_bounds(1, 0, 1) == pytest.approx((-w, -w, 0, 0))
+
+
+def test_is_valid_tile():
+    assert is_valid_tile(0, 0, 0)
+    assert is_valid_tile(2, 3, 3)
+    assert not is_valid_tile(2, 4, 0)
+    assert not is_valid_tile(2, 0, 4)
+    assert not is_valid_tile(2, -1, 0)
+    assert not is_valid_tile(23, 0, 0)
+
+
+def test_clamp_tile_bounds():
+    w = WEB_MERCATOR_HALF_WIDTH
+    xmin, ymin, xmax, ymax = clamp_tile_bounds(tile_bounds(0, 0, 0))
+    assert -w < xmin < xmax < w
+    assert -w < ymin < ymax < w
+    # the western hemisphere is out of the geodata area
+    assert clamp_tile_bounds(tile_bounds(1, 0, 0)) is None
+    bounds = tile_bounds(*tile_of(12, 139.7, 35.6))
+    assert clamp_tile_bounds(bounds) == bounds
+
+
+@pytest.mark.django_db
+def test_render_forest_tile():
+    Forest.objects.create(internal_id="F1", geodata=square(139.70, 35.60))
+    deleted = Forest.objects.create(internal_id="F2", geodata=square(139.70, 35.60))
+    deleted.delete()
+
+    tile = render_forest_tile(*tile_of(12, 139.705, 35.605))
+    assert b"forests" in tile
+    assert b"F1" in tile
+    assert b"F2" not in tile
+    # low zoom tiles cover more than the geodata projection area
+    for z in (0, 2, 5):
+        assert b"F1" in render_forest_tile(*tile_of(z, 139.705, 35.605)), z
+    assert render_forest_tile(*tile_of(12, 135.5, 34.7)) == b""
+    assert render_forest_tile(1, 0, 0) == b""
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_forest_tile_is_cached_by_version(locmem_cache):
+    forest = Forest.objects.create(internal_id="F1", geodata=square(139.70, 35.60))
+    z, x, y = tile_of(12, 139.705, 35.605)
+
+    assert b"F1" in get_forest_tile(z, x, y)
+    Forest.objects.filter(pk=forest.pk).update(internal_id="F1a")
+    # the queryset update does not bump the version, the cached tile is served
+    assert b"F1a" not in get_forest_tile(z, x, y)
+
+    forest.refresh_from_db()
+    forest.internal_id = "F1b"
+    forest.save()
+    assert b"F1b" in get_forest_tile(z, x, y)
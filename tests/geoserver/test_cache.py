@@ -0,0 +1,30 @@
+import os
+import time
+
+from hyakumori_crm.geoserver.cache import evict, normalize_params
+
+
+def test_normalize_params():
+    assert normalize_params(
+        "service=wms&request=GetMap&layers=crm:forest&bbox=1,2,3,4&_=1610000000"
+    ) == [
+        ("BBOX", "1,2,3,4"),
+        ("LAYERS", "crm:forest"),
+        ("REQUEST", "GETMAP"),
+        ("SERVICE", "WMS"),
+    ]
+
+
+def test_evict_least_recently_read(settings, tmp_path):
+    settings.GEOSERVER_CACHE_DIR = str(tmp_path)
+    settings.GEOSERVER_CACHE_TTL = 3600
+    directory = tmp_path / "ab"
+    directory.mkdir()
+    now = time.time()
+    for i, key in enumerate(["ab1", "ab2", "ab3"]):
+        (directory / key).write_bytes(b"x" * 10)
+        (directory / f"{key}.json").write_text("{}")
+        os.utime(directory / key, (now - 100 + i, now - 100 + i))
+
+    assert evict(max_size=20) == 1
+    assert sorted(os.listdir(directory)) == ["ab2", "ab2.json", "ab3", "ab3.json"]
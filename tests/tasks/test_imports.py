@@ -0,0 +1,148 @@
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from hyakumori_crm.core.utils import (
+    clear_maintain_task_id_cache,
+    get_maintain_resources,
+    is_path_in_maintain,
+    set_maintain_task_id_cache,
+)
+from hyakumori_crm.crm.middlewares import in_maintain_middleware
+from hyakumori_crm.crm.models import Forest
+from hyakumori_crm.tasks import imports
+from hyakumori_crm.tasks.imports import (
+    ImportInProgress,
+    create_import_job,
+    load_import_progress,
+    run_import_job,
+)
+from hyakumori_crm.tasks.models import ImportJob, ImportJobStatus
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    # progress and maintain locks are kept in cache
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+
+@pytest.fixture
+def import_job(db, tmp_path):
+    fp = tmp_path / "forests.csv"
+    fp.write_text("internal_id\nF1\nF2\n", encoding="utf-8")
+    job = ImportJob.objects.create(resource="forests", file_path=str(fp))
+    set_maintain_task_id_cache(str(job.id), resource="forests")
+    return job
+
+
+def use_upload(monkeypatch, upload):
+    monkeypatch.setattr(imports, "import_string", lambda path: upload)
+
+
+@pytest.mark.django_db
+def test_run_import_job_succeeds(monkeypatch, import_job):
+    def upload(fp, progress):
+        Forest.objects.create(internal_id="F1")
+        # rows read, header included
+        return 3
+
+    use_upload(monkeypatch, upload)
+
+    assert run_import_job(import_job.id) == ImportJobStatus.SUCCEEDED
+    import_job.refresh_from_db()
+    assert import_job.rows_total == 2
+    assert import_job.rows_processed == 2
+    assert import_job.errors is None
+    assert import_job.started_at and import_job.finished_at
+    assert Forest.objects.filter(internal_id="F1").exists()
+    assert not is_path_in_maintain("/api/v1/forests/upload-csv")
+
+
+@pytest.mark.django_db
+def test_run_import_job_fails_and_rolls_back(monkeypatch, import_job):
+    errors = {"errors": {"3": {"internal_id": ["invalid"]}}}
+
+    def upload(fp, progress):
+        Forest.objects.create(internal_id="F1")
+        return errors
+
+    use_upload(monkeypatch, upload)
+
+    assert run_import_job(import_job.id) == ImportJobStatus.FAILED
+    import_job.refresh_from_db()
+    assert import_job.errors == errors
+    assert import_job.finished_at
+    assert not Forest.objects.exists()
+    assert not is_path_in_maintain("/api/v1/forests/upload-csv")
+
+
+@pytest.mark.django_db
+def test_import_progress_is_polled_from_cache(monkeypatch, import_job):
+    polled = []
+
+    def upload(fp, progress):
+        progress(1)
+        # the job row is only written outside of the import transaction
+        job = ImportJob.objects.get(pk=import_job.pk)
+        polled.append((job.status, job.rows_processed))
+        polled.append(load_import_progress(job).rows_processed)
+        return 3
+
+    use_upload(monkeypatch, upload)
+    run_import_job(import_job.id)
+
+    assert polled == [(ImportJobStatus.RUNNING, 0), 1]
+    # finished jobs do not read the cache
+    import_job.refresh_from_db()
+    assert load_import_progress(import_job).rows_processed == 2
+
+
+@pytest.mark.django_db
+def test_create_import_job_locks_resource(monkeypatch, tmp_path):
+    fp = tmp_path / "upload.csv"
+    fp.write_text("internal_id\n", encoding="utf-8")
+    job = create_import_job("forests", str(fp))
+    assert is_path_in_maintain("/api/v1/forests/upload-csv")
+    with pytest.raises(ImportInProgress):
+        create_import_job("forests", str(fp))
+    assert ImportJob.objects.count() == 1
+
+    # another resource has its own lock
+    other = create_import_job("customers", str(fp))
+
+    # a job only releases its own lock
+    stale = ImportJob.objects.create(resource="forests", file_path=job.file_path)
+    use_upload(monkeypatch, lambda fp, progress: 1)
+    run_import_job(stale.id)
+    assert is_path_in_maintain("/api/v1/forests/upload-csv")
+    run_import_job(job.id)
+    assert get_maintain_resources() == ["customers"]
+    run_import_job(other.id)
+    assert get_maintain_resources() == []
+
+
+def test_maintain_locks_resource_paths():
+    middleware = in_maintain_middleware(lambda request: HttpResponse())
+    rf = RequestFactory()
+
+    set_maintain_task_id_cache("job", resource="forests")
+    assert is_path_in_maintain("/api/v1/forests/upload-csv")
+    assert not is_path_in_maintain("/api/v1/customers")
+    assert middleware(rf.post("/api/v1/forests/1/tags")).status_code == 503
+    assert middleware(rf.get("/api/v1/forests")).status_code == 200
+    assert middleware(rf.post("/api/v1/customers")).status_code == 200
+
+    clear_maintain_task_id_cache(resource="forests")
+    assert not is_path_in_maintain("/api/v1/forests/upload-csv")
+
+    # customer imports rewrite the customer caches of forests
+    set_maintain_task_id_cache("job", resource="customers")
+    assert middleware(rf.post("/api/v1/forests/1/tags")).status_code == 503
+    clear_maintain_task_id_cache(resource="customers")
+
+    # an import without resource locks every path
+    set_maintain_task_id_cache("job")
+    assert is_path_in_maintain("/api/v1/customers")
+    clear_maintain_task_id_cache()
@@ -1,6 +1,7 @@
 from uuid import uuid4
 
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils.translation import gettext_lazy as _
 from rest_framework.test import force_authenticate
 
@@ -17,9 +18,11 @@ from hyakumori_crm.crm.schemas.contract import (
 )
 from hyakumori_crm.contracts.services import ContractService
 from hyakumori_crm.forest.restful import (
+    forest_tile_view,
     update_owners_view,
     ForestViewSets,
 )
+from hyakumori_crm.tasks.models import ImportJob, ImportJobStatus
 
 
 def test_get_customers_of_forest_unauthorize(api_rf):
@@ -110,3 +113,35 @@ def test_update_owners_view(api_rf, admin_user, forest):
     forest.refresh_from_db()
     assert resp.status_code == 200
     assert ForestCustomer.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_upload_csv_creates_import_job(api_rf, admin_user, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_file = SimpleUploadedFile("forests.csv", b"internal_id\nF1\n")
+    req = api_rf.post(
+        "/api/v1/forests/upload-csv", {"file": csv_file}, format="multipart"
+    )
+    force_authenticate(req, user=admin_user)
+    resp = ForestViewSets.as_view({"post": "upload_csv"})(req)
+
+    # the import runs in a worker, its job is polled
+    assert resp.status_code == 202
+    job = ImportJob.objects.get(pk=resp.data["id"])
+    assert job.resource == "forests"
+    assert job.author == admin_user
+    assert resp.data["status"] == ImportJobStatus.PENDING
+
+
+@pytest.mark.django_db
+def test_forest_tile_view(api_rf, admin_user):
+    for z, x, y in [(0, 0, 1), (2, 4, 0), (23, 0, 0)]:
+        req = api_rf.get(f"/api/v1/forests/tiles/{z}/{x}/{y}.mvt")
+        force_authenticate(req, user=admin_user)
+        assert forest_tile_view(req, z=z, x=x, y=y).status_code == 404
+
+    req = api_rf.get("/api/v1/forests/tiles/0/0/0.mvt")
+    force_authenticate(req, user=admin_user)
+    resp = forest_tile_view(req, z=0, x=0, y=0)
+    assert resp.status_code == 200
+    assert resp["Content-Type"] == "application/vnd.mapbox-vector-tile"
@@ -0,0 +1,47 @@
+import pytest
+from ariadne import graphql_sync
+from django.contrib.auth.models import Group
+from rest_framework_simplejwt.tokens import AccessToken
+
+from hyakumori_crm.crm.models import Forest
+from hyakumori_crm.graphql import schema
+from hyakumori_crm.permissions.enums import SystemGroups
+
+LIST_FORESTS = """
+query ($data: ForestListFilterInput) {
+    list_forests(data: $data) {
+        forests { internal_id }
+        total
+        total_exact
+    }
+}
+"""
+
+
+@pytest.fixture
+def graphql_request(rf, admin_user):
+    group, _ = Group.objects.get_or_create(name=SystemGroups.GROUP_ADMIN)
+    admin_user.groups.add(group)
+    token = AccessToken.for_user(admin_user)
+    return rf.post("/graphql", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+
+@pytest.mark.django_db
+def test_list_forests_by_page(graphql_request):
+    for internal_id in ["F3", "F1", "F2"]:
+        Forest.objects.create(internal_id=internal_id)
+
+    ok, result = graphql_sync(
+        schema,
+        {
+            "query": LIST_FORESTS,
+            "variables": {"data": {"page": 2, "itemsPerPage": 2, "filters": {}}},
+        },
+        context_value=graphql_request,
+    )
+
+    assert ok and "errors" not in result
+    listing = result["data"]["list_forests"]
+    assert listing["forests"] == [{"internal_id": "F3"}]
+    assert listing["total"] == 3
+    assert listing["total_exact"] is True